@@ -52,21 +52,23 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-# For modeling and evaluation
-from sklearn.model_selection import train_test_split, GridSearchCV, RandomizedSearchCV
-from sklearn.metrics import accuracy_score, classification_report, roc_auc_score, confusion_matrix
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.ensemble import RandomForestClassifier, AdaBoostClassifier, GradientBoostingClassifier
-from xgboost import XGBClassifier
-
-# For preprocessing
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.pipeline import Pipeline
-from sklearn.compose import ColumnTransformer
-
-# For oversampling and undersampling
-from imblearn.over_sampling import SMOTE
-from imblearn.under_sampling import RandomUnderSampler
+# Typed, chunked loader for the customer file
+from churn.data import load_churn_data, memory_report, NUMERIC_COLUMNS
+# Cached, memory-mapped feature matrix (one-hot encoding + outlier capping)
+from churn.cache import load_features
+# Single-pass summary statistics and correlations for the EDA tables
+from churn.stats import summarize
+# Vectorized IQR capper and the ColumnTransformer used by the pipelines
+from churn.features import OutlierCapper, build_preprocessor
+# Model persistence for the batch scorer (python -m churn.score)
+from churn.score import save_model
+# Export of fitted tree ensembles to a pure-NumPy evaluator
+from churn.trees import compile_model
+# Segmentation, model zoo and tuning stages (estimators are imported on use)
+from churn.cluster import (CLUSTER_FEATURES, elbow_inertia, fit_segments, assign_segments,
+                           cluster_profile)
+from churn.train import METRIC_NAMES, dtype_parity, train_zoo
+from churn.tune import PARAM_GRIDS, HalvingSearch, PipelineSearch
 
 # Suppress warnings and set plot style
 import warnings
@@ -75,16 +77,21 @@ sns.set(style="whitegrid")
 
 """### Understanding the structure of the data"""
 
-# from google.colab import drive
-# drive.mount('/content/drive')
-from google.colab import drive
-drive.mount('/content/drive')
-
-from google.colab import drive
-drive.mount('/content/drive')
+# Mount Google Drive when running in Colab; elsewhere file_path is read locally
+try:
+    from google.colab import drive
+    drive.mount('/content/drive')
+except ImportError:
+    pass
 
 file_path = '/content/BankChurners.csv'
-df = pd.read_csv(file_path)
+# Opt-in compact dtype mode: float32 and fixed narrow integer dtypes from
+# loading through capping, scaling and training (about half the memory; the
+# model metrics match the float64 run, see dtype_parity further below)
+compact = False
+# Streams the file in chunks with a declared schema (categoricals, narrow ints),
+# maps Attrition_Flag/Gender to 0/1 and fills missing categories with the mode
+df = load_churn_data(file_path, compact=compact)
 
 """#Data Overview :
 - to understand the dataset
@@ -104,12 +111,16 @@ print(df.info())
 
 """### Statistical summary of the dataset"""
 
-df.describe()
+# One pass over the rows collects every statistic the EDA tables use (moments,
+# min/max, sketched quartiles and the co-moments behind the correlation
+# matrix); for files larger than memory use summarize(iter_chunks(file_path))
+eda_stats = summarize(df)
+eda_stats.summary()
 
 """# Check for missing values and basic statistics:"""
 
-# Check missing values count
-missing_values = df.isnull().sum()
+# Check missing values count (recorded by the loader before imputation)
+missing_values = pd.Series(df.attrs["missing_values"])
 missing_values[missing_values > 0]
 
 """Therefore there are missing values
@@ -122,9 +133,10 @@ missing_values[missing_values > 0]
 Since these are categorical variables, we will fill missing values with the most frequent category (mode). ​
 """
 
-# Fill missing values with mode
-df["Education_Level"].fillna(df["Education_Level"].mode()[0], inplace=True)
-df["Marital_Status"].fillna(df["Marital_Status"].mode()[0], inplace=True)
+# Missing values were filled with the mode by load_churn_data; the same values
+# are saved with the model and used to impute customers at scoring time
+fill_values = df.attrs["fill_values"]
+print(fill_values)
 
 # Verify missing values are handled
 df.isnull().sum()
@@ -190,7 +202,7 @@ plt.show()
 """
 
 plt.figure(figsize=(12, 8))
-corr_matrix = df[numerical_features].corr()
+corr_matrix = eda_stats.corr().loc[numerical_features, numerical_features]
 sns.heatmap(corr_matrix, annot=True, cmap='coolwarm', fmt='.2f', linewidths=0.5)
 plt.title('Correlation Matrix of Numerical Features')
 plt.show()
@@ -386,14 +398,24 @@ fig = px.scatter(
 )
 fig.show()
 
+"""### Headless EDA Report
+The figures above are drawn from raw rows (and the pairplot from a 1,000-row sample). For full-size snapshots the same figures are written to files from binned aggregates: one pass reduces every row to histogram counts, per-class quantile sketches and 2-D count grids, and the figures are then rendered in parallel.
+"""
+
+from churn.report import build_report
+
+# Bins span the bounds of the summary statistics computed above. From the
+# command line, with the segment scatter:
+#   python -m churn.report BankChurners.csv eda_report/ --segments segments.npz --workers 8
+report_paths = build_report(df, "eda_report", stats=eda_stats, workers=-1)
+report_paths["index"]
+
 """### Summary Table of Numerical Feature Distributions
 We’ll generate a table that includes mean, median, std, min, max, skewness for all numerical features.
 """
 
-# Summary statistics with skew
-summary_stats = df.describe().T
-summary_stats["median"] = df.median()
-summary_stats["skew"] = df.skew()
+# Summary statistics with skew, from the single pass above
+summary_stats = eda_stats.summary()
 summary_stats = summary_stats[["mean", "median", "std", "min", "25%", "50%", "75%", "max", "skew"]]
 summary_stats.round(2)
 
@@ -404,14 +426,18 @@ Cap extreme outliers (winsorization)
 
 from sklearn.preprocessing import LabelEncoder
 
-# Binary encoding for Attrition_Flag (Target Variable)
-df["Attrition_Flag"] = df["Attrition_Flag"].map({"Existing Customer": 0, "Attrited Customer": 1})
-
-# Binary encoding for Gender
-df["Gender"] = df["Gender"].map({"M": 0, "F": 1})
+# Binary encoding for Attrition_Flag (Target Variable) and Gender is done by
+# load_churn_data: Existing Customer -> 0, Attrited Customer -> 1, M -> 0, F -> 1
 
-# One-hot encoding for categorical variables
-df = pd.get_dummies(df, columns=["Education_Level", "Marital_Status", "Income_Category", "Card_Category"], drop_first=True)
+# One-hot encoding for categorical variables is done by
+# churn.features.prepare_features. The result is cached on disk,
+# keyed by a hash of the file and the preprocessing config, so later runs
+# memory-map it instead of rebuilding it. config={"encoding": "codes"} keeps
+# each categorical as one int8-coded column with the fixed vocabulary instead:
+# make_model(name, encoding="codes") then fits XGBoost on its native
+# categorical splits and one-hot encodes the codes for the other models
+X, y = load_features(file_path, df=df, config={"compact": compact})
+df = X.assign(Attrition_Flag=y)
 
 # Display first few rows after encoding
 df.head()
@@ -421,29 +447,13 @@ Using the Interquartile Range (IQR) method to detect and handle outliers for num
 
 """
 
-# Select numerical columns
-num_cols = df.select_dtypes(include=["int64", "float64"]).columns
-
-# Remove the target variable from outlier treatment
-num_cols = num_cols.drop("Attrition_Flag")
-
-# Function to cap outliers
-def cap_outliers(df, column):
-    Q1 = df[column].quantile(0.25)
-    Q3 = df[column].quantile(0.75)
-    IQR = Q3 - Q1
-    lower_bound = Q1 - 1.5 * IQR
-    upper_bound = Q3 + 1.5 * IQR
-
-    df[column] = np.where(df[column] < lower_bound, lower_bound, df[column])
-    df[column] = np.where(df[column] > upper_bound, upper_bound, df[column])
+# Select numerical columns (the target variable is not part of NUMERIC_COLUMNS)
+num_cols = pd.Index(NUMERIC_COLUMNS)
 
-# Apply to all numerical columns except target
-for col in num_cols:
-    cap_outliers(df, col)
-
-# Check if outliers are handled
-df.describe()
+# Caps every numerical column to [Q1 - 1.5 * IQR, Q3 + 1.5 * IQR]. The quartiles
+# of all columns are computed in one vectorized pass; the bounds are learned on
+# the training rows after the split below and reused for the test rows
+capper = OutlierCapper(factor=1.5, dtype=np.float32 if compact else np.float64)
 
 """### Outlier Detection - Observations
 - Most numerical features do not have extreme outliers.
@@ -455,14 +465,31 @@ df.describe()
 ## Train-test splitting to prepare for model building. ​
 """
 
-from sklearn.model_selection import train_test_split
+from churn.splits import load_split
+
+# One stratified train (80%) / test (20%) split for the whole notebook: its row
+# positions are drawn once and stored next to the feature cache, and every
+# section below takes its frames from them with split.frames(df) instead of
+# dropping the target and re-splitting (every section uses the same rows, so
+# their results are comparable)
+split = load_split(y, test_size=0.2, random_state=42)
+
+# Learn the capping bounds on the training rows only and apply them everywhere.
+# In compact mode transform_frame keeps the integer columns integer where the
+# bounds allow it, instead of turning every column into a float
+capper.fit(X.iloc[split.train_rows][num_cols])
+if compact:
+    df[num_cols] = capper.transform_frame(df[num_cols])
+else:
+    df[num_cols] = capper.transform(df[num_cols])
 
-# Separate features and target variable
-X = df.drop(columns=["Attrition_Flag"])  # Features
-y = df["Attrition_Flag"]  # Target variable
+X_train, X_test, y_train, y_test = split.frames(df)
 
-# Split into train (80%) and test (20%) sets
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+# Bytes and dtypes of each stage so far
+memory_report({"loaded": X, "capped": df, "split": (X_train, X_test)})
+
+# Check if outliers are handled
+pd.DataFrame({"lower": capper.lower_, "upper": capper.upper_}, index=num_cols)
 
 # Display shapes to confirm split
 X_train.shape, X_test.shape, y_train.shape, y_test.shape
@@ -479,37 +506,35 @@ Next, we'll start model building with five different algorithms
 We’ll create clusters of customers based on selected behavior-related features (like usage, income proxy, and transactions), then profile these clusters.
 """
 
-from sklearn.cluster import KMeans
-
 # Selecting features for clustering
-cluster_features = ['Total_Trans_Amt', 'Total_Trans_Ct', 'Avg_Utilization_Ratio', 'Credit_Limit', 'Months_Inactive_12_mon']
+cluster_features = CLUSTER_FEATURES
 
-# Standardize
-scaler = StandardScaler()
-scaled_features = scaler.fit_transform(df[cluster_features])
-
-# Elbow Method to find optimal clusters
-inertia = []
-for k in range(1, 10):
-    kmeans = KMeans(n_clusters=k, random_state=42)
-    kmeans.fit(scaled_features)
-    inertia.append(kmeans.inertia_)
+# Elbow Method to find optimal clusters (standardized features, k = 1..9). The
+# features are standardized once and the nine k-means fits run in parallel; on
+# large snapshots pass mode="minibatch" for mini-batch k-means
+inertia = elbow_inertia(df, range(1, 10), cluster_features, n_jobs=-1)
+print("Knee of the inertia curve at k =", inertia.attrs["knee"])
 
 # Plot
 plt.figure(figsize=(8, 4))
 plt.plot(range(1, 10), inertia, marker='o')
+plt.axvline(inertia.attrs["knee"], color="grey", linestyle="--")
 plt.title('Elbow Method for Optimal K')
 plt.xlabel('No. of Clusters')
 plt.ylabel('Inertia')
 plt.show()
 
 # Choose k=4 based on elbow curve
-kmeans = KMeans(n_clusters=4, random_state=42)
-df['Customer_Cluster'] = kmeans.fit_predict(scaled_features)
+segments = fit_segments(df, n_clusters=4, features=cluster_features)
+df['Customer_Cluster'] = assign_segments(df, segments)
+
+# The scaler and the 4 centroids are all a segmentation needs: new customers
+# get their Customer_Cluster from a nearest-centroid lookup, without a refit
+#   assign_segments(new_customers, churn.cluster.Segments.load("segments.npz"))
+segments.save("segments.npz")
 
 # Analyze clusters
-cluster_profile = df.groupby('Customer_Cluster')[cluster_features].mean()
-print(cluster_profile)
+print(cluster_profile(df, df['Customer_Cluster'], cluster_features))
 
 """# Model Building (Original Data)
 
@@ -538,50 +563,21 @@ print(cluster_profile)
 # Check columns with missing values
 print(df.isnull().sum()[df.isnull().sum() > 0])
 
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.ensemble import RandomForestClassifier, AdaBoostClassifier, GradientBoostingClassifier
-from xgboost import XGBClassifier
-from sklearn.metrics import accuracy_score, classification_report, roc_auc_score
-
-# Dictionary to store model performances
-model_performance = {}
-
-# Function to train and evaluate a model
-def train_evaluate_model(model, model_name):
-    model.fit(X_train, y_train)
-    y_pred = model.predict(X_test)
-    y_prob = model.predict_proba(X_test)[:, 1]
-
-    # Compute metrics
-    accuracy = accuracy_score(y_test, y_pred)
-    roc_auc = roc_auc_score(y_test, y_prob)
-    report = classification_report(y_test, y_pred, output_dict=True)
-
-    # Store performance
-    model_performance[model_name] = {
-        "Accuracy": accuracy,
-        "ROC-AUC": roc_auc,
-        "Precision": report["1"]["precision"],
-        "Recall": report["1"]["recall"],
-        "F1-Score": report["1"]["f1-score"],
-    }
-
-# Train models
-models = {
-    "Decision Tree": DecisionTreeClassifier(random_state=42),
-    "Random Forest": RandomForestClassifier(random_state=42),
-    "XGBoost": XGBClassifier(use_label_encoder=False, eval_metric="logloss", random_state=42),
-    "AdaBoost": AdaBoostClassifier(random_state=42),
-    "Gradient Boosting": GradientBoostingClassifier(random_state=42)
-}
-
-for name, model in models.items():
-    train_evaluate_model(model, name)
-
-# Convert results to DataFrame for better visualization
-model_results_df = pd.DataFrame(model_performance).T
+# Decision Tree, Random Forest, XGBoost, AdaBoost and Gradient Boosting, fitted
+# in parallel on the training rows and scored on the test rows (ROC-AUC from
+# predicted probabilities)
+model_results = train_zoo(X_train, y_train, X_test, y_test, strategies=("none",))
+model_results_df = model_results.set_index("Model")[list(METRIC_NAMES)]
 model_results_df
 
+# Accuracy parity of the compact dtype mode, only checked when it is on (it
+# refits the five models twice): the models fitted on these frames and on
+# their compact copies; max_difference is the largest metric difference
+if compact:
+    parity = dtype_parity(X_train, y_train, X_test, y_test)
+    print(parity.attrs)
+    display(parity)
+
 """#### Observation :
 - Best Overall Model: XGBoost
 
@@ -609,19 +605,16 @@ model_results_df
 ## Using SMOTE to handle class imbalance
 """
 
-from imblearn.over_sampling import SMOTE
-from sklearn.model_selection import train_test_split
+from churn.sampling import BatchedSMOTE
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
 
-# Separate features and target
-X = df.drop("Attrition_Flag", axis=1)
-y = df["Attrition_Flag"]
+# Same train/test rows as the baseline models (now with the cluster column)
+X_train, X_test, y_train, y_test = split.frames(df)
 
-# Train-test split
-X_train, X_test, y_train, y_test = train_test_split(X, y, stratify=y, test_size=0.3, random_state=42)
-
-# Apply SMOTE to oversample the minority class
-smote = SMOTE(random_state=42)
+# Apply SMOTE to oversample the minority class: the neighbour search runs in
+# batches on all cores and the oversampled rows are written into one float32
+# buffer instead of a stacked copy of the training set
+smote = BatchedSMOTE(random_state=42)
 X_train_oversampled, y_train_oversampled = smote.fit_resample(X_train, y_train)
 
 # Check class distribution
@@ -630,41 +623,13 @@ print("\nAfter Oversampling:\n", y_train_oversampled.value_counts())
 
 """## Training Models on Oversampled Data"""
 
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.ensemble import RandomForestClassifier, AdaBoostClassifier, GradientBoostingClassifier
-from xgboost import XGBClassifier
-
-models_os = {
-    "Decision Tree": DecisionTreeClassifier(random_state=42),
-    "Random Forest": RandomForestClassifier(random_state=42),
-    "XGBoost": XGBClassifier(use_label_encoder=False, eval_metric="logloss", random_state=42),
-    "AdaBoost": AdaBoostClassifier(random_state=42),
-    "Gradient Boosting": GradientBoostingClassifier(random_state=42)
-}
-
-# Store results
-results_os = []
-
-# Evaluation function
-def train_evaluate_model_os(model, name):
-    model.fit(X_train_oversampled, y_train_oversampled)
-    y_pred = model.predict(X_test)
-    results_os.append({
-        "Model": name,
-        "Accuracy": accuracy_score(y_test, y_pred),
-        "ROC-AUC": roc_auc_score(y_test, y_pred),
-        "Precision": precision_score(y_test, y_pred),
-        "Recall": recall_score(y_test, y_pred),
-        "F1-Score": f1_score(y_test, y_pred)
-    })
-
-# Run for each model
-for name, model in models_os.items():
-    train_evaluate_model_os(model, name)
-
-# Show results
-import pandas as pd
-results_df_os = pd.DataFrame(results_os)
+# The oversampled, undersampled and class-weighted variants of the five models
+# are fitted together on one process pool sharing the machine's cores; the
+# undersampled and weighted fits are discussed further below. Only SMOTE adds
+# rows: undersampling indexes X_train and weighting reuses it as it is
+zoo_results = train_zoo(X_train, y_train, X_test, y_test,
+                        strategies=("smote", "under", "weight"))
+results_df_os = zoo_results[zoo_results["Sampling"] == "smote"].drop(columns="Sampling")
 results_df_os.sort_values(by="F1-Score", ascending=False)
 
 """## Key insights
@@ -677,42 +642,29 @@ results_df_os.sort_values(by="F1-Score", ascending=False)
 ##  Model Building – Undersampled Data
 """
 
-from imblearn.under_sampling import RandomUnderSampler
+from churn.sampling import undersample_rows
 
-# Apply undersampling to the training data
-rus = RandomUnderSampler(random_state=42)
-X_train_under, y_train_under = rus.fit_resample(X_train, y_train)
+# Apply undersampling to the training data: the rows RandomUnderSampler(random_state=42)
+# keeps, as positions into X_train instead of a copied frame
+under_rows = undersample_rows(y_train, random_state=42)
 
 # Check new class distribution
 print("Before Undersampling:\n", y_train.value_counts())
-print("\nAfter Undersampling:\n", y_train_under.value_counts())
+print("\nAfter Undersampling:\n", y_train.iloc[under_rows].value_counts())
 
 """## Training the Same 5 Models on Undersampled Data"""
 
-# Store results for undersampling
-results_under = []
-
-# Evaluation function
-def train_evaluate_model_under(model, name):
-    model.fit(X_train_under, y_train_under)
-    y_pred = model.predict(X_test)
-    results_under.append({
-        "Model": name,
-        "Accuracy": accuracy_score(y_test, y_pred),
-        "ROC-AUC": roc_auc_score(y_test, y_pred),
-        "Precision": precision_score(y_test, y_pred),
-        "Recall": recall_score(y_test, y_pred),
-        "F1-Score": f1_score(y_test, y_pred)
-    })
-
-# Train and evaluate
-for name, model in models_os.items():
-    train_evaluate_model_under(model, name)
-
-# Show results
-results_df_under = pd.DataFrame(results_under)
+# Results of the undersampled models fitted above
+results_df_under = zoo_results[zoo_results["Sampling"] == "under"].drop(columns="Sampling")
 results_df_under.sort_values(by="F1-Score", ascending=False)
 
+"""## Class Weights Instead of Oversampling"""
+
+# Same rebalancing as oversampling without any new rows: every row of X_train
+# is fitted with a weight that gives both classes the same total weight
+results_df_weight = zoo_results[zoo_results["Sampling"] == "weight"].drop(columns="Sampling")
+results_df_weight.sort_values(by="F1-Score", ascending=False)
+
 """## Key insights -
 
 - XGBoost remains the strongest performer:
@@ -732,49 +684,37 @@ Lower precision and F1, indicating higher false positives — not ideal for prod
 
 - Use a stratified KFold for balanced validation.
 
-- Tune with RandomizedSearchCV.
+- Tune with a budgeted successive-halving search: many configurations are tried with a few trees and only the best are promoted to more trees, until the time budget is spent.
 
 - Evaluate on the test set using the same metrics: Accuracy, ROC-AUC, Precision, Recall, F1-score.
 
 ### Random Forest - Tuning
 """
 
-# Prepare features and target
-X = df.drop("Attrition_Flag", axis=1)
-y = df["Attrition_Flag"]
+# Same train/test rows as every other section
+X_train, X_test, y_train, y_test = split.frames(df)
 
-# Train-test split
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, stratify=y, random_state=42, test_size=0.2
-)
+# Every search validates on the same 3 shuffled stratified folds of the
+# training rows, stored with the split
+tuning_folds = split.folds(3)
 
-# Stratified K-Fold cross-validator
-cv = StratifiedKFold(n_splits=3, shuffle=True, random_state=42)  # Reduced to 3 for speed
-
-# Reduced parameter grid for faster RandomizedSearchCV
-rf_params = {
-    "n_estimators": [100, 200],               # reduced from 3 values to 2
-    "max_depth": [None, 10, 20],              # reduced to 3 values
-    "min_samples_split": [2, 5],              # reduced
-    "min_samples_leaf": [1, 2],               # reduced
-    "bootstrap": [True]                       # single value for now
-}
-
-# Random Forest with RandomizedSearchCV
-rf = RandomForestClassifier(random_state=42)
-rf_search = RandomizedSearchCV(
-    rf,
-    rf_params,
-    cv=cv,
-    n_iter=10,                  # reduced to 10 to avoid long execution
-    scoring='f1',
-    random_state=42,
-    n_jobs=-1,
-    verbose=1
-)
+# Upper bound on the wall-clock seconds of each model's search
+TUNING_BUDGET = 120
+
+# On full-size data a search can run for hours. CheckpointedSearch keeps every
+# finished (candidate, fold) fit in a store directory: re-running the cell after
+# a kernel crash resumes where it stopped, and `python -m churn.checkpoint
+# tuning/rf_store` started from other shells adds workers to the same queue
+# from churn.checkpoint import CheckpointedSearch
+# rf_search = CheckpointedSearch("Random Forest", "tuning/rf_store", n_iter=50,
+#                                n_jobs=-1).fit(X_train, y_train)
 
-# Fit the search
-rf_search.fit(X_train, y_train)
+# Successive halving over churn.tune.SEARCH_SPACES: 3 shuffled stratified folds,
+# F1, the best third of each rung promoted to 3x more trees (10 -> 270 trees for
+# the forest, see churn.tune.TREE_RANGES). One Hyperband pass runs, or less if
+# TUNING_BUDGET seconds run out first
+rf_search = HalvingSearch("Random Forest", time_budget=TUNING_BUDGET,
+                          cv=tuning_folds).fit(X_train, y_train)
 
 # Best model
 best_rf = rf_search.best_estimator_
@@ -785,87 +725,47 @@ print("F1 Score:", f1_score(y_test, y_pred))
 
 """### Random Forest - Tuning"""
 
-from sklearn.ensemble import GradientBoostingClassifier
-
-gb_params = {
-    'n_estimators': [100, 150],       # Reduced values
-    'learning_rate': [0.05, 0.1],     # Balanced learning rates
-    'max_depth': [3, 4],              # Commonly effective depths
-    'subsample': [0.8],               # Only one to reduce space
-    'min_samples_split': [2, 5]
-}
-
-gb = GradientBoostingClassifier(random_state=42)
-
-gb_search = RandomizedSearchCV(
-    gb,
-    gb_params,
-    cv=2,                            #  reduced to 2 folds
-    n_iter=5,                        # trying just 5 combinations
-    scoring='f1',
-    random_state=42,
-    n_jobs=-1,
-    verbose=1
-)
-
-gb_search.fit(X_train, y_train)
+# Boosted models stop adding trees once the held-out fold's log-loss has not
+# improved for 20 trees; n_estimators is the best iteration found, not a
+# searched parameter
+gb_search = HalvingSearch("Gradient Boosting", time_budget=TUNING_BUDGET,
+                          early_stopping_rounds=20, cv=tuning_folds).fit(X_train, y_train)
 best_gb = gb_search.best_estimator_
 
 """### XGBoost - Tuning"""
 
-xgb_model = xgb.XGBClassifier(
-    use_label_encoder=False,
-    eval_metric='logloss',
-    random_state=42,
-    n_jobs=-1
-)
-
-xgb_params = {
-    'n_estimators': [100, 150],        # Lowered
-    'learning_rate': [0.05, 0.1],      # Safer, faster
-    'max_depth': [3, 5],               # Efficient range
-    'subsample': [0.8],
-    'colsample_bytree': [0.8]
-}
-
-xgb_search = RandomizedSearchCV(
-    xgb_model,
-    xgb_params,
-    cv=2,
-    n_iter=5,                         # Just 5 iterations
-    scoring='f1',
-    random_state=42,
-    n_jobs=-1,
-    verbose=1
-)
-
-xgb_search.fit(X_train, y_train)
+# The training rows are histogram-binned once per worker; every candidate
+# trained on a fold reuses that fold's binned matrix (churn.binned)
+xgb_search = HalvingSearch("XGBoost", time_budget=TUNING_BUDGET,
+                           early_stopping_rounds=20, cv=tuning_folds).fit(X_train, y_train)
 best_xgb = xgb_search.best_estimator_
+print("Trees chosen by early stopping:", gb_search.best_params_["n_estimators"],
+      xgb_search.best_params_["n_estimators"])
+
+# Flat-array export of the tuned booster (split features, thresholds, children,
+# leaf values) for scoring without the xgboost runtime
+compile_model(best_xgb).save("best_xgb_forest.npz")
 
 """## Evaluating Tuned Models"""
 
-def evaluate_model(model, name):
-    y_pred = model.predict(X_test)
-    y_proba = model.predict_proba(X_test)[:, 1]
-
-    acc = accuracy_score(y_test, y_pred)
-    roc = roc_auc_score(y_test, y_proba)
-    prec = precision_score(y_test, y_pred)
-    rec = recall_score(y_test, y_pred)
-    f1 = f1_score(y_test, y_pred)
-
-    print(f"\n {name} Evaluation:")
-    print(f"Accuracy: {acc:.4f}")
-    print(f"ROC-AUC: {roc:.4f}")
-    print(f"Precision: {prec:.4f}")
-    print(f"Recall: {rec:.4f}")
-    print(f"F1-Score: {f1:.4f}")
-    return [name, acc, roc, prec, rec, f1]
-
-results = []
-results.append(evaluate_model(best_rf, "Random Forest (Tuned)"))
-results.append(evaluate_model(best_gb, "Gradient Boosting (Tuned)"))
-results.append(evaluate_model(best_xgb, "XGBoost (Tuned)"))
+from churn.metrics import evaluate_models, threshold_sweep
+
+# One predict_proba call per model; the test scores are sorted once and every
+# metric (and the F1 at every possible threshold) is read off that sort
+tuned_results = evaluate_models({"Random Forest (Tuned)": best_rf,
+                                 "Gradient Boosting (Tuned)": best_gb,
+                                 "XGBoost (Tuned)": best_xgb}, X_test, y_test)
+display(tuned_results)
+
+# Precision, recall and F1 of the tuned XGBoost at every threshold
+xgb_sweep = threshold_sweep(y_test, best_xgb.predict_proba(X_test)[:, 1])
+plt.figure(figsize=(8, 4))
+for metric in ("precision", "recall", "f1"):
+    plt.plot(xgb_sweep["threshold"], xgb_sweep[metric], label=metric)
+plt.xlabel("Threshold")
+plt.title("XGBoost (Tuned) - Metrics by Threshold")
+plt.legend()
+plt.show()
 
 """##Observations
 --- XGBoost (Tuned) is your top performer across most metrics, especially in:
@@ -894,19 +794,16 @@ from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.ensemble import RandomForestClassifier
 
-# Split features and target
-X = df.drop("Attrition_Flag", axis=1)
-y = df["Attrition_Flag"]
+# Same train/test rows as every other section
+X_train, X_test, y_train, y_test = split.frames(df)
 
 # Numerical & categorical columns
-num_cols = X.select_dtypes(include=['float64', 'int64']).columns.tolist()
-cat_cols = X.select_dtypes(include=['object']).columns.tolist()
+num_cols = list(NUMERIC_COLUMNS)
+cat_cols = X_train.select_dtypes(include=['object']).columns.tolist()
 
-# Preprocessor
-preprocessor = ColumnTransformer(transformers=[
-    ("num", StandardScaler(), num_cols),
-    ("cat", OneHotEncoder(drop="first", handle_unknown='ignore'), cat_cols)
-])
+# Preprocessor: IQR capping (fit on the training rows) + scaling for numerical
+# columns, one-hot encoding for categorical columns
+preprocessor = build_preprocessor(num_cols, cat_cols, dtype=np.float32 if compact else np.float64)
 
 # Pipeline with classifier
 rf_pipeline = Pipeline(steps=[
@@ -914,10 +811,6 @@ rf_pipeline = Pipeline(steps=[
     ("classifier", RandomForestClassifier(random_state=42))
 ])
 
-# Train-test split
-from sklearn.model_selection import train_test_split
-X_train, X_test, y_train, y_test = train_test_split(X, y, stratify=y, test_size=0.2, random_state=42)
-
 # Fit the model
 rf_pipeline.fit(X_train, y_train)
 
@@ -925,24 +818,20 @@ from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from xgboost import XGBClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score
+from sklearn.metrics import (ConfusionMatrixDisplay, classification_report, confusion_matrix,
+                             roc_auc_score)
 
-# Re-split just in case
-X = df.drop("Attrition_Flag", axis=1)
-y = df["Attrition_Flag"]
+# Same train/test rows as every other section
+X_train, X_test, y_train, y_test = split.frames(df)
 
 # Identify numeric and categorical columns
-numeric_features = X.select_dtypes(include=['int64', 'float64']).columns.tolist()
-categorical_features = X.select_dtypes(include=['object']).columns.tolist()
-
-# Define transformers
-preprocessor = ColumnTransformer(
-    transformers=[
-        ("num", StandardScaler(), numeric_features),
-        ("cat", OneHotEncoder(drop="first", handle_unknown="ignore"), categorical_features)
-    ]
-)
+numeric_features = list(NUMERIC_COLUMNS)
+categorical_features = X_train.select_dtypes(include=['object']).columns.tolist()
+
+# Define transformers (the fitted capping bounds travel with the pipeline, so
+# raw customer data can be scored with it directly)
+preprocessor = build_preprocessor(numeric_features, categorical_features,
+                                  dtype=np.float32 if compact else np.float64)
 
 # Define the full pipeline with XGBoost
 xgb_pipeline = Pipeline(steps=[
@@ -950,11 +839,6 @@ xgb_pipeline = Pipeline(steps=[
     ("classifier", XGBClassifier(use_label_encoder=False, eval_metric="logloss", random_state=42))
 ])
 
-# Split the data
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, stratify=y, test_size=0.2, random_state=42
-)
-
 # Fit the pipeline
 xgb_pipeline.fit(X_train, y_train)
 
@@ -966,10 +850,38 @@ print("Classification Report:\n", classification_report(y_test, y_pred))
 print("Confusion Matrix:\n", confusion_matrix(y_test, y_pred))
 print("ROC-AUC Score:", roc_auc_score(y_test, y_proba))
 
+# Save the fitted pipeline for batch scoring:
+#   python -m churn.score xgb_pipeline.joblib customers.csv scores.csv --workers 8
+# Customer_Cluster is not in the raw files; the pipeline only reads the
+# numeric columns, so it is left out of the columns scoring has to build
+score_columns = X_train.columns.drop("Customer_Cluster")
+save_model("xgb_pipeline.joblib", xgb_pipeline, score_columns, fill_values,
+           config={"compact": compact})
+
+# Same pipeline with the booster exported to flat NumPy arrays: scoring
+# workers that load it never import xgboost
+xgb_pipeline_compiled = compile_model(xgb_pipeline)
+print("Max |diff| vs xgboost:",
+      np.abs(xgb_pipeline_compiled.predict_proba(X_test) - xgb_pipeline.predict_proba(X_test)).max())
+save_model("xgb_pipeline_compiled.joblib", xgb_pipeline_compiled, score_columns, fill_values,
+           config={"compact": compact})
+
 ConfusionMatrixDisplay.from_estimator(xgb_pipeline, X_test, y_test, cmap="Blues")
 plt.title("Confusion Matrix - XGBoost Pipeline")
 plt.show()
 
+# Tuning the whole pipeline: PipelineSearch fits the ColumnTransformer once per
+# fold and caches the transformed folds on disk, so every candidate (and any
+# later search over the same folds, e.g. of rf_pipeline) reuses them instead
+# of refitting the scaler and encoder
+xgb_pipeline_search = PipelineSearch(
+    xgb_pipeline,
+    {f"classifier__{key}": values for key, values in PARAM_GRIDS["XGBoost"].items()},
+    n_iter=8, cv=split.folds(3),
+).fit(X_train, y_train)
+print("Best pipeline parameters:", xgb_pipeline_search.best_params_)
+print("Fold cache:", xgb_pipeline_search.cache_stats_)
+
 """- High Recall (86%) for churners: We are catching the majority of customers likely to leave, which is critical for retention strategies.
 
 - Low False Positive Rate: Only 24 non-churners misclassified as churn — manageable for customer outreach.
@@ -982,12 +894,28 @@ plt.show()
 # Final model results
 import pandas as pd
 
-results_df = pd.DataFrame(results, columns=["Model", "Accuracy", "ROC-AUC", "Precision", "Recall", "F1-Score"])
-results_df = results_df.sort_values(by="F1-Score", ascending=False)
+results_df = tuned_results.reset_index().sort_values(by="F1-Score", ascending=False)
 display(results_df)
 
+from churn.intervals import bootstrap_models, repeated_cv
+
+tuned_models = {"Random Forest (Tuned)": best_rf, "Gradient Boosting (Tuned)": best_gb,
+                "XGBoost (Tuned)": best_xgb}
+
+# 95% bootstrap intervals of every metric: 2000 resamples of the test rows,
+# shared by all models, evaluated as batched array operations over each
+# model's sorted scores. P(best) is the share of resamples a model wins
+tuned_intervals = bootstrap_models(tuned_models, X_test, y_test)
+display(tuned_intervals.xs("F1-Score", level="Metric"))
+display(tuned_intervals.xs("ROC-AUC", level="Metric"))
+
+# The same comparison over 3 x 5-fold repeated CV on the training rows, with
+# Nadeau-Bengio corrected t-intervals (the tuned settings are refitted per fold)
+cv_intervals = repeated_cv(tuned_models, X_train, y_train, n_repeats=3, n_jobs=-1)
+display(cv_intervals.xs("F1-Score", level="Metric"))
+
 """## Final Model Selection
-Based on F1-score and ROC-AUC, **XGBoost (Tuned)** outperforms all other models with strong recall, making it ideal for identifying churn-prone customers.
+Based on F1-score and ROC-AUC, **XGBoost (Tuned)** outperforms all other models with strong recall, making it ideal for identifying churn-prone customers. Where the confidence intervals of the tuned models overlap, P(best) shows how often that ranking holds across resamples.
 
 ## Bar Plot of Model Comparison
 """
@@ -0,0 +1,115 @@
+"""XGBoost fit time with per-fit binning vs a shared ``BinnedSplit``.
+
+Replays the XGBoost fits the notebook makes on one training split, one at a
+time on a single thread:
+
+- the zoo's baseline, SMOTE and undersampled fits;
+- every candidate of the ``PARAM_GRIDS`` search on every fold;
+- the early-stopping search over the same grid without ``n_estimators``.
+
+Each stage runs twice. First ``XGBClassifier.fit`` re-bins its frames on
+every call; then the fits train on matrices from one ``BinnedSplit`` (fold
+matrices kept per fold). Reports seconds, matrices binned and mean F1 of
+both.
+
+    python benchmarks/bench_binned.py BankChurners.csv
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from churn.binned import BinnedSplit, fit_binned  # noqa: E402
+from churn.cache import load_features  # noqa: E402
+from churn.train import make_model, resample  # noqa: E402
+from churn.tune import DEFAULT_PATIENCE, PARAM_GRIDS, SEARCH_SETTINGS, _splitter  # noqa: E402
+
+
+def zoo_fits(X_train, y_train):
+    """(params, fit frames, eval frames, strategy, fold) of the zoo's XGBoost fits."""
+    for strategy in ("none", "smote", "under"):
+        X_fit, y_fit = resample(X_train, y_train, strategy, 42)
+        yield {}, (X_fit, y_fit), None, strategy, None
+
+
+def search_fits(X_train, y_train, folds, early_stopping):
+    from sklearn.model_selection import ParameterGrid
+
+    grid = dict(PARAM_GRIDS["XGBoost"])
+    if early_stopping:
+        grid.pop("n_estimators")
+    for params in ParameterGrid(grid):
+        if early_stopping:
+            params = {**params, "n_estimators": 1000, "early_stopping_rounds": DEFAULT_PATIENCE}
+        for fold, (train, valid) in enumerate(folds):
+            fit = (X_train.iloc[train], y_train.iloc[train])
+            valid_rows = (X_train.iloc[valid], y_train.iloc[valid])
+            yield params, fit, valid_rows, (train, valid), fold
+
+
+def run(fits, binned):
+    """Seconds and F1 scores of the fits, on frames (binned=None) or binned matrices."""
+    from sklearn.metrics import f1_score
+
+    scores = []
+    start = time.perf_counter()
+    for params, (X_fit, y_fit), valid_rows, source, fold in fits:
+        model = make_model("XGBoost", n_jobs=1, **params)
+        eval_rows = valid_rows
+        if binned is None:
+            eval_set = [valid_rows] if "early_stopping_rounds" in params else None
+            model.fit(X_fit, y_fit, eval_set=eval_set, verbose=False)
+        else:
+            if fold is None:
+                matrix = binned.matrix if source == "none" else binned.quantize(X_fit, y_fit)
+                eval_matrix = None
+            else:
+                train, valid = source
+                matrix = binned.subset(train, key=("train", fold))
+                eval_matrix = None
+                if "early_stopping_rounds" in params:
+                    eval_matrix = binned.subset(valid, key=("valid", fold), ref=matrix)
+            fit_binned(model, matrix, eval_matrix)
+        if eval_rows is not None:
+            scores.append(f1_score(eval_rows[1], model.predict(eval_rows[0])))
+    return time.perf_counter() - start, np.mean(scores) if scores else np.nan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("data", help="customer file (.csv or .parquet)")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    from sklearn.model_selection import train_test_split
+
+    X, y = load_features(args.data)
+    X_train, _, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    folds = list(_splitter("XGBoost", None, 42).split(X_train, y_train))
+    n_folds = SEARCH_SETTINGS["XGBoost"]["cv"]
+    stages = [("zoo (3 fits)", list(zoo_fits(X_train, y_train))),
+              (f"grid search ({n_folds} folds)", list(search_fits(X_train, y_train, folds, False))),
+              ("early stopping", list(search_fits(X_train, y_train, folds, True)))]
+
+    print(f"{'stage':<24}{'fits':>6}{'frames s':>10}{'binned s':>10}{'matrices':>10}"
+          f"{'F1 frames':>11}{'F1 binned':>11}")
+    total = [0.0, 0.0]
+    for label, fits in stages:
+        frame_seconds, frame_f1 = run(fits, None)
+        binned = BinnedSplit(X_train, y_train, n_jobs=1)
+        binned_seconds, binned_f1 = run(fits, binned)
+        total[0] += frame_seconds
+        total[1] += binned_seconds
+        print(f"{label:<24}{len(fits):>6}{frame_seconds:>10.2f}{binned_seconds:>10.2f}"
+              f"{binned.built:>10}{frame_f1:>11.3f}{binned_f1:>11.3f}")
+    print(f"{'total':<24}{'':>6}{total[0]:>10.2f}{total[1]:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Categorical encoding: ``pd.get_dummies`` columns vs integer codes.
+
+The customer file is loaded and grown to ``--rows`` by sampling its rows
+with replacement, then prepared twice with ``prepare_features``:
+
+- ``encoding="onehot"``: the notebook's dense dummy columns;
+- ``encoding="codes"``: one int8-coded ``category`` column per feature.
+
+Reports the columns, bytes and encoding seconds of each. Each model of
+``--models`` is then fitted on both: on the dummies, and with
+``make_model(..., encoding="codes")`` on the codes (XGBoost's native
+categorical splits, ``OneHotCodes`` in front of the other models), and the
+fit seconds are reported. ``--sparse`` adds a fit of the other models on
+``OneHotCodes``' CSR output.
+
+    python benchmarks/bench_categorical.py BankChurners.csv --rows 1000000 --n-jobs -1
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from churn.data import load_churn_data  # noqa: E402
+from churn.features import OneHotCodes, prepare_features  # noqa: E402
+from churn.train import MODEL_NAMES, make_model  # noqa: E402
+
+
+def timed_fit(model, X, y):
+    start = time.perf_counter()
+    model.fit(X, y)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("data", help="customer file (.csv or .parquet)")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--models", nargs="+", default=list(MODEL_NAMES))
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--sparse", action="store_true")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    base = load_churn_data(args.data)
+    df = base.iloc[np.random.default_rng(0).integers(0, len(base), args.rows)]
+    df = df.reset_index(drop=True)
+    prepared = {}
+    print(f"{args.rows} rows")
+    print(f"{'encoding':<10}{'columns':>9}{'MB':>9}{'seconds':>9}")
+    for encoding in ("onehot", "codes"):
+        start = time.perf_counter()
+        X, y = prepare_features(df, {"encoding": encoding})
+        seconds = time.perf_counter() - start
+        prepared[encoding] = X
+        print(f"{encoding:<10}{X.shape[1]:>9}{X.memory_usage(deep=True).sum() / 1e6:>9.1f}"
+              f"{seconds:>9.2f}")
+
+    print(f"{'model':<20}{'input':<16}{'fit seconds':>12}")
+    for name in args.models:
+        runs = [("dummies", make_model(name, n_jobs=args.n_jobs), prepared["onehot"]),
+                ("codes", make_model(name, n_jobs=args.n_jobs, encoding="codes"),
+                 prepared["codes"])]
+        if args.sparse and name != "XGBoost":
+            runs.append(("codes, CSR", make_model(name, n_jobs=args.n_jobs),
+                         OneHotCodes().fit(prepared["codes"]).transform(prepared["codes"])))
+        for label, model, X in runs:
+            print(f"{name:<20}{label:<16}{timed_fit(model, X, y):>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Pipeline memory: float64 frames vs the opt-in compact dtype mode.
+
+The customer file is loaded and grown to ``--rows`` by sampling its rows
+with replacement, then run through the notebook's stages twice, once as
+float64 and once with ``compact=True`` (the fixed ``COMPACT_SCHEMA`` types:
+float32, uint32 customer IDs):
+
+- ``load_churn_data``, ``prepare_features`` and the train/test split;
+- ``OutlierCapper`` on the numeric columns (``transform_frame`` when
+  compact, so integer columns stay integer);
+- ``BatchedSMOTE`` on the training rows and the scaled matrix of
+  ``build_preprocessor``.
+
+Prints ``memory_report`` of each stage, then ``dtype_parity`` of
+``--models`` fitted on the float64 and the compact split.
+
+    python benchmarks/bench_compact.py BankChurners.csv --rows 1000000
+"""
+
+import argparse
+import os
+import sys
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from churn.data import NUMERIC_COLUMNS, load_churn_data, memory_report  # noqa: E402
+from churn.features import OutlierCapper, build_preprocessor, prepare_features  # noqa: E402
+from churn.sampling import BatchedSMOTE  # noqa: E402
+from churn.train import MODEL_NAMES, dtype_parity  # noqa: E402
+
+
+def stages(df, compact):
+    from sklearn.model_selection import train_test_split
+
+    dtype = np.float32 if compact else np.float64
+    X, y = prepare_features(df, {"compact": compact})
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42,
+                                                        stratify=y)
+    capper = OutlierCapper(dtype=dtype).fit(X_train[NUMERIC_COLUMNS])
+    capped = X_train.copy()
+    capped[NUMERIC_COLUMNS] = (capper.transform_frame(capped[NUMERIC_COLUMNS]) if compact
+                               else capper.transform(capped[NUMERIC_COLUMNS]))
+    resampled, _ = BatchedSMOTE(random_state=42).fit_resample(capped, y_train)
+    scaled = build_preprocessor(NUMERIC_COLUMNS, [], dtype=dtype).fit_transform(capped)
+    report = memory_report({"load": df, "features": X, "split": (X_train, X_test),
+                            "capped": capped, "SMOTE": resampled, "scaled": scaled})
+    return report, (X_train, y_train, X_test, y_test)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("data", help="customer file (.csv or .parquet)")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--models", nargs="+", default=list(MODEL_NAMES))
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    rows = None
+    for compact in (False, True):
+        base = load_churn_data(args.data, compact=compact)
+        if rows is None:
+            rows = np.random.default_rng(0).integers(0, len(base), args.rows)
+        report, split = stages(base.iloc[rows].reset_index(drop=True), compact)
+        print(f"{'compact' if compact else 'float64'}, {args.rows} rows")
+        print(report.round(2).to_string(), end="\n\n")
+        if not compact:
+            X_train, y_train, X_test, y_test = split
+    parity = dtype_parity(X_train, y_train, X_test, y_test, names=args.models)
+    print(parity.round(4).to_string())
+    print(f"training frame {parity.attrs['bytes'] / 1e6:.1f} MB -> "
+          f"{parity.attrs['compact_bytes'] / 1e6:.1f} MB, "
+          f"largest metric difference {parity.attrs['max_difference']:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Search cost with ``n_estimators`` as a grid dimension vs early stopping.
+
+For XGBoost and Gradient Boosting, runs ``RandomizedSearchCV`` over the
+notebook grid (``n_estimators`` in [100, 150]) and ``EarlyStoppingSearch``
+over the same grid without ``n_estimators``, on the same folds. By default
+both visit every combination of their grid. Reports wall time, trees fitted
+during the search, best CV F1, test F1 of the refit winner and its number of
+trees.
+
+    python benchmarks/bench_early_stopping.py BankChurners.csv
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from churn.cache import load_features  # noqa: E402
+from churn.tune import (EARLY_STOPPING_MODELS, PARAM_GRIDS, SEARCH_SETTINGS,  # noqa: E402
+                        EarlyStoppingSearch, tune_model)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("data", help="customer file (.csv or .parquet)")
+    parser.add_argument("--models", nargs="+", default=list(EARLY_STOPPING_MODELS))
+    parser.add_argument("--notebook-budget", action="store_true",
+                        help="sample the notebook's n_iter candidates instead of the full grids")
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    from sklearn.metrics import f1_score
+    from sklearn.model_selection import ParameterGrid, train_test_split
+
+    X, y = load_features(args.data)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42,
+                                                        stratify=y)
+    print(f"{'model':<18}{'search':<16}{'seconds':>8}{'fits':>6}{'trees':>8}"
+          f"{'CV F1':>8}{'test F1':>9}{'n_trees':>9}")
+    for name in args.models:
+        grid = PARAM_GRIDS[name]
+        n_folds = SEARCH_SETTINGS[name]["cv"]
+        n_iter = SEARCH_SETTINGS[name]["n_iter"] if args.notebook_budget else None
+
+        start = time.perf_counter()
+        search = tune_model(name, X_train, y_train, n_iter=n_iter or len(ParameterGrid(grid)),
+                            n_jobs=args.n_jobs)
+        seconds = time.perf_counter() - start
+        params = search.cv_results_["params"]
+        trees = sum(p["n_estimators"] for p in params) * n_folds
+        rows = [("grid n_trees", seconds, len(params) * n_folds, trees, search.best_score_,
+                 search.best_estimator_, search.best_params_["n_estimators"])]
+
+        reduced = {key: values for key, values in grid.items() if key != "n_estimators"}
+        start = time.perf_counter()
+        es = EarlyStoppingSearch(name, n_iter=n_iter or len(ParameterGrid(reduced)),
+                                 n_jobs=args.n_jobs).fit(X_train, y_train)
+        seconds = time.perf_counter() - start
+        rows.append(("early stopping", seconds, len(es.cv_results_) * n_folds, es.trees_built_,
+                     es.best_score_, es.best_estimator_, es.best_params_["n_estimators"]))
+
+        for label, seconds, fits, trees, cv_f1, model, n_trees in rows:
+            test_f1 = f1_score(y_test, model.predict(X_test))
+            print(f"{name:<18}{label:<16}{seconds:>8.1f}{fits:>6}{trees:>8}"
+                  f"{cv_f1:>8.3f}{test_f1:>9.3f}{n_trees:>9}")
+
+
+if __name__ == "__main__":
+    main()
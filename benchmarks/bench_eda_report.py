@@ -0,0 +1,81 @@
+"""EDA figure time: seaborn on raw rows vs the pre-aggregated ``churn.report``.
+
+The customer file is loaded and grown to each ``--rows`` size by sampling
+its rows with replacement. The EDA figures are then drawn twice, to PNG
+files in a temporary directory:
+
+- the notebook's old way: seaborn ``histplot`` with KDE, ``boxplot`` and
+  ``scatterplot`` of every row, one figure after the other;
+- ``build_report``: one aggregation pass and all report figures rendered on
+  ``--workers`` processes.
+
+Reports the seconds of each. The seaborn time grows with the rows; the
+report's rendering time does not, only its aggregation pass does.
+
+    python benchmarks/bench_eda_report.py BankChurners.csv --rows 1000000 --workers -1
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from churn.data import TARGET, load_churn_data  # noqa: E402
+from churn.report import NUMERIC_FEATURES, build_report  # noqa: E402
+
+
+def seaborn_figures(df, out_dir):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig = plt.figure(figsize=(15, 15))
+    for i, feature in enumerate(NUMERIC_FEATURES, 1):
+        plt.subplot(4, 4, i)
+        sns.histplot(df[feature], kde=True, bins=20, color="blue")
+    fig.savefig(os.path.join(out_dir, "hist.png"))
+    plt.close(fig)
+    fig = plt.figure(figsize=(15, 15))
+    for i, feature in enumerate(NUMERIC_FEATURES, 1):
+        plt.subplot(4, 4, i)
+        sns.boxplot(x=TARGET, y=feature, data=df)
+    fig.savefig(os.path.join(out_dir, "box.png"))
+    plt.close(fig)
+    fig = plt.figure(figsize=(8, 6))
+    sns.scatterplot(x=df["Total_Trans_Amt"], y=df["Total_Trans_Ct"], hue=df[TARGET], alpha=0.7)
+    fig.savefig(os.path.join(out_dir, "scatter.png"))
+    plt.close(fig)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("data", help="customer file (.csv or .parquet)")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--workers", type=int, default=-1)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+    base = load_churn_data(args.data)
+    rng = np.random.default_rng(0)
+    print(f"{'rows':>10}  {'method':<24}{'seconds':>9}")
+    for n_rows in args.rows:
+        df = base.iloc[rng.integers(0, len(base), n_rows)].reset_index(drop=True)
+        with tempfile.TemporaryDirectory() as out_dir:
+            start = time.perf_counter()
+            seaborn_figures(df, out_dir)
+            print(f"{n_rows:>10}  {'seaborn on raw rows':<24}{time.perf_counter() - start:>9.2f}")
+            start = time.perf_counter()
+            build_report(df, out_dir, workers=args.workers)
+            print(f"{n_rows:>10}  {'build_report':<24}{time.perf_counter() - start:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
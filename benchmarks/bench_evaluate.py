@@ -0,0 +1,87 @@
+"""Hold-out evaluation time: per-metric scikit-learn calls vs ``churn.metrics``.
+
+The five zoo models are fitted on the prepared features of the data file,
+and the test rows are grown to ``--rows`` by sampling them with replacement.
+The models are then scored twice:
+
+- the notebook's old way: ``predict`` and ``predict_proba``, one scikit-learn
+  function per metric, ``classification_report``, and
+  ``precision_recall_curve`` for the threshold sweep;
+- ``evaluate_models``: one ``predict_proba`` per model and one sort of its
+  scores.
+
+Reports the seconds of each and the largest metric difference.
+
+    python benchmarks/bench_evaluate.py BankChurners.csv --rows 2000000
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from churn.cache import load_features  # noqa: E402
+from churn.metrics import METRIC_NAMES, evaluate_models  # noqa: E402
+from churn.splits import load_split  # noqa: E402
+from churn.train import make_models  # noqa: E402
+
+
+def evaluate_per_metric(models, X_test, y_test):
+    """Metrics of every model the way the notebook's old evaluators computed them."""
+    from sklearn.metrics import (accuracy_score, classification_report, f1_score,
+                                 precision_recall_curve, precision_score, recall_score,
+                                 roc_auc_score)
+
+    results = {}
+    for name, model in models.items():
+        y_pred = model.predict(X_test)
+        y_prob = model.predict_proba(X_test)[:, 1]
+        classification_report(y_test, y_pred, output_dict=True)
+        precision, recall, _ = precision_recall_curve(y_test, y_prob)
+        f1 = 2 * precision * recall / np.maximum(precision + recall, 1e-300)
+        results[name] = [accuracy_score(y_test, y_pred), roc_auc_score(y_test, y_prob),
+                         precision_score(y_test, y_pred), recall_score(y_test, y_pred),
+                         f1_score(y_test, y_pred), f1.max()]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("data", help="customer file (.csv or .parquet)")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    X, y = load_features(args.data)
+    split = load_split(y)
+    X_train, X_test, y_train, y_test = split.frames(X.assign(**{y.name: y}))
+    models = make_models()
+    for model in models.values():
+        model.fit(X_train, y_train)
+    rows = np.random.default_rng(0).integers(0, len(X_test), args.rows)
+    X_test, y_test = X_test.iloc[rows], np.asarray(y_test)[rows]
+    print(f"{len(models)} models, {args.rows} test rows")
+
+    start = time.perf_counter()
+    reference = evaluate_per_metric(models, X_test, y_test)
+    per_metric = time.perf_counter() - start
+    start = time.perf_counter()
+    table = evaluate_models(models, X_test, y_test)
+    one_pass = time.perf_counter() - start
+
+    columns = list(METRIC_NAMES) + ["Best F1"]
+    diff = max(np.abs(table.loc[name, columns].to_numpy(float) - values).max()
+               for name, values in reference.items())
+    print(f"{'evaluator':<22}{'seconds':>9}")
+    print(f"{'per-metric sklearn':<22}{per_metric:>9.2f}")
+    print(f"{'evaluate_models':<22}{one_pass:>9.2f}")
+    print(f"max metric diff {diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
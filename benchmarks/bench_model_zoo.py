@@ -0,0 +1,66 @@
+"""Wall-clock of the (model x sampling strategy) grid: serial loops vs ``train_zoo``.
+
+The serial baseline reproduces the notebook: one ``train_models`` loop per
+sampling strategy, each fitting the five models one after another with the
+library defaults. ``train_zoo`` then fits the same 15 tasks on a process pool
+sized by ``--n-jobs``; the metrics of both runs are compared.
+
+    python benchmarks/bench_model_zoo.py BankChurners.csv --n-jobs 8
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from churn.cache import load_features  # noqa: E402
+from churn.train import (METRIC_NAMES, SAMPLING_STRATEGIES, core_budget, make_models,  # noqa: E402
+                         split_budget, train_models, train_zoo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("data", help="customer file (.csv or .parquet)")
+    parser.add_argument("--n-jobs", type=int, default=None, help="core budget (default: all)")
+    parser.add_argument("--skip-serial", action="store_true")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    from sklearn.model_selection import train_test_split
+
+    X, y = load_features(args.data)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42,
+                                                        stratify=y)
+    budget = core_budget(args.n_jobs)
+    outer, inner = split_budget(len(SAMPLING_STRATEGIES) * 5, args.n_jobs)
+    print(f"{len(X_train):,} training rows, budget {budget} cores "
+          f"-> {outer} processes x {inner} threads")
+
+    serial = None
+    if not args.skip_serial:
+        start = time.perf_counter()
+        serial = {strategy: train_models(make_models(), X_train, y_train, X_test, y_test,
+                                         sampling=strategy)
+                  for strategy in SAMPLING_STRATEGIES}
+        serial_seconds = time.perf_counter() - start
+        print(f"serial loops:  {serial_seconds:8.1f}s")
+
+    zoo = train_zoo(X_train, y_train, X_test, y_test, n_jobs=args.n_jobs)
+    zoo_seconds = zoo.attrs["wall_seconds"]
+    print(f"train_zoo:     {zoo_seconds:8.1f}s", end="")
+    if serial is not None:
+        print(f"  (speedup {serial_seconds / zoo_seconds:.2f}x)")
+        diffs = [abs(serial[row["Sampling"]].loc[row["Model"], metric] - row[metric])
+                 for _, row in zoo.iterrows() for metric in METRIC_NAMES]
+        print(f"max metric difference vs serial: {max(diffs):.2g}")
+    else:
+        print()
+    print(zoo.set_index(["Sampling", "Model"])[list(METRIC_NAMES) + ["Fit seconds"]]
+          .round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
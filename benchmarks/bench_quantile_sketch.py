@@ -0,0 +1,139 @@
+"""Exact vs. sketched IQR capping bounds on a large synthetic snapshot.
+
+Compares the bounds (and the time to compute them) of:
+
+- the original per-column ``df[column].quantile`` loop,
+- ``OutlierCapper`` with exact ``np.nanquantile``,
+- ``OutlierCapper.partial_fit`` streaming the rows in chunks,
+- the same stream split across worker processes and merged.
+
+Drift is reported as the largest distance between a sketched and the exact
+bound, in units of the column's IQR, and as the largest rank error of the
+sketched Q1/Q3.
+
+    python benchmarks/bench_quantile_sketch.py --rows 10000000
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from churn.data import NUMERIC_COLUMNS  # noqa: E402
+from churn.features import OutlierCapper  # noqa: E402
+
+
+def make_data(n_rows, seed=0):
+    # Mix of skewed amounts, small integer counts and ratios, shaped like the
+    # numeric columns of the customer file.
+    rng = np.random.default_rng(seed)
+    values = np.empty((n_rows, len(NUMERIC_COLUMNS)))
+    for i in range(len(NUMERIC_COLUMNS)):
+        kind = i % 3
+        if kind == 0:
+            values[:, i] = rng.lognormal(8, 0.9, n_rows)
+        elif kind == 1:
+            values[:, i] = rng.integers(0, 7, n_rows)
+        else:
+            values[:, i] = rng.beta(2, 5, n_rows)
+    return values
+
+
+def original_bounds(df):
+    lower, upper = [], []
+    for column in df.columns:
+        Q1 = df[column].quantile(0.25)
+        Q3 = df[column].quantile(0.75)
+        IQR = Q3 - Q1
+        lower.append(Q1 - 1.5 * IQR)
+        upper.append(Q3 + 1.5 * IQR)
+    return np.array(lower), np.array(upper)
+
+
+def _sketch_partition(args):
+    values, chunksize, rank_error, seed = args
+    capper = OutlierCapper(quantile_error=rank_error, random_state=seed)
+    for start in range(0, len(values), chunksize):
+        capper.partial_fit(values[start:start + chunksize])
+    return capper
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--chunksize", type=int, default=100_000)
+    parser.add_argument("--rank-error", type=float, default=0.01)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    values = make_data(args.rows)
+    df = pd.DataFrame(values, columns=NUMERIC_COLUMNS, copy=False)
+    print(f"{args.rows:,} rows x {values.shape[1]} columns, "
+          f"chunks of {args.chunksize:,}, rank error {args.rank_error}")
+
+    (lower0, upper0), t_loop = timed(original_bounds, df)
+    exact, t_exact = timed(lambda: OutlierCapper().fit(values))
+
+    streamed, t_stream = timed(_sketch_partition,
+                               (values, args.chunksize, args.rank_error, 0))
+
+    def parallel():
+        parts = np.array_split(values, args.workers)
+        jobs = [(part, args.chunksize, args.rank_error, seed) for seed, part in enumerate(parts)]
+        with ProcessPoolExecutor(args.workers) as pool:
+            cappers = list(pool.map(_sketch_partition, jobs))
+        merged = cappers[0]
+        for capper in cappers[1:]:
+            merged.merge(capper)
+        return merged
+
+    merged, t_merged = timed(parallel)
+
+    assert np.allclose(exact.lower_, lower0) and np.allclose(exact.upper_, upper0)
+    iqr = (exact.upper_ - exact.lower_) / 4
+    iqr[iqr == 0] = 1.0
+
+    def drift(capper):
+        bounds = np.abs(np.concatenate([(capper.lower_ - exact.lower_) / iqr,
+                                        (capper.upper_ - exact.upper_) / iqr]))
+        q1, q3 = capper.sketch_.quantile([0.25, 0.75])
+        ranks = []
+        for q, approx in ((0.25, q1), (0.75, q3)):
+            for col in range(values.shape[1]):
+                lo = np.count_nonzero(values[:, col] < approx[col])
+                hi = np.count_nonzero(values[:, col] <= approx[col])
+                # Ties: the value covers every rank in [lo, hi).
+                target = q * len(values)
+                ranks.append(0.0 if lo <= target <= hi
+                             else min(abs(lo - target), abs(hi - target)) / len(values))
+        return bounds.max(), max(ranks), sum(len(level) for level in capper.sketch_.levels)
+
+    rows = [
+        ("per-column loop (original)", t_loop, "-", "-", "-"),
+        ("OutlierCapper exact", t_exact, 0.0, 0.0, "-"),
+    ]
+    for name, capper, seconds in (("sketch, streamed", streamed, t_stream),
+                                  (f"sketch, {args.workers} workers merged", merged, t_merged)):
+        bound_drift, rank_err, size = drift(capper)
+        rows.append((name, seconds, f"{bound_drift:.4f}", f"{rank_err:.4f}", size))
+
+    print(f"\n{'method':<32}{'seconds':>10}{'speedup':>9}{'drift/IQR':>11}{'rank err':>10}{'sketch rows':>13}")
+    for name, seconds, bound_drift, rank_err, size in rows:
+        print(f"{name:<32}{seconds:>10.3f}{t_loop / seconds:>8.1f}x"
+              f"{bound_drift:>11}{rank_err:>10}{size:>13}")
+
+
+if __name__ == "__main__":
+    main()
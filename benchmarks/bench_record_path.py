@@ -0,0 +1,76 @@
+"""Per-record scoring latency: pandas pipeline path vs ``RecordScorer``.
+
+Scores the same raw records one at a time through
+``convert_frame`` + ``score_frame`` (what the service did per batch) and
+through ``churn.fastpath.RecordScorer``, and reports the median and p99
+latency of each along with the largest probability difference.
+
+    python benchmarks/bench_record_path.py xgb_pipeline.joblib BankChurners.csv
+    python benchmarks/bench_record_path.py xgb_pipeline_compiled.joblib BankChurners.csv
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from churn.data import convert_frame  # noqa: E402
+from churn.fastpath import RecordScorer  # noqa: E402
+from churn.score import load_model, score_frame  # noqa: E402
+
+
+def time_calls(fn, records):
+    latencies = np.empty(len(records))
+    results = np.empty(len(records))
+    for i, record in enumerate(records):
+        start = time.perf_counter()
+        results[i] = fn(record)
+        latencies[i] = time.perf_counter() - start
+    return latencies * 1e6, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("model", help="bundle written by churn.score.save_model")
+    parser.add_argument("data", help="CSV file with raw customer records")
+    parser.add_argument("--records", type=int, default=500)
+    args = parser.parse_args()
+
+    bundle = load_model(args.model)
+    raw = pd.read_csv(args.data, nrows=args.records).drop(columns=["Attrition_Flag"],
+                                                          errors="ignore")
+    records = raw.astype(object).where(raw.notna(), None).to_dict("records")
+
+    def pipeline_path(record):
+        frame = convert_frame(pd.DataFrame.from_records([record]), bundle["fill_values"])
+        return score_frame(frame, bundle)["churn_probability"].iloc[0]
+
+    scorer = RecordScorer.from_bundle(bundle)
+    row = np.zeros(scorer.n_features)
+
+    def vector_only(record):
+        scorer._fill_row(record, row)
+        return 0.0
+
+    paths = [("pipeline", pipeline_path),
+             ("fast path", scorer.predict_proba_one),
+             ("  feature vector only", vector_only)]
+    reference = None
+    print(f"{'path':<24}{'p50 us':>10}{'p99 us':>10}{'records/s':>12}{'max diff':>12}")
+    for name, fn in paths:
+        fn(records[0])  # warm-up
+        latencies, results = time_calls(fn, records)
+        if reference is None:
+            reference = results
+        diff = np.abs(results - reference).max() if name != paths[-1][0] else float("nan")
+        p50, p99 = np.percentile(latencies, [50, 99])
+        print(f"{name:<24}{p50:>10.1f}{p99:>10.1f}{1e6 / latencies.mean():>12,.0f}{diff:>12.2g}")
+
+
+if __name__ == "__main__":
+    main()
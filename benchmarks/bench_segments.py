@@ -0,0 +1,79 @@
+"""Segmentation k-sweep and assignment time, old path vs ``churn.cluster``.
+
+The customer file is loaded and the sweep over k = 1..9 runs three ways:
+
+- the notebook's old path: a ``StandardScaler`` + ``KMeans`` pipeline refitted
+  for every k, one after the other;
+- ``elbow_inertia`` with full k-means on ``--n-jobs`` processes;
+- ``elbow_inertia`` with mini-batch k-means.
+
+Then cluster labels for every row are assigned by the k=4 pipeline's
+``predict`` and by ``Segments.predict`` loaded from disk.
+
+    python benchmarks/bench_segments.py BankChurners.csv --n-jobs -1
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from churn.cluster import (CLUSTER_FEATURES, Segments, elbow_inertia,  # noqa: E402
+                           fit_segments)
+from churn.data import load_churn_data  # noqa: E402
+
+
+def pipeline_sweep(df, k_values):
+    from sklearn.cluster import KMeans
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    models = {k: Pipeline([("scale", StandardScaler()),
+                           ("kmeans", KMeans(n_clusters=k, random_state=42))]).fit(
+                               df[CLUSTER_FEATURES]) for k in k_values}
+    return models
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("data", help="customer file (.csv or .parquet)")
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    df = load_churn_data(args.data)
+    k_values = range(1, 10)
+    print(f"{len(df)} rows")
+    print(f"{'sweep':<26}{'seconds':>9}{'knee':>6}")
+    start = time.perf_counter()
+    models = pipeline_sweep(df, k_values)
+    print(f"{'pipeline per k (serial)':<26}{time.perf_counter() - start:>9.2f}{'':>6}")
+    for mode in ("full", "minibatch"):
+        inertia = elbow_inertia(df, k_values, mode=mode, n_jobs=args.n_jobs)
+        print(f"{'elbow_inertia ' + mode:<26}{inertia.attrs['wall_seconds']:>9.2f}"
+              f"{inertia.attrs['knee']:>6}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "segments.npz")
+        fit_segments(df).save(path)
+        segments = Segments.load(path)
+        start = time.perf_counter()
+        reference = models[4].predict(df[CLUSTER_FEATURES])
+        pipeline_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        labels = segments.predict(df)
+        segments_seconds = time.perf_counter() - start
+    print(f"{'assignment':<26}{'seconds':>9}")
+    print(f"{'pipeline predict':<26}{pipeline_seconds:>9.3f}")
+    print(f"{'Segments.predict':<26}{segments_seconds:>9.3f}")
+    print(f"labels agreeing: {np.mean(labels == reference):.4f}")
+
+
+if __name__ == "__main__":
+    main()
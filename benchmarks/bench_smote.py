@@ -0,0 +1,88 @@
+"""Time and peak memory of imblearn's SMOTE vs ``BatchedSMOTE``.
+
+The prepared features of the data file are grown to ``--rows`` rows by
+sampling rows with replacement and adding 1% Gaussian noise per column (so
+that no two rows coincide). Then imblearn's ``SMOTE``, ``BatchedSMOTE``
+with the exact search and ``BatchedSMOTE`` with the IVF index each oversample
+them. Peak memory is the largest tracemalloc total of the calling process
+above what it held before the call. The pool workers additionally hold one
+copy of the minority rows each. "recall" is the share of the exact
+neighbours that the IVF index finds.
+
+    python benchmarks/bench_smote.py BankChurners.csv --rows 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from churn.cache import load_features  # noqa: E402
+from churn.sampling import BatchedSMOTE  # noqa: E402
+
+
+def grow(X, y, n_rows, seed=0):
+    """``n_rows`` noisy rows drawn with replacement from ``(X, y)``."""
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(X), n_rows)
+    values = X.to_numpy(np.float64)[rows]
+    values += rng.normal(size=values.shape) * (0.01 * values.std(axis=0))
+    return (pd.DataFrame(values, columns=X.columns),
+            pd.Series(np.asarray(y)[rows], name=y.name))
+
+
+def measure(sampler, X, y):
+    """(seconds, peak MB, resampled rows, sampler) of one fit_resample."""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    X_res, _ = sampler.fit_resample(X, y)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 2**20, len(X_res), sampler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("data", help="customer file (.csv or .parquet)")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--skip-imblearn", action="store_true")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    from imblearn.over_sampling import SMOTE
+
+    X, y = load_features(args.data)
+    X, y = grow(X, y, args.rows)
+    print(f"{args.rows} rows x {X.shape[1]} columns, {int(y.sum())} minority, "
+          f"input {X.memory_usage(index=False).sum() / 2**20:.0f} MB")
+    runs = [("BatchedSMOTE exact", BatchedSMOTE(n_jobs=args.n_jobs)),
+            ("BatchedSMOTE ivf", BatchedSMOTE(index="ivf", n_jobs=args.n_jobs))]
+    if not args.skip_imblearn:
+        runs.insert(0, ("imblearn SMOTE", SMOTE(random_state=42)))
+
+    print(f"{'sampler':<22}{'seconds':>9}{'peak MB':>9}{'rows out':>10}{'recall':>8}")
+    exact = None
+    for label, sampler in runs:
+        seconds, peak, n_out, sampler = measure(sampler, X, y)
+        recall = ""
+        if label.endswith("exact"):
+            exact = sampler.neighbors_
+        elif label.endswith("ivf") and exact is not None:
+            found = [len(np.intersect1d(a, b)) for a, b in zip(exact, sampler.neighbors_)]
+            recall = f"{np.sum(found) / exact.size:.3f}"
+        print(f"{label:<22}{seconds:>9.1f}{peak:>9.0f}{n_out:>10}{recall:>8}")
+
+
+if __name__ == "__main__":
+    main()
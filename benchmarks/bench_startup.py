@@ -0,0 +1,93 @@
+"""Cold import latency of each ``churn`` entry point.
+
+Every entry point is imported in a fresh interpreter, several times, and the
+median import time is reported with the process wall time and the heavy
+libraries the import pulled in. The notebook's import block, as it is and as
+it originally was, is timed as a reference (without ``google.colab``).
+
+    python benchmarks/bench_startup.py --repeat 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+HEAVY = ("pandas", "sklearn", "xgboost", "imblearn", "matplotlib", "seaborn", "plotly",
+         "pyarrow")
+
+ENTRY_POINTS = [
+    ("import churn", "import churn"),
+    ("churn.data (load)", "import churn.data"),
+    ("churn.features (preprocess)", "import churn.features"),
+    ("churn.cluster", "import churn.cluster"),
+    ("churn.train", "import churn.train"),
+    ("churn.tune", "import churn.tune"),
+    ("churn.score (CLI)", "import churn.score"),
+    ("churn.serve (CLI)", "import churn.serve"),
+    ("churn.fastpath", "import churn.fastpath"),
+    ("churn.trees", "import churn.trees"),
+    ("notebook imports (original)", "\n".join([
+        "import pandas, numpy, matplotlib.pyplot, seaborn",
+        "from sklearn.model_selection import train_test_split, RandomizedSearchCV",
+        "from sklearn.tree import DecisionTreeClassifier",
+        "from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier",
+        "from sklearn.cluster import KMeans",
+        "from xgboost import XGBClassifier",
+        "from imblearn.over_sampling import SMOTE",
+    ])),
+    ("notebook imports", "\n".join([
+        "import pandas, numpy, matplotlib.pyplot, seaborn",
+        "from churn.data import load_churn_data, memory_report, NUMERIC_COLUMNS",
+        "from churn.cache import load_features",
+        "from churn.stats import summarize",
+        "from churn.features import OutlierCapper, build_preprocessor",
+        "from churn.score import save_model",
+        "from churn.trees import compile_model",
+        "from churn.cluster import CLUSTER_FEATURES, elbow_inertia, fit_segments",
+        "from churn.train import METRIC_NAMES, dtype_parity, train_zoo",
+        "from churn.tune import PARAM_GRIDS, HalvingSearch, PipelineSearch",
+    ])),
+]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+exec({code!r})
+elapsed = time.perf_counter() - start
+loaded = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{"seconds": elapsed, "loaded": loaded}}))
+"""
+
+
+def measure(code):
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", _PROBE.format(code=code, heavy=HEAVY)],
+                            cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    wall = time.perf_counter() - start
+    result = json.loads(output.splitlines()[-1])
+    return result["seconds"], wall, result["loaded"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    measure("pass")  # warm the OS file cache for the interpreter itself
+    print(f"{'entry point':<30}{'import s':>10}{'process s':>11}  heavy modules loaded")
+    for name, code in ENTRY_POINTS:
+        measure(code)  # warm-up run so every entry point sees a warm file cache
+        runs = [measure(code) for _ in range(args.repeat)]
+        seconds = statistics.median(run[0] for run in runs)
+        wall = statistics.median(run[1] for run in runs)
+        print(f"{name:<30}{seconds:>10.3f}{wall:>11.3f}  {', '.join(runs[0][2]) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
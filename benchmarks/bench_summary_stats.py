@@ -0,0 +1,85 @@
+"""EDA summary table and correlation matrix: pandas scans vs one ``summarize`` pass.
+
+For each ``--rows`` size, the numeric columns of a synthetic snapshot are
+summarized twice:
+
+- the notebook's old way: ``describe()``, ``median()``, ``skew()`` and
+  ``corr()``, each a full scan;
+- ``summarize`` in chunks, serially and on ``--n-jobs`` processes.
+
+Reports the seconds of each, and the largest difference from pandas: relative
+for the moments, and in units of the column's IQR for the sketched
+quartiles. Time per row stays flat as the snapshot grows.
+
+    python benchmarks/bench_summary_stats.py --rows 1000000 4000000 --n-jobs -1
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from churn.data import NUMERIC_COLUMNS  # noqa: E402
+from churn.stats import summarize  # noqa: E402
+
+
+def make_data(n_rows, seed=0):
+    # Skewed amounts, small integer counts and ratios, with correlated pairs.
+    rng = np.random.default_rng(seed)
+    base = rng.normal(size=n_rows)
+    columns = {}
+    for i, col in enumerate(NUMERIC_COLUMNS):
+        noise = rng.normal(size=n_rows)
+        kind = i % 3
+        if kind == 0:
+            columns[col] = np.exp(8 + 0.9 * (0.5 * base + noise))
+        elif kind == 1:
+            columns[col] = rng.poisson(3 + np.abs(base)).astype(np.int64)
+        else:
+            columns[col] = 1 / (1 + np.exp(-(base + noise)))
+    return pd.DataFrame(columns)
+
+
+def pandas_tables(df):
+    summary = df.describe().T
+    summary["median"] = df.median()
+    summary["skew"] = df.skew()
+    return summary, df.corr()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 4_000_000])
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}  {'method':<22}{'seconds':>9}{'ns/row':>8}{'moments':>10}"
+          f"{'quartiles':>11}{'corr':>10}")
+    for n_rows in args.rows:
+        df = make_data(n_rows)
+        start = time.perf_counter()
+        summary, corr = pandas_tables(df)
+        seconds = time.perf_counter() - start
+        print(f"{n_rows:>10}  {'pandas scans':<22}{seconds:>9.2f}{seconds / n_rows * 1e9:>8.0f}")
+        iqr = (summary["75%"] - summary["25%"]).to_numpy()
+        for label, n_jobs in (("summarize", 1), (f"summarize n_jobs={args.n_jobs}", args.n_jobs)):
+            start = time.perf_counter()
+            stats = summarize(df, n_jobs=n_jobs)
+            table, stats_corr = stats.summary(), stats.corr()
+            seconds = time.perf_counter() - start
+            moments = max(np.max(np.abs(table[col] - summary[col]) / np.abs(summary[col]))
+                          for col in ("mean", "std", "skew"))
+            quartiles = max(np.max(np.abs(table[col] - summary[col]) / iqr)
+                            for col in ("25%", "50%", "75%"))
+            corr_diff = np.abs(stats_corr.to_numpy() - corr.to_numpy()).max()
+            print(f"{n_rows:>10}  {label:<22}{seconds:>9.2f}{seconds / n_rows * 1e9:>8.0f}"
+                  f"{moments:>10.1e}{quartiles:>11.4f}{corr_diff:>10.1e}")
+
+
+if __name__ == "__main__":
+    main()
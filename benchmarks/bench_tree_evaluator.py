@@ -0,0 +1,105 @@
+"""Native XGBoost prediction vs. the NumPy tree evaluator in churn.trees.
+
+Trains an XGBClassifier on synthetic data shaped like the churn feature
+matrix, compiles it with ``compile_model`` and compares batch throughput,
+prediction differences, and the cold start (import time and resident memory)
+of a worker that loads each kind of model.
+
+    python benchmarks/bench_tree_evaluator.py --trees 100 --depth 6
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from churn.trees import compile_model  # noqa: E402
+
+WORKER = """
+import sys, time
+start = time.perf_counter()
+{load}
+elapsed = time.perf_counter() - start
+# Peak resident memory of this process (Linux).
+with open("/proc/self/status") as f:
+    rss = next(line.split()[1] for line in f if line.startswith("VmHWM:"))
+print(elapsed, rss, "xgboost" in sys.modules)
+"""
+
+LOADERS = {
+    "xgboost model": "import xgboost\nm = xgboost.XGBClassifier()\nm.load_model({path!r})",
+    "compiled forest": "from churn.trees import CompiledForest\nm = CompiledForest.load({path!r})",
+}
+
+
+def make_data(n_rows, n_features=31, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, n_features)).astype(np.float32)
+    logit = X[:, 0] * 1.5 - X[:, 1] + 0.8 * X[:, 2] * X[:, 3] + rng.normal(size=n_rows)
+    return X, (logit > 1.0).astype(int)
+
+
+def best_time(func, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def cold_start(path, kind):
+    code = WORKER.format(load=LOADERS[kind].format(path=path))
+    env = {**os.environ, "PYTHONPATH": ROOT}
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                         check=True, env=env).stdout.split()
+    return float(out[0]), int(out[1]) / 1024, out[2] == "True"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--depth", type=int, default=6)
+    parser.add_argument("--train-rows", type=int, default=20_000)
+    parser.add_argument("--batches", type=int, nargs="+", default=[1, 100, 10_000, 200_000])
+    args = parser.parse_args()
+
+    from xgboost import XGBClassifier
+
+    X, y = make_data(args.train_rows)
+    model = XGBClassifier(n_estimators=args.trees, max_depth=args.depth, random_state=42)
+    model.fit(X, y)
+    compiled = compile_model(model)
+    print(f"{compiled.n_trees} trees, depth {compiled.max_depth}, "
+          f"{len(compiled.feature):,} nodes")
+
+    print(f"\n{'batch':>8}{'xgboost rows/s':>17}{'numpy rows/s':>15}{'ratio':>8}{'max |diff|':>12}")
+    for batch in args.batches:
+        X_batch, _ = make_data(batch, seed=1)
+        repeats = max(3, min(200, 200_000 // batch))
+        t_native = best_time(lambda: model.predict_proba(X_batch), repeats)
+        t_compiled = best_time(lambda: compiled.predict_proba(X_batch), repeats)
+        diff = np.abs(model.predict_proba(X_batch) - compiled.predict_proba(X_batch)).max()
+        print(f"{batch:>8}{batch / t_native:>17,.0f}{batch / t_compiled:>15,.0f}"
+              f"{t_native / t_compiled:>7.2f}x{diff:>12.2e}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "model.json")
+        forest_path = os.path.join(tmp, "forest.npz")
+        model.save_model(model_path)
+        compiled.save(forest_path)
+        print(f"\n{'worker loads':<18}{'seconds':>9}{'max RSS MB':>12}  imports xgboost")
+        for kind, path in (("xgboost model", model_path), ("compiled forest", forest_path)):
+            seconds, rss, imported = cold_start(path, kind)
+            print(f"{kind:<18}{seconds:>9.3f}{rss:>12.1f}  {imported}")
+
+
+if __name__ == "__main__":
+    main()
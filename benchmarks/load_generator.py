@@ -0,0 +1,88 @@
+"""Load generator for the local scoring service (``python -m churn.serve``).
+
+Replays customer records from a CSV file as single-customer ``POST /score``
+requests from many concurrent keep-alive connections, then prints the
+client-side latency percentiles and throughput next to the service's own
+``/metrics``.
+
+    python -m churn.serve xgb_pipeline.joblib --port 8000 &
+    python benchmarks/load_generator.py BankChurners.csv --concurrency 32 --requests 20000
+"""
+
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+import pandas as pd
+
+
+def load_records(path, n_records):
+    raw = pd.read_csv(path, nrows=n_records).drop(columns=["Attrition_Flag"], errors="ignore")
+    raw = raw.astype(object).where(raw.notna(), None)
+    return [json.dumps(record).encode() for record in raw.to_dict("records")]
+
+
+def run_client(url, bodies, n_requests, latencies, errors):
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80)
+    headers = {"Content-Type": "application/json"}
+    for i in range(n_requests):
+        body = bodies[i % len(bodies)]
+        start = time.perf_counter()
+        try:
+            conn.request("POST", "/score", body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            ok = response.status == 200
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(url.hostname, url.port or 80)
+            ok = False
+        latencies.append(time.perf_counter() - start)
+        if not ok:
+            errors.append(i)
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("data", help="CSV file with raw customer records")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=10_000, help="total requests")
+    parser.add_argument("--records", type=int, default=1_000,
+                        help="distinct records to read from the file")
+    args = parser.parse_args()
+
+    url = urlparse(args.url)
+    bodies = load_records(args.data, args.records)
+    per_client = max(1, args.requests // args.concurrency)
+    latencies, errors = [], []
+    threads = [threading.Thread(target=run_client,
+                                args=(url, bodies[i::args.concurrency] or bodies,
+                                      per_client, latencies, errors))
+               for i in range(args.concurrency)]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000
+    p50, p99 = np.percentile(latencies_ms, [50, 99])
+    print(f"{len(latencies):,} requests from {args.concurrency} connections in {elapsed:.1f}s")
+    print(f"throughput: {len(latencies) / elapsed:,.0f} requests/s, errors: {len(errors)}")
+    print(f"client latency: p50 {p50:.2f} ms, p99 {p99:.2f} ms, max {latencies_ms.max():.2f} ms")
+
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80)
+    conn.request("GET", "/metrics")
+    print("service metrics:", json.dumps(json.loads(conn.getresponse().read()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Reusable building blocks for the credit card churn project.
+
+The notebook export in ``Main Py/`` walks through the analysis step by step;
+this package holds the pieces that have to run on full-size customer
+snapshots, one module per stage:
+
+- load: ``churn.data`` (typed, chunked reading) and ``churn.cache``
+- explore: ``churn.stats``, ``churn.sketch``, ``churn.report``
+- preprocess: ``churn.features``
+- split: ``churn.splits``
+- cluster: ``churn.cluster``
+- train: ``churn.train``, ``churn.sampling``, ``churn.binned``, ``churn.metrics``,
+  ``churn.intervals``
+- tune: ``churn.tune``, ``churn.checkpoint``
+- score: ``churn.score``, ``churn.serve``, ``churn.fastpath``, ``churn.trees``
+
+``import churn`` is free: the names below resolve to their module on first
+access, and the stage modules import heavy dependencies (scikit-learn
+estimators, xgboost, imbalanced-learn) only inside the functions that need
+them, so a scoring worker never loads the training stack.
+"""
+
+import importlib
+
+_EXPORTS = {
+    "load_churn_data": "churn.data",
+    "iter_chunks": "churn.data",
+    "category_modes": "churn.data",
+    "convert_frame": "churn.data",
+    "compact_frame": "churn.data",
+    "memory_report": "churn.data",
+    "load_features": "churn.cache",
+    "summarize": "churn.stats",
+    "build_report": "churn.report",
+    "load_split": "churn.splits",
+    "encode_features": "churn.features",
+    "prepare_features": "churn.features",
+    "build_preprocessor": "churn.features",
+    "OutlierCapper": "churn.features",
+    "OneHotCodes": "churn.features",
+    "fit_segments": "churn.cluster",
+    "assign_segments": "churn.cluster",
+    "Segments": "churn.cluster",
+    "make_model": "churn.train",
+    "make_models": "churn.train",
+    "train_models": "churn.train",
+    "dtype_parity": "churn.train",
+    "evaluate_models": "churn.metrics",
+    "bootstrap_models": "churn.intervals",
+    "repeated_cv": "churn.intervals",
+    "tune_model": "churn.tune",
+    "HalvingSearch": "churn.tune",
+    "PipelineSearch": "churn.tune",
+    "CheckpointedSearch": "churn.checkpoint",
+    "save_model": "churn.score",
+    "load_model": "churn.score",
+    "score_file": "churn.score",
+    "RecordScorer": "churn.fastpath",
+    "compile_model": "churn.trees",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module 'churn' has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
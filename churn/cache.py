@@ -0,0 +1,296 @@
+"""On-disk cache of the prepared feature matrix.
+
+Each column of ``X`` (and the target) is written as its own ``.npy`` file, so
+a cached matrix is opened with ``np.load(..., mmap_mode="r")`` in milliseconds
+and only the pages that are actually used get read. Entries live in
+``<cache_dir>/<key>/``, where the key is a hash of the source file contents,
+the loader schema and the preprocessing config; changing any of them simply
+produces a new key, so stale entries are never picked up.
+
+``FoldCache`` applies the same idea to cross-validation: the preprocessing
+of a pipeline is fitted once per fold and its transformed training and
+validation matrices are stored under a key of the transformer's parameters,
+the data and the fold's rows, so every candidate of a search (in any worker
+process) memory-maps them instead of refitting the preprocessing.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from churn.data import BINARY_MAPS, COMPACT_SCHEMA, SCHEMA, TARGET, load_churn_data
+from churn.features import DEFAULT_CONFIG, prepare_features
+
+# Bump when the on-disk layout or the meaning of a cached entry changes.
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = ".churn_cache"
+DEFAULT_FOLD_CACHE_DIR = os.path.join(DEFAULT_CACHE_DIR, "folds")
+
+_DIGEST_INDEX = "digests.json"
+
+
+def file_digest(file_path, cache_dir=None, block_size=1 << 20):
+    """SHA-256 of a file's contents.
+
+    With ``cache_dir`` set, digests are remembered per path together with the
+    file's size and modification time, so unchanged multi-GB inputs are not
+    re-read on every run.
+    """
+    file_path = os.path.abspath(file_path)
+    stat = os.stat(file_path)
+    stamp = [stat.st_size, stat.st_mtime_ns]
+
+    index = {}
+    index_path = os.path.join(cache_dir, _DIGEST_INDEX) if cache_dir else None
+    if index_path and os.path.exists(index_path):
+        with open(index_path) as f:
+            index = json.load(f)
+        entry = index.get(file_path)
+        if entry and entry["stamp"] == stamp:
+            return entry["sha256"]
+
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            sha.update(block)
+    digest = sha.hexdigest()
+
+    if index_path:
+        index[file_path] = {"stamp": stamp, "sha256": digest}
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=".tmp-")
+        with os.fdopen(fd, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, index_path)
+    return digest
+
+
+def _schema_key(schema):
+    # str() of a CategoricalDtype is just "category": key on its levels.
+    return {col: list(dtype.categories) if isinstance(dtype, pd.CategoricalDtype) else str(dtype)
+            for col, dtype in schema.items()}
+
+
+def cache_key(file_path, config=None, cache_dir=None):
+    """Key of the cache entry for ``file_path`` prepared with ``config``.
+
+    Covers the file's content, the loader schema (including the category
+    vocabularies and the binary mappings) and the preprocessing config.
+    """
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    payload = json.dumps({
+        "version": CACHE_VERSION,
+        "source": file_digest(file_path, cache_dir=cache_dir),
+        "schema": _schema_key(SCHEMA),
+        "binary_maps": BINARY_MAPS,
+        "compact_schema": _schema_key(COMPACT_SCHEMA) if config["compact"] else None,
+        "config": config,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def _write_entry(entry_dir, X, y):
+    parent = os.path.dirname(entry_dir)
+    os.makedirs(parent, exist_ok=True)
+    # Write into a temporary directory and rename it into place, so readers
+    # never see a half-written entry.
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+    try:
+        columns = []
+        categories = {}
+        for i, col in enumerate(X.columns):
+            values = X[col]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # Categorical columns are stored as their codes and levels.
+                categories[col] = list(values.cat.categories)
+                values = values.cat.codes
+            np.save(os.path.join(tmp_dir, f"x{i}.npy"), values.to_numpy())
+            columns.append(col)
+        if y is not None:
+            np.save(os.path.join(tmp_dir, "y.npy"), y.to_numpy())
+        with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+            json.dump({"columns": columns, "has_target": y is not None,
+                       "n_rows": len(X), "categories": categories}, f)
+        try:
+            os.replace(tmp_dir, entry_dir)
+        except OSError:
+            # Another process wrote the same entry first; keep theirs.
+            if not os.path.exists(os.path.join(entry_dir, "manifest.json")):
+                raise
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def _read_entry(entry_dir, mmap_mode):
+    with open(os.path.join(entry_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+    data = {col: np.load(os.path.join(entry_dir, f"x{i}.npy"), mmap_mode=mmap_mode)
+            for i, col in enumerate(manifest["columns"])}
+    for col, levels in manifest.get("categories", {}).items():
+        data[col] = pd.Categorical.from_codes(data[col], dtype=pd.CategoricalDtype(levels))
+    # copy=False keeps one block per column backed directly by the mapping.
+    X = pd.DataFrame(data, columns=manifest["columns"], copy=False)
+    y = None
+    if manifest["has_target"]:
+        y = pd.Series(np.load(os.path.join(entry_dir, "y.npy"), mmap_mode=mmap_mode),
+                      name=TARGET, copy=False)
+    return X, y
+
+
+def load_features(file_path, config=None, cache_dir=DEFAULT_CACHE_DIR, df=None,
+                  mmap_mode="r"):
+    """Return the prepared ``(X, y)`` for ``file_path``, building it if needed.
+
+    On a cache hit the columns are memory-mapped read-only (pass
+    ``mmap_mode=None`` to read them into memory instead). On a miss the file
+    is loaded with ``load_churn_data`` (or ``df`` is used if the caller has
+    already loaded it), prepared with ``prepare_features`` and written to the
+    cache before being returned.
+    """
+    entry_dir = os.path.join(cache_dir, cache_key(file_path, config, cache_dir))
+    if not os.path.exists(os.path.join(entry_dir, "manifest.json")):
+        if df is None:
+            df = load_churn_data(file_path)
+        X, y = prepare_features(df, config)
+        _write_entry(entry_dir, X, y)
+    return _read_entry(entry_dir, mmap_mode)
+
+
+def frame_digest(X, y=None):
+    """SHA-256 of a frame's column names, dtypes and values (and of ``y``).
+
+    The index is ignored: folds address rows by position.
+    """
+    sha = hashlib.sha256()
+    sha.update(json.dumps([[str(col), str(dtype)] for col, dtype in X.dtypes.items()]).encode())
+    sha.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    if y is not None:
+        sha.update(pd.util.hash_pandas_object(pd.Series(y), index=False).to_numpy().tobytes())
+    return sha.hexdigest()
+
+
+def _save_matrix(entry_dir, name, matrix):
+    # Dense arrays are one .npy file; sparse ones are their CSR components.
+    from scipy import sparse
+
+    if sparse.issparse(matrix):
+        matrix = sparse.csr_matrix(matrix)
+        for part in ("data", "indices", "indptr"):
+            np.save(os.path.join(entry_dir, f"{name}.{part}.npy"), getattr(matrix, part))
+        return {"sparse": True, "shape": list(matrix.shape)}
+    np.save(os.path.join(entry_dir, f"{name}.npy"), np.asarray(matrix))
+    return {"sparse": False}
+
+
+def _load_matrix(entry_dir, name, layout, mmap_mode):
+    if not layout["sparse"]:
+        return np.load(os.path.join(entry_dir, f"{name}.npy"), mmap_mode=mmap_mode)
+    from scipy import sparse
+
+    parts = [np.load(os.path.join(entry_dir, f"{name}.{part}.npy"), mmap_mode=mmap_mode)
+             for part in ("data", "indices", "indptr")]
+    return sparse.csr_matrix(tuple(parts), shape=tuple(layout["shape"]), copy=False)
+
+
+def _rows(data, index):
+    return data.iloc[index] if hasattr(data, "iloc") else np.asarray(data)[index]
+
+
+class FoldCache:
+    """Transformed fold matrices, fitted once and shared across a search.
+
+    ``prepare`` fits a clone of the transformer on a fold's training rows and
+    writes the transformed training and validation matrices (and targets) to
+    ``<cache_dir>/<key>/``; ``load`` memory-maps them (``mmap_mode``), so
+    worker processes share one copy through the page cache. Keys cover the
+    transformer's class and parameters, ``frame_digest`` of the data and the
+    fold's row positions, so entries survive across searches and pipelines
+    that share the same preprocessing.
+
+    ``hits`` and ``misses`` count the ``prepare`` calls that found the fold
+    already cached and those that had to fit the transformer; ``stats()``
+    returns them with the hit rate.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_FOLD_CACHE_DIR, mmap_mode="r"):
+        self.cache_dir = cache_dir
+        self.mmap_mode = mmap_mode
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, transformer, data_digest, train, valid):
+        """Cache key of ``transformer`` fitted on rows ``train`` of the data."""
+        import joblib
+        from sklearn.base import clone
+
+        payload = json.dumps({
+            "version": CACHE_VERSION,
+            "transformer": joblib.hash(clone(transformer)),
+            "data": data_digest,
+            "train": hashlib.sha256(np.asarray(train, dtype=np.int64).tobytes()).hexdigest(),
+            "valid": hashlib.sha256(np.asarray(valid, dtype=np.int64).tobytes()).hexdigest(),
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    def _exists(self, key):
+        return os.path.exists(os.path.join(self.cache_dir, key, "manifest.json"))
+
+    def prepare(self, transformer, X, y, train, valid, data_digest=None):
+        """Key of the fold's entry, fitting and writing it on a miss."""
+        from sklearn.base import clone
+
+        key = self.key(transformer, data_digest or frame_digest(X, y), train, valid)
+        if self._exists(key):
+            self.hits += 1
+            return key
+        self.misses += 1
+        fitted = clone(transformer)
+        y_train, y_valid = _rows(y, train), _rows(y, valid)
+        matrices = {"X_train": fitted.fit_transform(_rows(X, train), y_train),
+                    "X_valid": fitted.transform(_rows(X, valid)),
+                    "y_train": np.asarray(y_train), "y_valid": np.asarray(y_valid)}
+
+        entry_dir = os.path.join(self.cache_dir, key)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix=".tmp-")
+        try:
+            layout = {name: _save_matrix(tmp_dir, name, matrix)
+                      for name, matrix in matrices.items()}
+            with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+                json.dump(layout, f)
+            try:
+                os.replace(tmp_dir, entry_dir)
+            except OSError:
+                # Another process prepared the same fold first; keep theirs.
+                if not self._exists(key):
+                    raise
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        return key
+
+    def load(self, key):
+        """``(X_train, y_train, X_valid, y_valid)`` of a prepared fold."""
+        entry_dir = os.path.join(self.cache_dir, key)
+        with open(os.path.join(entry_dir, "manifest.json")) as f:
+            layout = json.load(f)
+        return tuple(_load_matrix(entry_dir, name, layout[name], self.mmap_mode)
+                     for name in ("X_train", "y_train", "X_valid", "y_valid"))
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0}
+
+
+def clear_cache(cache_dir=DEFAULT_CACHE_DIR):
+    """Remove every cached entry (and the digest index) under ``cache_dir``."""
+    shutil.rmtree(cache_dir, ignore_errors=True)
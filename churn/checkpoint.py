@@ -0,0 +1,379 @@
+"""Resumable hyperparameter search backed by a local directory.
+
+A search on full-size data can run for hours, and a dead kernel used to lose
+every finished fit. ``CheckpointedSearch`` writes the training rows, the
+folds and the candidate list to a store directory once, then treats every
+(candidate, fold) pair as a task in a file-backed queue:
+
+- a worker claims a task by linking a fully written ``claims/<task>`` into
+  place (``os.link`` fails if it exists), so exactly one process wins it;
+- the result is written to ``results/<task>.json`` (atomically, via
+  ``os.replace``) as soon as the fit finishes, and the claim is removed;
+- claims left behind by a dead process (same host, pid gone) or older than
+  ``stale_after`` seconds are taken over.
+
+Calling ``fit`` again with the same store resumes: finished tasks are
+skipped. Any number of extra workers can join a running search from other
+shells and share the queue:
+
+    python -m churn.checkpoint tuning/xgb_store
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from churn.cache import _read_entry, _write_entry
+from churn.train import core_budget, make_model
+from churn.tune import (DEFAULT_MAX_TREES, EARLY_STOPPING_MODELS, PARAM_GRIDS, _evaluate_task,
+                        _search_state, _splitter)
+
+STORE_VERSION = 1
+DEFAULT_POLL_INTERVAL = 1.0
+
+
+def _atomic_write_json(path, payload):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _data_digest(X, y):
+    digest = hashlib.sha256()
+    digest.update(json.dumps(list(map(str, X.columns))).encode())
+    for col in X.columns:
+        digest.update(np.ascontiguousarray(X[col].to_numpy()).tobytes())
+    digest.update(np.ascontiguousarray(np.asarray(y)).tobytes())
+    return digest.hexdigest()
+
+
+class SearchStore:
+    """Directory holding a search's data, spec, claims and per-task results."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(os.path.join(self.path, "search.json")) as f:
+            self.spec = json.load(f)
+        if self.spec.get("version") != STORE_VERSION:
+            raise ValueError(f"{self.path} was written by an incompatible version")
+        self.tasks = [f"{candidate:05d}-{fold}" for candidate in range(len(self.spec["candidates"]))
+                      for fold in range(self.spec["n_folds"])]
+
+    @classmethod
+    def create(cls, path, spec, X, y, fold_ids):
+        """Open the store at ``path``, writing it first if it does not exist.
+
+        An existing store must hold the same search (same spec and data),
+        otherwise ``ValueError`` is raised rather than mixing results.
+        """
+        path = str(path)
+        spec = {"version": STORE_VERSION, **spec, "data_digest": _data_digest(X, y)}
+        spec_path = os.path.join(path, "search.json")
+        if not os.path.exists(spec_path):
+            os.makedirs(os.path.join(path, "claims"), exist_ok=True)
+            os.makedirs(os.path.join(path, "results"), exist_ok=True)
+            _write_entry(os.path.join(path, "data"), X.reset_index(drop=True),
+                         pd.Series(np.asarray(y)))
+            np.save(os.path.join(path, "folds.npy"), fold_ids)
+            _atomic_write_json(spec_path, spec)
+        store = cls(path)
+        if store.spec != json.loads(json.dumps(spec)):
+            raise ValueError(f"{path} holds a different search; use a new store directory")
+        return store
+
+    def load_data(self):
+        X, y = _read_entry(os.path.join(self.path, "data"), mmap_mode="r")
+        fold_ids = np.load(os.path.join(self.path, "folds.npy"))
+        folds = [(np.flatnonzero(fold_ids != k), np.flatnonzero(fold_ids == k))
+                 for k in range(self.spec["n_folds"])]
+        return X, y, folds
+
+    def _result_path(self, task):
+        return os.path.join(self.path, "results", f"{task}.json")
+
+    def _claim_path(self, task):
+        return os.path.join(self.path, "claims", task)
+
+    def is_done(self, task):
+        return os.path.exists(self._result_path(task))
+
+    def results(self):
+        """Finished tasks and their results."""
+        results = {}
+        for task in self.tasks:
+            try:
+                with open(self._result_path(task)) as f:
+                    results[task] = json.load(f)
+            except FileNotFoundError:
+                pass
+        return results
+
+    def _stale_claim(self, claim_path, stale_after):
+        """Contents of the claim at ``claim_path`` if it is stale, else None."""
+        try:
+            with open(claim_path, "rb") as f:
+                content = f.read()
+            modified = os.path.getmtime(claim_path)
+        except FileNotFoundError:
+            return None
+        try:
+            claim = json.loads(content)
+        except ValueError:
+            # Claims are linked into place complete; an unreadable one was
+            # left by a worker that died while writing it.
+            claim = {"host": None, "time": modified}
+        if claim["host"] == socket.gethostname() and not _pid_alive(claim["pid"]):
+            return content
+        if stale_after is not None and time.time() - claim["time"] > stale_after:
+            return content
+        return None
+
+    def claim(self, task, stale_after=None):
+        """Try to take ``task``; True when this process now owns it."""
+        claim_path = self._claim_path(task)
+        stale = self._stale_claim(claim_path, stale_after)
+        if stale is not None:
+            # Renaming arbitrates between processes taking over the same
+            # claim; the renamed file must still be the stale claim, not a
+            # fresh one another worker wrote after its own takeover.
+            stale_path = f"{claim_path}.stale-{os.getpid()}"
+            try:
+                os.rename(claim_path, stale_path)
+            except FileNotFoundError:
+                return False
+            with open(stale_path, "rb") as f:
+                taken = f.read()
+            if taken != stale:
+                with contextlib.suppress(FileExistsError):
+                    os.link(stale_path, claim_path)
+                os.remove(stale_path)
+                return False
+            os.remove(stale_path)
+        # Write the claim next to its final path and link it into place, so
+        # it either exists complete or not at all.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(claim_path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"host": socket.gethostname(), "pid": os.getpid(),
+                           "time": time.time()}, f)
+            os.link(tmp_path, claim_path)
+        except FileExistsError:
+            return False
+        finally:
+            os.remove(tmp_path)
+        if self.is_done(task):
+            # Finished by another worker between our check and the claim.
+            self.release(task)
+            return False
+        return True
+
+    def release(self, task):
+        try:
+            os.remove(self._claim_path(task))
+        except FileNotFoundError:
+            pass
+
+    def save_result(self, task, result):
+        _atomic_write_json(self._result_path(task), result)
+        self.release(task)
+
+
+def run_worker(path, wait=True, stale_after=None, poll_interval=DEFAULT_POLL_INTERVAL,
+               single_threaded=False):
+    """Work through the store's queue; returns the number of tasks this worker ran.
+
+    With ``wait=False`` the worker exits once nothing is left to claim; with
+    ``wait=True`` it also waits for tasks other workers are running, taking
+    them over if their worker dies, and returns when every task is done.
+    """
+    store = SearchStore(path)
+    spec = store.spec
+    X, y, folds = store.load_data()
+    state = _search_state(spec["name"], X, y, folds, spec["random_state"],
+                          1 if single_threaded else core_budget(None),
+                          spec["early_stopping_rounds"])
+    limits = contextlib.nullcontext()
+    if single_threaded:
+        from threadpoolctl import threadpool_limits
+
+        limits = threadpool_limits(1)
+    with limits:
+        return _work(store, state, wait, stale_after, poll_interval)
+
+
+def _work(store, state, wait, stale_after, poll_interval):
+    n_run = 0
+    while True:
+        pending = [task for task in store.tasks if not store.is_done(task)]
+        if not pending:
+            return n_run
+        progressed = False
+        for task in pending:
+            if not store.claim(task, stale_after):
+                continue
+            candidate, fold = map(int, task.split("-"))
+            params = dict(store.spec["candidates"][candidate])
+            n_trees = params.pop("n_estimators", store.spec["max_trees"])
+            start = time.perf_counter()
+            try:
+                score, best_trees, built, cpu_seconds = _evaluate_task((params, fold, n_trees),
+                                                                       state)
+            except BaseException:
+                store.release(task)
+                raise
+            store.save_result(task, {"score": score, "best_trees": best_trees,
+                                     "trees_built": built, "cpu_seconds": cpu_seconds,
+                                     "seconds": time.perf_counter() - start,
+                                     "worker": f"{socket.gethostname()}:{os.getpid()}"})
+            n_run += 1
+            progressed = True
+        if not wait:
+            return n_run
+        if not progressed:
+            time.sleep(poll_interval)
+
+
+class CheckpointedSearch:
+    """Randomized search whose (candidate, fold) results survive crashes.
+
+    Candidates are drawn from ``param_distributions`` (``PARAM_GRIDS[name]``
+    by default) with ``sklearn.model_selection.ParameterSampler``; folds
+    default to ``SEARCH_SETTINGS[name]``. With ``early_stopping_rounds``
+    (boosted models only) ``n_estimators`` is dropped from the grid and each
+    fit stops early below ``max_trees`` (see ``churn.tune.fit_early_stopping``).
+
+    ``fit`` runs ``n_jobs`` local worker processes on the store's queue
+    (this process included) and returns once every task is done, whoever ran
+    it. After ``fit``: ``best_params_``, ``best_score_``, ``best_estimator_``,
+    ``cv_results_`` (one row per candidate, with its per-fold scores) and
+    ``n_resumed_`` (tasks already finished when ``fit`` started).
+    """
+
+    def __init__(self, name, store, n_iter=10, cv=None, param_distributions=None,
+                 early_stopping_rounds=None, max_trees=DEFAULT_MAX_TREES, n_jobs=1,
+                 random_state=42, stale_after=None, refit=True):
+        if early_stopping_rounds and name not in EARLY_STOPPING_MODELS:
+            raise ValueError(f"Early stopping needs one of {EARLY_STOPPING_MODELS}, got {name!r}")
+        self.name = name
+        self.store = store
+        self.n_iter = n_iter
+        self.cv = cv
+        self.param_distributions = param_distributions
+        self.early_stopping_rounds = early_stopping_rounds
+        self.max_trees = max_trees
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.stale_after = stale_after
+        self.refit = refit
+
+    def _candidates(self):
+        from sklearn.model_selection import ParameterGrid, ParameterSampler
+
+        grid = dict(self.param_distributions or PARAM_GRIDS[self.name])
+        if self.early_stopping_rounds:
+            grid.pop("n_estimators", None)
+        n_iter = self.n_iter
+        if all(isinstance(values, list) for values in grid.values()):
+            n_iter = min(n_iter, len(ParameterGrid(grid)))
+        # Through JSON so numpy scalars become plain numbers, as stored.
+        return json.loads(json.dumps(list(ParameterSampler(grid, n_iter,
+                                                           random_state=self.random_state)),
+                                     default=lambda value: value.item()))
+
+    def fit(self, X, y):
+        splitter = _splitter(self.name, self.cv, self.random_state)
+        fold_ids = np.empty(len(X), dtype=np.int32)
+        for k, (_, valid) in enumerate(splitter.split(X, y)):
+            fold_ids[valid] = k
+        spec = {"name": self.name, "candidates": self._candidates(),
+                "n_folds": int(fold_ids.max()) + 1, "max_trees": self.max_trees,
+                "early_stopping_rounds": self.early_stopping_rounds,
+                "random_state": self.random_state}
+        store = SearchStore.create(self.store, spec, X, y, fold_ids)
+        self.n_resumed_ = len(store.results())
+
+        n_workers = core_budget(self.n_jobs)
+        context = multiprocessing.get_context()
+        workers = [context.Process(target=run_worker, args=(store.path,),
+                                   kwargs={"wait": False, "stale_after": self.stale_after,
+                                           "single_threaded": True})
+                   for _ in range(n_workers - 1)]
+        for worker in workers:
+            worker.start()
+        try:
+            run_worker(store.path, wait=True, stale_after=self.stale_after,
+                       single_threaded=n_workers > 1)
+        except BaseException:
+            # An interrupt reaches only this process; stop the workers instead
+            # of waiting for them to drain the queue. Their claims name dead
+            # pids, so the next fit takes those tasks over.
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.join()
+            raise
+        for worker in workers:
+            worker.join()
+
+        results = store.results()
+        n_folds = spec["n_folds"]
+        rows = []
+        for candidate, params in enumerate(spec["candidates"]):
+            folds = [results[f"{candidate:05d}-{fold}"] for fold in range(n_folds)]
+            row = {"params": params,
+                   "mean_test_score": np.mean([r["score"] for r in folds]),
+                   "best_trees": np.mean([r["best_trees"] for r in folds])}
+            row.update({f"split{fold}_test_score": r["score"] for fold, r in enumerate(folds)})
+            rows.append(row)
+        self.cv_results_ = pd.DataFrame(rows)
+        best = int(self.cv_results_["mean_test_score"].to_numpy().argmax())
+        self.best_params_ = dict(spec["candidates"][best])
+        if self.early_stopping_rounds:
+            self.best_params_["n_estimators"] = int(round(rows[best]["best_trees"]))
+        self.best_score_ = float(rows[best]["mean_test_score"])
+        if self.refit:
+            self.best_estimator_ = make_model(self.name, self.random_state,
+                                              n_jobs=core_budget(self.n_jobs),
+                                              **self.best_params_).fit(X, y)
+        return self
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Join a checkpointed search as a worker.")
+    parser.add_argument("store", help="store directory of a CheckpointedSearch")
+    parser.add_argument("--no-wait", dest="wait", action="store_false",
+                        help="exit when nothing is left to claim instead of waiting")
+    parser.add_argument("--stale-after", type=float, default=None,
+                        help="take over claims older than this many seconds")
+    args = parser.parse_args(argv)
+    n_run = run_worker(args.store, wait=args.wait, stale_after=args.stale_after)
+    print(f"Ran {n_run} tasks")
+
+
+if __name__ == "__main__":
+    main()
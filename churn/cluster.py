@@ -0,0 +1,219 @@
+"""Customer segmentation stage: k-means on behaviour features.
+
+Customers are clustered on standardized transaction, utilization, credit
+limit and inactivity features. A fitted segmentation is a ``Segments``: the
+scaler's means and scales and the cluster centroids, nothing else. It assigns
+``Customer_Cluster`` to new customers with a vectorized nearest-centroid
+lookup in NumPy, without refitting or importing scikit-learn, and is saved
+with ``np.savez`` and loaded back with ``Segments.load``.
+
+Large snapshots are clustered with mini-batch k-means (``mode="minibatch"``),
+either in memory or streamed chunk by chunk (``fit_segments_stream``).
+``elbow_inertia`` standardizes the features once, memory-maps the scaled
+matrix into a process pool and fits every candidate k in parallel; the knee
+of the inertia curve (``find_knee``) suggests the number of segments.
+scikit-learn's clustering module is imported only when a model is fitted.
+"""
+
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+CLUSTER_FEATURES = ["Total_Trans_Amt", "Total_Trans_Ct", "Avg_Utilization_Ratio",
+                    "Credit_Limit", "Months_Inactive_12_mon"]
+DEFAULT_N_CLUSTERS = 4
+KMEANS_MODES = ("full", "minibatch")
+DEFAULT_BATCH_SIZE = 4096
+# Rows assigned together: the (rows x clusters) distance block stays small.
+DEFAULT_BLOCK_SIZE = 65536
+
+_worker_state = None
+
+
+class Segments:
+    """Standardization and k-means centroids of a fitted segmentation.
+
+    ``predict`` standardizes the ``features`` columns with ``mean`` and
+    ``scale`` (as ``StandardScaler``) and returns the index of the nearest
+    centroid of every row, as ``KMeans.predict`` does.
+    """
+
+    def __init__(self, features, mean, scale, centroids, inertia=None):
+        self.features = list(features)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.centroids = np.asarray(centroids, dtype=np.float64)
+        self.inertia = None if inertia is None else float(inertia)
+        self._sq_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+
+    @property
+    def n_clusters(self):
+        return len(self.centroids)
+
+    def transform(self, X):
+        """Standardized ``features`` columns of a frame (or a 2-D array in that order)."""
+        if hasattr(X, "columns"):
+            X = X[self.features].to_numpy(np.float64)
+        return (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+
+    def predict(self, X, block_size=DEFAULT_BLOCK_SIZE):
+        Z = self.transform(X)
+        labels = np.empty(len(Z), dtype=np.int32)
+        for start in range(0, len(Z), block_size):
+            block = Z[start:start + block_size]
+            # ||z - c||^2 without the ||z||^2 term, which is the same for every c.
+            labels[start:start + block_size] = np.argmin(
+                self._sq_norms - 2 * block @ self.centroids.T, axis=1)
+        return labels
+
+    def save(self, path):
+        meta = {"features": self.features, "inertia": self.inertia}
+        np.savez(path, meta=json.dumps(meta), mean=self.mean, scale=self.scale,
+                 centroids=self.centroids)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(meta["features"], data["mean"], data["scale"], data["centroids"],
+                       meta["inertia"])
+
+
+def _kmeans(n_clusters, mode, random_state, batch_size):
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+
+    if mode == "full":
+        return KMeans(n_clusters=n_clusters, random_state=random_state)
+    if mode == "minibatch":
+        return MiniBatchKMeans(n_clusters=n_clusters, random_state=random_state,
+                               batch_size=batch_size, n_init=3)
+    raise ValueError(f"Unknown mode {mode!r}; expected one of {KMEANS_MODES}")
+
+
+def _scaler(df, features):
+    from sklearn.preprocessing import StandardScaler
+
+    return StandardScaler().fit(df[list(features)].to_numpy(np.float64))
+
+
+def fit_segments(df, n_clusters=DEFAULT_N_CLUSTERS, features=CLUSTER_FEATURES,
+                 random_state=42, mode="full", batch_size=DEFAULT_BATCH_SIZE):
+    """Standardize ``df[features]`` and fit k-means on it.
+
+    ``mode="full"`` is scikit-learn's ``KMeans`` (the same clusters as a
+    ``StandardScaler`` + ``KMeans`` pipeline); ``mode="minibatch"`` fits
+    ``MiniBatchKMeans`` on batches of ``batch_size`` rows.
+    """
+    scaler = _scaler(df, features)
+    kmeans = _kmeans(n_clusters, mode, random_state, batch_size)
+    kmeans.fit(scaler.transform(df[list(features)].to_numpy(np.float64)))
+    return Segments(features, scaler.mean_, scaler.scale_, kmeans.cluster_centers_,
+                    kmeans.inertia_)
+
+
+def fit_segments_stream(chunks, n_clusters=DEFAULT_N_CLUSTERS, features=CLUSTER_FEATURES,
+                        random_state=42, batch_size=DEFAULT_BATCH_SIZE):
+    """Mini-batch k-means over a snapshot streamed in chunks.
+
+    ``chunks`` is a callable returning a fresh iterator of frames, e.g.
+    ``lambda: iter_chunks(path, usecols=CLUSTER_FEATURES)``. The first pass
+    learns the standardization, the second feeds each standardized chunk to
+    ``MiniBatchKMeans.partial_fit``, so only one chunk is in memory at a
+    time. ``inertia`` is left unset (it would take a third pass).
+    """
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.preprocessing import StandardScaler
+
+    features = list(features)
+    scaler = StandardScaler()
+    for chunk in chunks():
+        scaler.partial_fit(chunk[features].to_numpy(np.float64))
+    kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=random_state,
+                             batch_size=batch_size, n_init=3)
+    for chunk in chunks():
+        Z = scaler.transform(chunk[features].to_numpy(np.float64))
+        # partial_fit needs at least n_clusters rows to initialize.
+        for start in range(0, len(Z), batch_size):
+            batch = Z[start:start + batch_size]
+            if len(batch) >= n_clusters or hasattr(kmeans, "cluster_centers_"):
+                kmeans.partial_fit(batch)
+    return Segments(features, scaler.mean_, scaler.scale_, kmeans.cluster_centers_)
+
+
+def assign_segments(df, model):
+    """Cluster label of every row of ``df``."""
+    return pd.Series(model.predict(df), index=df.index, name="Customer_Cluster")
+
+
+def find_knee(k_values, inertia):
+    """The k at the knee of a decreasing inertia curve (Kneedle).
+
+    Both axes are rescaled to [0, 1]; the knee is the point furthest below
+    the straight line from the first to the last point.
+    """
+    k = np.asarray(list(k_values), dtype=np.float64)
+    y = np.asarray(inertia, dtype=np.float64)
+    if len(k) < 3:
+        return int(k[0])
+    x = (k - k[0]) / (k[-1] - k[0])
+    y = (y - y.min()) / (np.ptp(y) or 1.0)
+    chord = y[0] + (y[-1] - y[0]) * x
+    return int(k[np.argmax(chord - y)])
+
+
+def _init_sweep_worker(state):
+    global _worker_state
+    from threadpoolctl import threadpool_limits
+
+    threadpool_limits(state["n_jobs"])
+    _worker_state = {**state, "Z": np.load(state["path"], mmap_mode="r")}
+
+
+def _sweep_task(k, state=None):
+    state = state or _worker_state
+    kmeans = _kmeans(k, state["mode"], state["random_state"], state["batch_size"])
+    return k, kmeans.fit(state["Z"]).inertia_
+
+
+def elbow_inertia(df, k_values=range(1, 10), features=CLUSTER_FEATURES, random_state=42,
+                  mode="full", batch_size=DEFAULT_BATCH_SIZE, n_jobs=None):
+    """Within-cluster inertia for each candidate number of clusters.
+
+    The features are standardized once. The candidates are fitted in
+    parallel on ``split_budget(len(k_values), n_jobs)`` processes that
+    memory-map one copy of the standardized matrix, largest k first.
+    ``attrs["knee"]`` holds ``find_knee`` of the curve and
+    ``attrs["wall_seconds"]`` the sweep's wall time.
+    """
+    from churn.train import split_budget
+
+    start = time.perf_counter()
+    k_values = list(k_values)
+    Z = _scaler(df, features).transform(df[list(features)].to_numpy(np.float64))
+    outer, inner = split_budget(len(k_values), n_jobs)
+    state = {"mode": mode, "random_state": random_state, "batch_size": batch_size,
+             "n_jobs": inner}
+    by_cost = sorted(k_values, reverse=True)
+    if outer == 1:
+        results = [_sweep_task(k, {**state, "Z": Z}) for k in by_cost]
+    else:
+        with tempfile.TemporaryDirectory(prefix="churn-sweep-") as tmp_dir:
+            path = os.path.join(tmp_dir, "scaled.npy")
+            np.save(path, Z)
+            with ProcessPoolExecutor(outer, initializer=_init_sweep_worker,
+                                     initargs=({**state, "path": path},)) as pool:
+                results = list(pool.map(_sweep_task, by_cost))
+    inertia = pd.Series(dict(results), name="inertia").reindex(k_values)
+    inertia.attrs.update(knee=find_knee(k_values, inertia.to_numpy()),
+                         wall_seconds=time.perf_counter() - start)
+    return inertia
+
+
+def cluster_profile(df, labels, features=CLUSTER_FEATURES):
+    """Mean of each clustering feature per segment."""
+    return df.groupby(labels)[list(features)].mean()
@@ -0,0 +1,281 @@
+"""Typed, chunked loading of the BankChurners customer file.
+
+``pd.read_csv`` with default settings keeps every text column as Python
+strings and every number as int64/float64, and needs the whole file in memory
+before anything can be cleaned. The loader below streams the file in
+fixed-size chunks with a declared schema, maps the binary columns and counts
+the categories for mode imputation while it reads, so the raw text is only
+held one chunk at a time. ``load_churn_data`` still returns the whole typed
+frame, and joining the typed chunks briefly holds it twice. Code that has to
+stay within about one chunk of memory streams ``iter_chunks`` instead, with
+the fill values from ``category_modes`` (a pass over the categorical columns
+only) or from a training load's ``df.attrs["fill_values"]``.
+
+With ``compact=True`` every chunk is also passed through ``compact_frame``,
+which stores the columns in the fixed ``COMPACT_SCHEMA`` types: floats as
+float32 and the customer IDs as uint32, about half the memory of the
+default schema, in which money amounts and ratios stay float64. ``memory_report`` compares the footprint
+of the frames and arrays of each stage.
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import CategoricalDtype
+
+ID_COLUMN = "CLIENTNUM"
+TARGET = "Attrition_Flag"
+
+# Vocabularies of the categorical columns, in sorted order so that
+# ``pd.get_dummies(..., drop_first=True)`` drops the same level as it does on
+# plain string columns.
+CATEGORIES = {
+    "Education_Level": ["College", "Doctorate", "Graduate", "High School",
+                        "Post-Graduate", "Uneducated"],
+    "Marital_Status": ["Divorced", "Married", "Single"],
+    "Income_Category": ["$120K +", "$40K - $60K", "$60K - $80K",
+                        "$80K - $120K", "Less than $40K", "abc"],
+    "Card_Category": ["Blue", "Gold", "Platinum", "Silver"],
+}
+
+BINARY_MAPS = {
+    "Attrition_Flag": {"Existing Customer": 0, "Attrited Customer": 1},
+    "Gender": {"M": 0, "F": 1},
+}
+
+# Storage type of every column after loading. Integers are narrowed to the
+# smallest type that holds their documented range; money amounts and ratios
+# stay float64 so values match the original analysis exactly.
+SCHEMA = {
+    "CLIENTNUM": "int64",
+    "Attrition_Flag": "int8",
+    "Customer_Age": "int8",
+    "Gender": "int8",
+    "Dependent_count": "int8",
+    "Education_Level": CategoricalDtype(CATEGORIES["Education_Level"]),
+    "Marital_Status": CategoricalDtype(CATEGORIES["Marital_Status"]),
+    "Income_Category": CategoricalDtype(CATEGORIES["Income_Category"]),
+    "Card_Category": CategoricalDtype(CATEGORIES["Card_Category"]),
+    "Months_on_book": "int16",
+    "Total_Relationship_Count": "int8",
+    "Months_Inactive_12_mon": "int8",
+    "Contacts_Count_12_mon": "int8",
+    "Credit_Limit": "float64",
+    "Total_Revolving_Bal": "int32",
+    "Avg_Open_To_Buy": "float64",
+    "Total_Amt_Chng_Q4_Q1": "float64",
+    "Total_Trans_Amt": "int32",
+    "Total_Trans_Ct": "int16",
+    "Total_Ct_Chng_Q4_Q1": "float64",
+    "Avg_Utilization_Ratio": "float64",
+}
+
+# Storage type of every column in compact mode (``compact_frame``): floats are
+# float32 and the 9-digit customer IDs fit uint32; the other integers already
+# have their narrowest documented type.
+COMPACT_SCHEMA = {col: "float32" if dtype == "float64" else dtype
+                  for col, dtype in SCHEMA.items()}
+COMPACT_SCHEMA[ID_COLUMN] = "uint32"
+
+# Numeric model inputs (everything except the target and the categoricals),
+# in file order.
+NUMERIC_COLUMNS = [col for col in SCHEMA
+                   if col != TARGET and col not in CATEGORIES]
+
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def _read_dtypes():
+    # Text columns are parsed as pandas categoricals so each distinct value is
+    # stored once per chunk; they are converted to the final types afterwards.
+    dtypes = {}
+    for col, dtype in SCHEMA.items():
+        if col in BINARY_MAPS or col in CATEGORIES:
+            dtypes[col] = "category"
+        else:
+            dtypes[col] = dtype
+    return dtypes
+
+
+def _check_values(chunk, col, allowed):
+    unexpected = chunk[col].cat.categories.difference(allowed)
+    if len(unexpected):
+        raise ValueError(f"Unexpected values in {col}: {sorted(unexpected)}")
+
+
+def _convert_chunk(chunk):
+    for col, mapping in BINARY_MAPS.items():
+        if col not in chunk:
+            continue
+        _check_values(chunk, col, list(mapping))
+        if chunk[col].isna().any():
+            raise ValueError(f"Missing values in {col}")
+        chunk[col] = chunk[col].map(mapping).astype(SCHEMA[col])
+
+    for col, categories in CATEGORIES.items():
+        if col not in chunk:
+            continue
+        _check_values(chunk, col, categories)
+        chunk[col] = chunk[col].cat.set_categories(categories)
+    return chunk
+
+
+def _read_parquet(file_path, chunksize, usecols):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ImportError("Reading Parquet files requires pyarrow") from exc
+    for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunksize, columns=usecols):
+        yield batch.to_pandas()
+
+
+def compact_frame(df):
+    """``df`` with its columns in the ``COMPACT_SCHEMA`` types.
+
+    The types are fixed per column, so every chunk and scoring batch gets
+    the same dtypes. Float columns become float32, which keeps about 7
+    significant digits. Integer columns of the schema get its integer type
+    (``ValueError`` if a value does not fit); other integer, boolean and
+    categorical columns are unchanged.
+    """
+    dtypes = {}
+    for col, dtype in df.dtypes.items():
+        if dtype.kind == "f":
+            target = np.dtype(np.float32)
+        elif dtype.kind in "iu" and col in COMPACT_SCHEMA:
+            target = np.dtype(COMPACT_SCHEMA[col])
+            if len(df):
+                values = df[col].to_numpy()
+                limits = np.iinfo(target)
+                if values.min() < limits.min or values.max() > limits.max:
+                    raise ValueError(f"{col} has values outside the range of {target}")
+        else:
+            continue
+        if dtype != target:
+            dtypes[col] = target
+    return df.astype(dtypes) if dtypes else df
+
+
+def nbytes(data):
+    """Bytes held by a frame (including its index), series, array or sparse matrix."""
+    if hasattr(data, "memory_usage"):
+        usage = data.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+    if hasattr(data, "indptr"):
+        return int(data.data.nbytes + data.indices.nbytes + data.indptr.nbytes)
+    return int(np.asarray(data).nbytes)
+
+
+def memory_report(stages):
+    """Megabytes and dtypes of the data held at each stage.
+
+    ``stages`` maps a stage name to a frame, array or sparse matrix (or a
+    tuple of them, e.g. ``(X_train, X_test)``). Returns one row per stage.
+    """
+    rows = {}
+    for stage, data in stages.items():
+        parts = data if isinstance(data, tuple) else (data,)
+        dtypes = set()
+        for part in parts:
+            part_dtypes = part.dtypes if hasattr(part, "columns") else [part.dtype]
+            dtypes.update(str(dtype) for dtype in part_dtypes)
+        rows[stage] = {"MB": sum(nbytes(part) for part in parts) / 1e6,
+                       "dtypes": ", ".join(sorted(dtypes))}
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+
+def convert_frame(df, fill_values=None):
+    """Apply the loader's typing, mapping and imputation to a raw frame.
+
+    Used for every chunk read from disk, and for frames built in memory (for
+    example from JSON records) that hold the file's raw values.
+    """
+    dtypes = {col: dtype for col, dtype in _read_dtypes().items()
+              if col in df and df[col].dtype != dtype}
+    if dtypes:
+        df = df.astype(dtypes)
+    df = _convert_chunk(df)
+    if fill_values:
+        for col, value in fill_values.items():
+            if col in df:
+                df[col] = df[col].fillna(value)
+    return df
+
+
+def iter_chunks(file_path, chunksize=DEFAULT_CHUNKSIZE, fill_values=None, usecols=None,
+                compact=False):
+    """Yield the customer file as typed DataFrame chunks.
+
+    Binary columns are mapped to 0/1 and categoricals get the fixed
+    vocabularies from ``CATEGORIES``. If ``fill_values`` is given (a dict of
+    column -> category, e.g. the modes learned on training data), missing
+    categories are filled chunk by chunk; otherwise they are left as NaN.
+    Files ending in ``.parquet`` are read batch by batch with pyarrow, anything
+    else as CSV.
+    """
+    if str(file_path).endswith(".parquet"):
+        reader = _read_parquet(file_path, chunksize, usecols)
+    else:
+        reader = pd.read_csv(file_path, dtype=_read_dtypes(), chunksize=chunksize,
+                             usecols=usecols)
+    for chunk in reader:
+        chunk = convert_frame(chunk, fill_values)
+        yield compact_frame(chunk) if compact else chunk
+
+
+def category_modes(file_path, chunksize=DEFAULT_CHUNKSIZE):
+    """Most frequent category of each ``CATEGORIES`` column of the file.
+
+    Only the categorical columns are read, chunk by chunk, so memory stays
+    bounded; the result is the ``fill_values`` ``load_churn_data`` would use.
+    """
+    counts = {}
+    for chunk in iter_chunks(file_path, chunksize=chunksize, usecols=list(CATEGORIES)):
+        for col in CATEGORIES:
+            chunk_counts = chunk[col].value_counts(sort=False)
+            counts[col] = chunk_counts if col not in counts else counts[col] + chunk_counts
+    return {col: col_counts.idxmax() for col, col_counts in counts.items()
+            if col_counts.sum() > 0}
+
+
+def load_churn_data(file_path, chunksize=DEFAULT_CHUNKSIZE, fill_values=None, usecols=None,
+                    compact=False):
+    """Load the customer file with the declared schema and mode imputation.
+
+    The result is the whole frame (see the module docstring for streaming).
+    Missing categories are filled with ``fill_values`` if given, chunk by
+    chunk as they are read; otherwise with the most frequent category of the
+    file, once all chunks are read. The category counts behind the mode are
+    collected while the chunks are read, so the file is only parsed once. The
+    number of missing values found per column and the values used to fill
+    them are kept in ``df.attrs["missing_values"]`` and
+    ``df.attrs["fill_values"]``. ``compact`` is passed to ``iter_chunks``.
+    """
+    chunks = []
+    missing = {}
+    counts = {}
+    for chunk in iter_chunks(file_path, chunksize=chunksize, usecols=usecols, compact=compact):
+        for col in CATEGORIES:
+            if col not in chunk:
+                continue
+            n_missing = int(chunk[col].isna().sum())
+            missing[col] = missing.get(col, 0) + n_missing
+            if fill_values is None:
+                chunk_counts = chunk[col].value_counts(sort=False)
+                counts[col] = chunk_counts if col not in counts else counts[col] + chunk_counts
+            elif n_missing and col in fill_values:
+                chunk[col] = chunk[col].fillna(fill_values[col])
+        chunks.append(chunk)
+
+    df = pd.concat(chunks, ignore_index=True)
+    del chunks
+
+    if fill_values is None:
+        fill_values = {col: col_counts.idxmax()
+                       for col, col_counts in counts.items() if col_counts.sum() > 0}
+        for col, n_missing in missing.items():
+            if n_missing and col in fill_values:
+                df[col] = df[col].fillna(fill_values[col])
+
+    df.attrs["missing_values"] = {col: n for col, n in missing.items() if n}
+    df.attrs["fill_values"] = dict(fill_values)
+    return df
@@ -0,0 +1,194 @@
+"""Single-record scoring without pandas.
+
+Scoring one customer through ``pipeline.predict_proba`` means building a
+one-row DataFrame, typing and one-hot encoding it, and dispatching through
+the ColumnTransformer, which costs far more than evaluating the trees.
+``RecordScorer`` precompiles a fitted pipeline (``build_preprocessor`` +
+classifier) into plain arrays: where each model input comes from in a raw
+customer record, the learned capping bounds, the scaler means/scales and the
+one-hot vocabularies. A record (dict, or tuple in ``scorer.fields`` order) is
+then turned straight into the model's feature vector and handed to the
+booster.
+"""
+
+import numpy as np
+
+from churn.data import BINARY_MAPS, CATEGORIES
+from churn.features import OutlierCapper
+
+_RAW, _MAPPED, _DUMMY = range(3)
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def _split_pipeline(model):
+    # Pipeline -> (preprocessing, classifier); CompiledPipeline likewise.
+    if hasattr(model, "forest"):
+        preprocessing, classifier = model.preprocessing, model.forest
+    elif hasattr(model, "steps"):
+        preprocessing, classifier = model[:-1], model.steps[-1][1]
+    else:
+        raise NotImplementedError("Expected a fitted Pipeline or CompiledPipeline")
+    if hasattr(preprocessing, "steps"):
+        if len(preprocessing.steps) != 1:
+            raise NotImplementedError("Expected a single ColumnTransformer before the classifier")
+        preprocessing = preprocessing.steps[0][1]
+    if not hasattr(preprocessing, "transformers_"):
+        raise NotImplementedError("Expected a fitted ColumnTransformer before the classifier")
+    return preprocessing, classifier
+
+
+def _numeric_steps(transformer):
+    """(lower, upper, mean, scale) of a capper/scaler chain; None where unused."""
+    steps = transformer.steps if hasattr(transformer, "steps") else [(None, transformer)]
+    lower = upper = mean = scale = None
+    for _, step in steps:
+        if step == "passthrough":
+            continue
+        if isinstance(step, OutlierCapper):
+            lower, upper = step.lower_, step.upper_
+        elif type(step).__name__ == "StandardScaler":
+            mean, scale = step.mean_, step.scale_
+        else:
+            raise NotImplementedError(f"Unsupported numeric step: {type(step).__name__}")
+    return lower, upper, mean, scale
+
+
+def _predictor(classifier):
+    """Function mapping a 2-D feature array to churn probabilities."""
+    if hasattr(classifier, "get_booster"):
+        booster = classifier.get_booster()
+        best_iteration = booster.attr("best_iteration")
+        iteration_range = (0, int(best_iteration) + 1) if best_iteration is not None else (0, 0)
+        return lambda X: booster.inplace_predict(X, iteration_range=iteration_range)
+    return lambda X: classifier.predict_proba(X)[:, 1]
+
+
+class RecordScorer:
+    """Score raw customer records with a fitted pipeline, bypassing pandas.
+
+    Build one with ``RecordScorer.from_bundle`` (see ``churn.score``) or
+    ``RecordScorer(pipeline, fill_values)``. Records hold the file's raw
+    values: ``"Gender": "F"``, ``"Education_Level": "Graduate"`` (or None to
+    use the training mode), plain numbers for the numeric columns.
+    """
+
+    def __init__(self, pipeline, fill_values=None, threshold=0.5):
+        self.fill_values = dict(fill_values or {})
+        self.threshold = threshold
+        preprocessing, classifier = _split_pipeline(pipeline)
+        self._predict = _predictor(classifier)
+
+        numeric_plan, bounds, categorical_plan = [], [], []
+        offset = 0
+        for name, transformer, columns in preprocessing.transformers_:
+            if transformer == "drop" or not len(columns):
+                continue
+            if hasattr(transformer, "categories_"):
+                categorical_plan.extend(self._onehot_plan(transformer, columns, offset))
+                offset += len(transformer.get_feature_names_out())
+                continue
+            lower, upper, mean, scale = _numeric_steps(transformer)
+            n = len(columns)
+            bounds.append([np.full(n, -np.inf) if lower is None else lower,
+                           np.full(n, np.inf) if upper is None else upper,
+                           np.zeros(n) if mean is None else mean,
+                           np.ones(n) if scale is None else scale])
+            numeric_plan.extend((offset + i, *self._source(col)) for i, col in enumerate(columns))
+            offset += n
+
+        self.n_features = offset
+        self._numeric_positions = np.array([plan[0] for plan in numeric_plan], dtype=np.intp)
+        self._numeric_sources = [plan[1:] for plan in numeric_plan]
+        self._lower, self._upper, self._mean, self._scale = (
+            np.concatenate(parts) if parts else np.empty(0) for parts in zip(*bounds)
+        ) if bounds else (np.empty(0),) * 4
+        self._categorical_plan = categorical_plan
+
+        fields = [source[1] for source in self._numeric_sources]
+        fields += [field for field, _ in categorical_plan]
+        self.fields = tuple(dict.fromkeys(fields))
+
+    @classmethod
+    def from_bundle(cls, bundle):
+        return cls(bundle["model"], bundle["fill_values"], bundle["threshold"])
+
+    @staticmethod
+    def _source(column):
+        # Where a numeric model input comes from in a raw record.
+        if column in BINARY_MAPS:
+            return _MAPPED, column, BINARY_MAPS[column]
+        for field, levels in CATEGORIES.items():
+            prefix = field + "_"
+            if column.startswith(prefix) and column[len(prefix):] in levels:
+                return _DUMMY, field, column[len(prefix):]
+        return _RAW, column, None
+
+    @staticmethod
+    def _onehot_plan(encoder, columns, offset):
+        plan = []
+        position = offset
+        drop_idx = getattr(encoder, "drop_idx_", None)
+        for i, (field, categories) in enumerate(zip(columns, encoder.categories_)):
+            dropped = None if drop_idx is None else drop_idx[i]
+            vocabulary = {}
+            for j, category in enumerate(categories):
+                if dropped is not None and j == dropped:
+                    continue
+                vocabulary[category] = position
+                position += 1
+            plan.append((field, vocabulary))
+        return plan
+
+    def _value(self, record, field):
+        value = record.get(field)
+        if _is_missing(value):
+            if field not in self.fill_values:
+                raise ValueError(f"Missing value for {field}")
+            value = self.fill_values[field]
+        return value
+
+    def _fill_row(self, record, out):
+        if isinstance(record, tuple):
+            record = dict(zip(self.fields, record))
+        numeric = np.empty(len(self._numeric_sources))
+        for i, (kind, field, arg) in enumerate(self._numeric_sources):
+            value = self._value(record, field)
+            if kind == _RAW:
+                numeric[i] = value
+            elif kind == _MAPPED:
+                if value not in arg:
+                    raise ValueError(f"Unexpected value in {field}: {value!r}")
+                numeric[i] = arg[value]
+            else:
+                if value not in CATEGORIES[field]:
+                    raise ValueError(f"Unexpected value in {field}: {value!r}")
+                numeric[i] = value == arg
+        np.clip(numeric, self._lower, self._upper, out=numeric)
+        numeric -= self._mean
+        numeric /= self._scale
+        out[self._numeric_positions] = numeric
+        # Unknown categories encode to all zeros, like handle_unknown="ignore".
+        for field, vocabulary in self._categorical_plan:
+            position = vocabulary.get(self._value(record, field))
+            if position is not None:
+                out[position] = 1.0
+
+    def transform(self, records):
+        """Model feature matrix for a list of records."""
+        X = np.zeros((len(records), self.n_features))
+        for row, record in zip(X, records):
+            self._fill_row(record, row)
+        return X
+
+    def predict_proba_one(self, record):
+        """Churn probability of one record."""
+        x = np.zeros((1, self.n_features))
+        self._fill_row(record, x[0])
+        return float(self._predict(x)[0])
+
+    def predict_proba(self, records):
+        """Churn probabilities of a list of records, scored in one call."""
+        return np.asarray(self._predict(self.transform(records)), dtype=np.float64)
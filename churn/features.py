@@ -0,0 +1,275 @@
+"""Feature preparation: categorical encoding and outlier capping.
+
+Two encodings of the categorical columns share the fixed vocabulary of
+``churn.data.CATEGORIES``:
+
+- ``"onehot"``: ``pd.get_dummies`` columns, one dense column per level;
+- ``"codes"``: one ``category`` column per feature, stored as int8 codes.
+  XGBoost splits on them natively (``enable_categorical``). The other
+  models expand them with ``OneHotCodes`` into the same columns as
+  ``"onehot"``, as a CSR matrix or, for scikit-learn's trees (which fit
+  slower on sparse input), a dense float32 array.
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.utils.validation import check_is_fitted
+
+from churn.data import CATEGORIES, TARGET, compact_frame
+from churn.sketch import QuantileSketch
+
+# Rank error of the quantile sketch used by OutlierCapper.partial_fit when no
+# quantile_error is configured.
+DEFAULT_QUANTILE_ERROR = 0.01
+
+# Settings that change the prepared feature matrix. Anything that reads the
+# on-disk feature cache keys it on these values. Outlier capping is not part of
+# it: its bounds have to be learned on training rows (see OutlierCapper).
+DEFAULT_CONFIG = {
+    "drop_first": True,
+    "encoding": "onehot",
+    "compact": False,
+}
+ENCODINGS = ("onehot", "codes")
+
+
+def encode_features(df, drop_first=True, encoding="onehot", categories=None):
+    """Encode the categorical columns present in ``df``.
+
+    ``categories`` maps each column to its vocabulary (default
+    ``CATEGORIES``); values outside it become missing, so every batch gets
+    the same columns and codes. ``drop_first`` applies to ``"onehot"`` only.
+    """
+    categories = CATEGORIES if categories is None else categories
+    columns = [col for col in categories if col in df]
+    dtypes = {col: pd.CategoricalDtype(categories[col]) for col in columns
+              if df[col].dtype != pd.CategoricalDtype(categories[col])}
+    if dtypes:
+        df = df.astype(dtypes)
+    if encoding == "codes":
+        return df
+    if encoding != "onehot":
+        raise ValueError(f"Unknown encoding {encoding!r}; expected one of {ENCODINGS}")
+    return pd.get_dummies(df, columns=columns, drop_first=drop_first)
+
+
+def encoding_of(X):
+    """``"codes"`` if ``X`` has categorical columns, else ``"onehot"``."""
+    dtypes = X.dtypes if hasattr(X, "dtypes") else []
+    if any(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+        return "codes"
+    return "onehot"
+
+
+class OneHotCodes(TransformerMixin, BaseEstimator):
+    """Matrix of a frame's numeric columns and one-hot categorical codes.
+
+    The numeric columns come first, in order, followed by one column per
+    level of every ``category`` column (the first level dropped with
+    ``drop_first``), named as ``pd.get_dummies`` names them. The levels are
+    those of the column's dtype at ``fit``; rows with a missing or unseen
+    level get no one in that column's block. The output is a CSR matrix, or
+    with ``sparse_output=False`` a dense array of ``dtype`` filled in place.
+    """
+
+    def __init__(self, drop_first=True, sparse_output=True, dtype=np.float64):
+        self.drop_first = drop_first
+        self.sparse_output = sparse_output
+        self.dtype = dtype
+
+    def fit(self, X, y=None):
+        self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        self.n_features_in_ = len(self.feature_names_in_)
+        self.categories_ = {col: list(dtype.categories) for col, dtype in X.dtypes.items()
+                            if isinstance(dtype, pd.CategoricalDtype)}
+        self.numeric_ = [col for col in X.columns if col not in self.categories_]
+        return self
+
+    def _ones(self, X):
+        # (row, column) of every one, the columns counted from the first level block.
+        skip = int(self.drop_first)
+        rows, columns, offset = [np.empty(0, np.int64)], [np.empty(0, np.int64)], 0
+        for col, levels in self.categories_.items():
+            codes = pd.Categorical(X[col], categories=levels).codes.astype(np.int64) - skip
+            present = codes >= 0
+            rows.append(np.flatnonzero(present))
+            columns.append(codes[present] + offset)
+            offset += len(levels) - skip
+        return np.concatenate(rows), np.concatenate(columns), offset
+
+    def transform(self, X):
+        check_is_fitted(self, "categories_")
+        numeric = X[self.numeric_].to_numpy(self.dtype)
+        rows, columns, n_levels = self._ones(X)
+        if not self.sparse_output:
+            values = np.zeros((len(X), numeric.shape[1] + n_levels), dtype=self.dtype)
+            values[:, :numeric.shape[1]] = numeric
+            values[rows, numeric.shape[1] + columns] = 1
+            return values
+        from scipy import sparse
+
+        ones = sparse.csr_matrix((np.ones(len(rows), dtype=self.dtype), (rows, columns)),
+                                 shape=(len(X), n_levels))
+        return sparse.hstack([sparse.csr_matrix(numeric), ones], format="csr")
+
+    def get_feature_names_out(self, input_features=None):
+        check_is_fitted(self, "categories_")
+        names = list(self.numeric_)
+        for col, levels in self.categories_.items():
+            names += [f"{col}_{level}" for level in levels[int(self.drop_first):]]
+        return np.asarray(names, dtype=object)
+
+
+class OutlierCapper(TransformerMixin, BaseEstimator):
+    """Cap every column to ``[Q1 - factor * IQR, Q3 + factor * IQR]``.
+
+    The quartiles of all columns are computed in one vectorized
+    ``np.nanquantile`` call during ``fit`` and kept in ``lower_``/``upper_``,
+    so the bounds learned on training data are reused unchanged for test rows
+    and at scoring time. ``transform`` returns a ``dtype`` array (float64 by
+    default, float32 in compact mode), clipped in place (the input array
+    itself is clipped when ``copy=False`` and it already has that dtype).
+    ``transform_frame`` keeps a frame's integer columns integer where that is
+    exact.
+
+    With ``quantile_error`` set, the quartiles come from a mergeable
+    ``QuantileSketch`` with that normalized rank error instead. ``partial_fit``
+    always uses a sketch, so the bounds can be learned in one streaming pass
+    over chunks that never sit in memory together; cappers fitted on separate
+    partitions are combined with ``merge``.
+    """
+
+    def __init__(self, factor=1.5, copy=True, quantile_error=None, random_state=None,
+                 dtype=np.float64):
+        self.factor = factor
+        self.copy = copy
+        self.quantile_error = quantile_error
+        self.random_state = random_state
+        self.dtype = dtype
+
+    def _check_input(self, X):
+        values = np.asarray(X, dtype=self.dtype)
+        if values.ndim != 2:
+            raise ValueError(f"Expected a 2-D input, got shape {values.shape}")
+        return values
+
+    def _set_bounds(self, q1, q3):
+        iqr = q3 - q1
+        self.lower_ = q1 - self.factor * iqr
+        self.upper_ = q3 + self.factor * iqr
+
+    def _set_features(self, X, n_features):
+        self.n_features_in_ = n_features
+        if hasattr(X, "columns"):
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+
+    def fit(self, X, y=None):
+        for attr in ("sketch_", "lower_", "upper_"):
+            self.__dict__.pop(attr, None)
+        if self.quantile_error is not None:
+            return self.partial_fit(X)
+        values = self._check_input(X)
+        self._set_bounds(*np.nanquantile(values, [0.25, 0.75], axis=0))
+        self._set_features(X, values.shape[1])
+        return self
+
+    def partial_fit(self, X, y=None):
+        values = self._check_input(X)
+        if not hasattr(self, "sketch_"):
+            rank_error = self.quantile_error or DEFAULT_QUANTILE_ERROR
+            self.sketch_ = QuantileSketch.for_error(values.shape[1], rank_error,
+                                                    seed=self.random_state)
+            self._set_features(X, values.shape[1])
+        self.sketch_.update(values)
+        self._set_bounds(*self.sketch_.quantile([0.25, 0.75]))
+        return self
+
+    def merge(self, other):
+        """Combine with a capper partially fitted on another partition."""
+        check_is_fitted(self, "sketch_")
+        check_is_fitted(other, "sketch_")
+        self.sketch_.merge(other.sketch_)
+        self._set_bounds(*self.sketch_.quantile([0.25, 0.75]))
+        return self
+
+    def transform(self, X):
+        check_is_fitted(self, ["lower_", "upper_"])
+        if self.copy:
+            values = np.array(X, dtype=self.dtype)
+        else:
+            values = np.asarray(X, dtype=self.dtype)
+        if values.ndim != 2 or values.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} columns, got shape {values.shape}")
+        np.clip(values, self.lower_, self.upper_, out=values, casting="same_kind")
+        return values
+
+    def transform_frame(self, X):
+        """Capped copy of a frame, column by column.
+
+        An integer column keeps its type when capping it at whole numbers
+        gives the same values as ``transform``: when each bound is whole or
+        no value lies beyond it. Other columns become ``dtype``.
+        """
+        check_is_fitted(self, ["lower_", "upper_"])
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} columns, got shape {X.shape}")
+        columns = {}
+        for (col, values), lower, upper in zip(X.items(), self.lower_, self.upper_):
+            values = values.to_numpy()
+            if values.dtype.kind in "iu" and len(values):
+                info = np.iinfo(values.dtype)
+                exact_low = lower == np.floor(lower) or values.min() >= lower
+                exact_high = upper == np.floor(upper) or values.max() <= upper
+                if exact_low and exact_high:
+                    columns[col] = np.clip(values, int(max(np.ceil(lower), info.min)),
+                                           int(min(np.floor(upper), info.max)))
+                    continue
+            columns[col] = np.clip(values.astype(self.dtype), lower, upper,
+                                   dtype=self.dtype, casting="same_kind")
+        return pd.DataFrame(columns, index=X.index)
+
+    def get_feature_names_out(self, input_features=None):
+        check_is_fitted(self, "n_features_in_")
+        if input_features is not None:
+            return np.asarray(input_features, dtype=object)
+        if hasattr(self, "feature_names_in_"):
+            return self.feature_names_in_
+        return np.asarray([f"x{i}" for i in range(self.n_features_in_)], dtype=object)
+
+
+def build_preprocessor(num_cols, cat_cols, cap_outliers=True, iqr_factor=1.5,
+                       dtype=np.float64):
+    """ColumnTransformer used in front of the pipeline classifiers.
+
+    Numerical columns are capped with ``OutlierCapper`` (fit on the training
+    rows passed to ``fit``) and standardized; categorical columns are one-hot
+    encoded. The capped, scaled and one-hot columns are ``dtype`` (pass
+    ``np.float32`` for compact mode).
+    """
+    from sklearn.compose import ColumnTransformer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    num_steps = [("scale", StandardScaler())]
+    if cap_outliers:
+        num_steps.insert(0, ("cap", OutlierCapper(factor=iqr_factor, dtype=dtype)))
+    return ColumnTransformer(transformers=[
+        ("num", Pipeline(steps=num_steps), num_cols),
+        ("cat", OneHotEncoder(drop="first", handle_unknown="ignore", dtype=dtype), cat_cols),
+    ])
+
+
+def prepare_features(df, config=None):
+    """Encode a loaded frame and split off the target.
+
+    Returns ``(X, y)``; ``y`` is None when ``df`` has no target column. With
+    ``config["compact"]`` the columns are narrowed with ``compact_frame``.
+    """
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    df = encode_features(df, drop_first=config["drop_first"], encoding=config["encoding"])
+    if config["compact"]:
+        df = compact_frame(df)
+    if TARGET not in df:
+        return df, None
+    return df.drop(columns=[TARGET]), df[TARGET]
@@ -0,0 +1,213 @@
+"""Confidence intervals for the model comparison metrics.
+
+The notebook ranks models on one F1 and ROC-AUC per model, from one test
+split, so a gap of a point between two models may be noise. Two intervals
+are computed here for every metric in ``INTERVAL_METRICS``:
+
+- ``bootstrap_scores`` resamples the test rows. A resample is a vector of
+  row counts, so a batch of resamples is a ``(batch, n_rows)`` count matrix.
+  Each model's scores are sorted once (``churn.metrics``). Cumulative sums
+  of the count matrix in that order give every resample's true and false
+  positives at every threshold in one NumPy call, and all metrics follow
+  as array arithmetic. Every model sees the same resamples (a paired
+  bootstrap), so ``P(best)`` is the share of resamples in which the model
+  scores highest.
+- ``repeated_cv`` fits the models on repeated stratified folds of the
+  training rows, on a process pool. The per-fold metrics come from the
+  same batched pass, with the fold indicators as weights. The interval is
+  the corrected resampled t-interval (Nadeau and Bengio), which widens the
+  naive one for the overlap between the training sets of different folds.
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from churn.metrics import DEFAULT_THRESHOLD, METRIC_NAMES, _cutoff, _sorted, evaluate_scores
+from churn.train import split_budget
+
+INTERVAL_METRICS = METRIC_NAMES + ("Best F1",)
+DEFAULT_RESAMPLES = 2000
+# Cells of the (resamples x rows) count matrix processed at once.
+DEFAULT_BATCH_CELLS = 1 << 22
+
+_worker_state = None
+
+
+def _weighted_metrics(positive, weights, ends, k):
+    """``INTERVAL_METRICS`` for every row of ``weights``.
+
+    ``weights`` is ``(batch, n_rows)``, in the order of one sort of the
+    scores, ``positive`` the labels in that order, ``ends`` the last
+    position of every distinct score and ``k`` the number of distinct
+    scores above the cut-off. Returns a ``(batch, 6)`` array; rows without
+    both classes are NaN.
+    """
+    tp = np.cumsum(weights * positive, axis=1, dtype=np.float64)[:, ends]
+    fp = np.cumsum(weights, axis=1, dtype=np.float64)[:, ends] - tp
+    n_positive, n_negative = tp[:, -1], fp[:, -1]
+    origin = np.zeros((len(tp), 1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tpr = np.hstack([origin, tp]) / n_positive[:, None]
+        fpr = np.hstack([origin, fp]) / n_negative[:, None]
+        auc = (np.diff(fpr, axis=1) * (tpr[:, 1:] + tpr[:, :-1])).sum(axis=1) / 2
+        best_f1 = (2 * tp / (tp + fp + n_positive[:, None])).max(axis=1)
+        tp_at, fp_at = (tp[:, k - 1], fp[:, k - 1]) if k else (origin[:, 0], origin[:, 0])
+        flagged = tp_at + fp_at
+        values = np.column_stack([
+            (tp_at + n_negative - fp_at) / (n_positive + n_negative),
+            auc,
+            np.where(flagged > 0, tp_at / np.where(flagged > 0, flagged, 1), 0.0),
+            tp_at / n_positive,
+            2 * tp_at / (flagged + n_positive),
+            best_f1,
+        ])
+    values[(n_positive == 0) | (n_negative == 0)] = np.nan
+    return values
+
+
+def _p_best(values):
+    # Share of draws in which each model has the highest value of each metric.
+    winners = np.argmax(np.nan_to_num(values, nan=-np.inf), axis=0)
+    return np.stack([(winners == m).mean(axis=0) for m in range(len(values))])
+
+
+def _table(names, estimates, lower, upper, p_best):
+    index = pd.MultiIndex.from_product([names, INTERVAL_METRICS], names=["Model", "Metric"])
+    return pd.DataFrame({"Estimate": np.ravel(estimates), "Lower": np.ravel(lower),
+                         "Upper": np.ravel(upper), "P(best)": np.ravel(p_best)}, index=index)
+
+
+def bootstrap_scores(y_true, scores, names=None, n_resamples=DEFAULT_RESAMPLES,
+                     confidence=0.95, threshold=DEFAULT_THRESHOLD, random_state=42,
+                     batch_cells=DEFAULT_BATCH_CELLS):
+    """Percentile bootstrap intervals of several models' hold-out metrics.
+
+    ``scores`` is as in ``evaluate_scores``: an ``(n_models, n_rows)`` array
+    of churn probabilities with ``names``, or a dict of name to scores.
+    Returns one row per (model, metric) of ``INTERVAL_METRICS``, with the
+    point estimate on all rows, the interval bounds and ``P(best)``.
+    Resamples are processed ``batch_cells // n_rows`` at a time.
+    """
+    if isinstance(scores, dict):
+        names, scores = list(scores), list(scores.values())
+    scores = [np.asarray(model_scores) for model_scores in scores]
+    names = list(names) if names is not None else list(range(len(scores)))
+    y_true = np.asarray(y_true)
+    positive = y_true == 1
+    n_rows = len(y_true)
+    sorts = [_sorted(y_true, model_scores) for model_scores in scores]
+    cutoffs = [_cutoff(thresholds, threshold) for _, thresholds, _ in sorts]
+
+    rng = np.random.default_rng(random_state)
+    values = np.empty((len(scores), n_resamples, len(INTERVAL_METRICS)))
+    batch = max(1, batch_cells // n_rows)
+    for start in range(0, n_resamples, batch):
+        size = min(batch, n_resamples - start)
+        # Row counts of each resample, from one bincount over all draws.
+        draws = rng.integers(0, n_rows, (size, n_rows)) + (np.arange(size) * n_rows)[:, None]
+        counts = np.bincount(draws.ravel(), minlength=size * n_rows).reshape(size, n_rows)
+        for m, (order, _, ends) in enumerate(sorts):
+            values[m, start:start + size] = _weighted_metrics(positive[order], counts[:, order],
+                                                              ends, cutoffs[m])
+
+    estimates = evaluate_scores(y_true, scores, names, threshold)[list(INTERVAL_METRICS)]
+    alpha = (1 - confidence) / 2
+    lower, upper = np.nanquantile(values, [alpha, 1 - alpha], axis=1)
+    frame = _table(names, estimates.to_numpy(), lower, upper, _p_best(values))
+    frame.attrs.update(method="bootstrap", n_resamples=n_resamples, confidence=confidence)
+    return frame
+
+
+def bootstrap_models(models, X_test, y_test, **kwargs):
+    """``bootstrap_scores`` of a dict of fitted classifiers, calling each
+    model's ``predict_proba`` once."""
+    scores = np.empty((len(models), len(X_test)))
+    for i, model in enumerate(models.values()):
+        scores[i] = model.predict_proba(X_test)[:, 1]
+    return bootstrap_scores(y_test, scores, list(models), **kwargs)
+
+
+def _init_cv_worker(state):
+    global _worker_state
+    from threadpoolctl import threadpool_limits
+
+    threadpool_limits(state["n_jobs"])
+    _worker_state = state
+
+
+def _cv_task(task, state=None):
+    """Churn probabilities of one model fitted on one fold's training rows."""
+    from sklearn.base import clone
+
+    from churn.cache import _rows
+
+    state = state or _worker_state
+    name, fold = task
+    train, valid = state["folds"][fold]
+    model = clone(state["models"][name])
+    if "n_jobs" in model.get_params():
+        model.set_params(n_jobs=state["n_jobs"])
+    model.fit(_rows(state["X"], train), _rows(state["y"], train))
+    return model.predict_proba(_rows(state["X"], valid))[:, 1]
+
+
+def repeated_cv(models, X, y, n_splits=5, n_repeats=10, confidence=0.95,
+                threshold=DEFAULT_THRESHOLD, n_jobs=None, random_state=42):
+    """Corrected t-intervals of the models' metrics over repeated CV.
+
+    ``models`` is a dict of unfitted classifiers. Each is cloned and fitted
+    on every fold of ``RepeatedStratifiedKFold(n_splits, n_repeats)``, on
+    ``split_budget(n_fits, n_jobs)`` processes. All models use the same folds.
+    Returns the table of ``bootstrap_scores``. The estimate is the mean over
+    the folds, and ``P(best)`` is the share of folds in which the model
+    scores highest.
+    """
+    from scipy import stats
+    from sklearn.model_selection import RepeatedStratifiedKFold
+
+    start = time.perf_counter()
+    splitter = RepeatedStratifiedKFold(n_splits=n_splits, n_repeats=n_repeats,
+                                       random_state=random_state)
+    folds = list(splitter.split(X, y))
+    names = list(models)
+    tasks = [(name, fold) for name in names for fold in range(len(folds))]
+    outer, inner = split_budget(len(tasks), n_jobs)
+    state = {"models": models, "X": X, "y": y, "folds": folds, "n_jobs": inner}
+    if outer == 1:
+        results = [_cv_task(task, state) for task in tasks]
+    else:
+        with ProcessPoolExecutor(outer, initializer=_init_cv_worker,
+                                 initargs=(state,)) as pool:
+            results = list(pool.map(_cv_task, tasks))
+
+    # Out-of-fold scores: every repeat scores each training row once.
+    y_true = np.asarray(y)
+    positive = y_true == 1
+    scores = np.empty((len(names), n_repeats, len(y_true)))
+    fold_of = np.empty((n_repeats, len(y_true)), dtype=np.int64)
+    for (name, fold), probs in zip(tasks, results):
+        valid = folds[fold][1]
+        scores[names.index(name), fold // n_splits, valid] = probs
+        fold_of[fold // n_splits, valid] = fold % n_splits
+
+    values = np.empty((len(names), len(folds), len(INTERVAL_METRICS)))
+    for m in range(len(names)):
+        for repeat in range(n_repeats):
+            order, thresholds, ends = _sorted(y_true, scores[m, repeat])
+            weights = fold_of[repeat][order][None, :] == np.arange(n_splits)[:, None]
+            values[m, repeat * n_splits:(repeat + 1) * n_splits] = _weighted_metrics(
+                positive[order], weights, ends, _cutoff(thresholds, threshold))
+
+    n_folds = len(folds)
+    mean = np.nanmean(values, axis=1)
+    # Nadeau-Bengio: the variance of the mean over overlapping training sets
+    # is inflated by n_test / n_train = 1 / (n_splits - 1).
+    se = np.sqrt((1 / n_folds + 1 / (n_splits - 1)) * np.nanvar(values, axis=1, ddof=1))
+    half = stats.t.ppf((1 + confidence) / 2, n_folds - 1) * se
+    frame = _table(names, mean, mean - half, mean + half, _p_best(values))
+    frame.attrs.update(method="repeated_cv", n_splits=n_splits, n_repeats=n_repeats,
+                       confidence=confidence, wall_seconds=time.perf_counter() - start)
+    return frame
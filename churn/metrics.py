@@ -0,0 +1,138 @@
+"""Hold-out metrics of many models from one sort of each model's scores.
+
+Scoring a model used to call ``predict`` and ``predict_proba`` (two passes
+of the model over the test rows) and then one scikit-learn metric function
+per number, each scanning the labels again. Here each model's churn
+probabilities come from a single ``predict_proba`` call and are sorted once,
+highest first. Cumulative sums of the labels in that order give the true
+and false positives at every distinct score. The ROC-AUC (trapezoid rule,
+as in ``roc_auc_score``) and the precision, recall and F1 at every threshold
+follow from them as array arithmetic. The metrics at the 0.5 cut-off are
+read off the same arrays by binary search.
+
+The work per model is one ``argsort`` and a few linear passes, so millions
+of test rows cost well under a second per model.
+"""
+
+import numpy as np
+import pandas as pd
+
+METRIC_NAMES = ("Accuracy", "ROC-AUC", "Precision", "Recall", "F1-Score")
+# Where the F1 sweep peaks, reported next to METRIC_NAMES.
+SWEEP_NAMES = ("Best F1", "Best threshold")
+DEFAULT_THRESHOLD = 0.5
+
+
+def _sorted(y_true, scores):
+    """``(order, thresholds, ends)`` of one sort of the scores, highest first.
+
+    ``thresholds`` are the distinct scores and ``ends`` the position in
+    ``order`` of the last row scoring each: rows with tied scores change
+    label together.
+    """
+    scores = np.asarray(scores)
+    if len(scores) != len(y_true):
+        raise ValueError(f"Expected one score per label, got {len(scores)} scores "
+                         f"for {len(y_true)} labels")
+    order = np.argsort(scores)[::-1]
+    scores = scores[order]
+    ends = np.r_[np.flatnonzero(scores[1:] != scores[:-1]), len(scores) - 1]
+    return order, scores[ends], ends
+
+
+def _counts(y_true, scores):
+    """``(thresholds, tp, fp)`` at every distinct score, highest first, for
+    labelling as churn the rows that score at least the threshold."""
+    order, thresholds, ends = _sorted(y_true, scores)
+    tp = np.cumsum(np.asarray(y_true)[order] == 1, dtype=np.int64)[ends]
+    return thresholds, tp, ends + 1 - tp
+
+
+def label_scores(scores, threshold=DEFAULT_THRESHOLD):
+    """Churn labels (0/1, int8) of scores: churn when at least ``threshold``.
+
+    The one cut-off rule of the metrics here, of ``threshold_sweep`` and of
+    the scoring entry points, so a threshold picked on a sweep labels the
+    same rows when scoring.
+    """
+    return (np.asarray(scores) >= threshold).astype(np.int8)
+
+
+def _cutoff(thresholds, threshold):
+    # Number of (descending) thresholds that label_scores labels as churn.
+    return int(np.searchsorted(-thresholds, -threshold, side="right"))
+
+
+def _rates(tp, fp, n_positive):
+    flagged = tp + fp
+    precision = np.divide(tp, flagged, out=np.zeros(len(tp)), where=flagged > 0)
+    return precision, tp / n_positive, 2 * tp / (flagged + n_positive)
+
+
+def threshold_sweep(y_true, scores):
+    """Precision, recall and F1 at every distinct score of one model.
+
+    One row per threshold, highest first; each row's metrics label as churn
+    the rows scoring at least ``threshold``.
+    """
+    thresholds, tp, fp = _counts(y_true, scores)
+    precision, recall, f1 = _rates(tp, fp, tp[-1])
+    return pd.DataFrame({"threshold": thresholds, "precision": precision, "recall": recall,
+                         "f1": f1})
+
+
+def score_metrics(y_true, scores, threshold=DEFAULT_THRESHOLD):
+    """``METRIC_NAMES`` and ``SWEEP_NAMES`` of one model's churn probabilities.
+
+    Accuracy, precision, recall and F1 label as churn the rows scoring at
+    least ``threshold`` (``label_scores``); ROC-AUC uses the scores.
+    ``Best F1`` is the highest F1 over all thresholds and ``Best threshold``
+    the lowest score labelled as churn to reach it.
+    """
+    thresholds, tp, fp = _counts(y_true, scores)
+    n_positive, n_negative = tp[-1], fp[-1]
+    if n_positive == 0 or n_negative == 0:
+        raise ValueError("Expected both classes in y_true")
+    tpr = np.r_[0, tp] / n_positive
+    fpr = np.r_[0, fp] / n_negative
+    auc = float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1])) / 2)
+    precision, recall, f1 = _rates(tp, fp, n_positive)
+
+    k = _cutoff(thresholds, threshold)
+    tp_at, fp_at = (int(tp[k - 1]), int(fp[k - 1])) if k else (0, 0)
+    best = int(np.argmax(f1))
+    return {
+        "Accuracy": (tp_at + n_negative - fp_at) / (n_positive + n_negative),
+        "ROC-AUC": auc,
+        "Precision": tp_at / (tp_at + fp_at) if tp_at + fp_at else 0.0,
+        "Recall": tp_at / n_positive,
+        "F1-Score": 2 * tp_at / (tp_at + fp_at + n_positive),
+        "Best F1": float(f1[best]),
+        "Best threshold": float(thresholds[best]),
+    }
+
+
+def evaluate_scores(y_true, scores, names=None, threshold=DEFAULT_THRESHOLD):
+    """``score_metrics`` of several models scored on the same rows.
+
+    ``scores`` is an ``(n_models, n_rows)`` array, with ``names`` labelling
+    its rows, or a dict of name to scores. Returns one row per model.
+    """
+    if isinstance(scores, dict):
+        names, scores = list(scores), list(scores.values())
+    y_true = np.asarray(y_true)
+    rows = [score_metrics(y_true, model_scores, threshold) for model_scores in scores]
+    index = pd.Index(names if names is not None else range(len(rows)), name="Model")
+    return pd.DataFrame(rows, index=index, columns=list(METRIC_NAMES + SWEEP_NAMES))
+
+
+def evaluate_models(models, X_test, y_test, threshold=DEFAULT_THRESHOLD):
+    """Hold-out ``score_metrics`` of a dict of fitted classifiers, one row each.
+
+    Each model's ``predict_proba`` is called once; the churn probabilities are
+    kept in one ``(n_models, n_rows)`` array.
+    """
+    scores = np.empty((len(models), len(X_test)))
+    for i, model in enumerate(models.values()):
+        scores[i] = model.predict_proba(X_test)[:, 1]
+    return evaluate_scores(y_test, scores, list(models), threshold)
@@ -0,0 +1,618 @@
+"""Headless EDA report for customer snapshots of any size.
+
+The notebook draws its EDA figures from raw rows: histograms with KDE,
+countplots, box plots and count plots by ``Attrition_Flag``, a scatter of
+every customer and a pairplot of a 1,000-row sample. That stops working once
+a snapshot no longer fits in memory or a plot holds millions of points.
+
+``aggregate_eda`` first reduces the data to what the figures show, in one
+pass over row chunks on a process pool (``EDAAggregates``):
+
+- per class, the counts of every numeric feature in ``n_bins`` fixed bins
+  between the feature's bounds (the histograms, their KDE and the pairplot
+  diagonal);
+- per class, a ``QuantileSketch`` and the extremes of every numeric feature
+  (the box plots);
+- per class, the counts of every level of the categorical features;
+- per class, a ``grid_bins`` x ``grid_bins`` count grid for every pair of
+  ``PAIR_FEATURES`` (the transaction scatter and the pairplot), and per
+  customer segment if a ``Segments`` model is given.
+
+Counts add up and sketches merge, so chunks are aggregated independently and
+combined in any order. The fixed bins need each feature's bounds before the
+pass: they are taken from a ``SummaryStats`` (``churn.stats.summarize``,
+which the notebook already computes), and otherwise a ``summarize`` pass over
+the same chunks runs first. ``render_report`` then draws every figure from the
+aggregates with matplotlib's Agg backend, one figure per task on a process
+pool, and writes PNG files and an ``index.html``. No rows are sampled or kept:
+memory is a chunk per worker plus the aggregates, and time grows linearly
+with the number of rows.
+
+    python -m churn.report customers.csv eda_report/ --workers 8
+"""
+
+import argparse
+import html
+import itertools
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from churn.data import BINARY_MAPS, CATEGORIES, DEFAULT_CHUNKSIZE, TARGET, iter_chunks
+from churn.sketch import QuantileSketch
+
+NUMERIC_FEATURES = ["Customer_Age", "Dependent_count", "Months_on_book", "Months_Inactive_12_mon",
+                    "Contacts_Count_12_mon", "Credit_Limit", "Total_Revolving_Bal",
+                    "Avg_Open_To_Buy", "Total_Trans_Amt", "Total_Trans_Ct",
+                    "Total_Ct_Chng_Q4_Q1", "Total_Amt_Chng_Q4_Q1", "Avg_Utilization_Ratio"]
+# Levels of the categorical features, in code order (Gender is stored as 0/1).
+CATEGORICAL_LEVELS = {"Gender": list(BINARY_MAPS["Gender"]), **CATEGORIES}
+PAIR_FEATURES = ["Total_Trans_Amt", "Total_Trans_Ct", "Avg_Utilization_Ratio", "Credit_Limit"]
+CLASS_NAMES = list(BINARY_MAPS[TARGET])
+# Divisible by the notebook's 20 histogram bars (and by 10, 30, 40 and 60).
+DEFAULT_BINS = 240
+DEFAULT_GRID_BINS = 100
+DEFAULT_QUANTILE_ERROR = 0.001
+HIST_BARS = 20
+# Grid cells summed per side for the pairplot contours (100 -> 25 per axis).
+PAIR_BLOCK = 4
+
+_worker_state = None
+
+
+def _bin_index(values, low, high, n_bins):
+    """Fixed-width bin of every value, as ``np.histogram`` with
+    ``np.linspace(low, high, n_bins + 1)`` edges; values outside the bounds
+    go to the end bins and NaNs to bin 0."""
+    scaled = (values - low) / (high - low) * n_bins
+    index = np.clip(np.nan_to_num(scaled, nan=0.0), 0, n_bins - 1).astype(np.int64)
+    # The division can round a value next to an edge into the neighbouring bin.
+    step = (high - low) / n_bins
+    index -= (values < low + index * step) & (index > 0)
+    index += (values >= low + (index + 1) * step) & (index < n_bins - 1)
+    return index
+
+
+class EDAAggregates:
+    """Mergeable binned counts and sketches behind the EDA figures.
+
+    ``bounds`` maps every numeric feature to its ``(min, max)``, or is a
+    ``SummaryStats`` / summary table with ``min`` and ``max``. ``update``
+    adds a chunk holding the target and the feature columns; ``merge`` folds
+    in the aggregates of another chunk.
+    """
+
+    def __init__(self, bounds, numeric=NUMERIC_FEATURES, categorical=CATEGORICAL_LEVELS,
+                 pairs=PAIR_FEATURES, n_bins=DEFAULT_BINS, grid_bins=DEFAULT_GRID_BINS,
+                 quantile_error=DEFAULT_QUANTILE_ERROR, segments=None, seed=None):
+        self.numeric = list(numeric)
+        self.categorical = {col: list(levels) for col, levels in categorical.items()}
+        self.pairs = list(pairs)
+        self.n_bins = n_bins
+        self.grid_bins = grid_bins
+        self.quantile_error = quantile_error
+        self.segments = segments
+        self.seed = seed
+        self.low, self.high = self._bounds(bounds)
+
+        n_numeric, n_classes = len(self.numeric), len(CLASS_NAMES)
+        self.n = np.zeros(n_classes, dtype=np.int64)
+        self.hist = np.zeros((n_classes, n_numeric, n_bins), dtype=np.int64)
+        self.min = np.full((n_classes, n_numeric), np.nan)
+        self.max = np.full((n_classes, n_numeric), np.nan)
+        self.sketches = [QuantileSketch.for_error(n_numeric, quantile_error, seed=seed)
+                         for _ in CLASS_NAMES]
+        # Column 0 counts missing values, column i + 1 the i-th level.
+        self.counts = {col: np.zeros((n_classes, len(levels) + 1), dtype=np.int64)
+                       for col, levels in self.categorical.items()}
+        self.pair_index = list(itertools.combinations(range(len(self.pairs)), 2))
+        self.grids = np.zeros((n_classes, len(self.pair_index), grid_bins, grid_bins),
+                              dtype=np.int64)
+        n_segments = segments.n_clusters if segments is not None else 0
+        self.segment_grids = np.zeros((n_segments, grid_bins, grid_bins), dtype=np.int64)
+        self.attrs = {}
+
+    def _bounds(self, bounds):
+        if hasattr(bounds, "summary"):
+            bounds = bounds.summary()
+        if hasattr(bounds, "columns"):
+            bounds = {col: (bounds.loc[col, "min"], bounds.loc[col, "max"])
+                      for col in bounds.index}
+        missing = [col for col in self.numeric if col not in bounds]
+        if missing:
+            raise ValueError(f"No bounds for {missing}")
+        low = np.array([bounds[col][0] for col in self.numeric], dtype=np.float64)
+        high = np.array([bounds[col][1] for col in self.numeric], dtype=np.float64)
+        if not (np.isfinite(low).all() and np.isfinite(high).all()):
+            raise ValueError("Bounds must be finite")
+        # A constant feature still gets bins of width 1 / n_bins.
+        return low, np.where(high > low, high, low + 1.0)
+
+    @property
+    def columns(self):
+        """Columns ``update`` reads from a chunk."""
+        columns = [TARGET] + self.numeric + list(self.categorical)
+        if self.segments is not None:
+            columns += self.segments.features
+        return list(dict.fromkeys(columns))
+
+    def config(self):
+        """Keyword arguments that build empty aggregates of the same shape."""
+        return {"bounds": dict(zip(self.numeric, zip(self.low, self.high))),
+                "numeric": self.numeric, "categorical": self.categorical, "pairs": self.pairs,
+                "n_bins": self.n_bins, "grid_bins": self.grid_bins,
+                "quantile_error": self.quantile_error, "segments": self.segments,
+                "seed": self.seed}
+
+    def update(self, chunk):
+        """Add a chunk of rows."""
+        if not len(chunk):
+            return self
+        y = chunk[TARGET].to_numpy(np.int64)
+        n_classes, n_numeric = len(CLASS_NAMES), len(self.numeric)
+        values = chunk[self.numeric].to_numpy(np.float64)
+        present = ~np.isnan(values)
+        self.n += np.bincount(y, minlength=n_classes)
+
+        # Every (class, feature, bin) cell in one bincount.
+        bins = _bin_index(values, self.low, self.high, self.n_bins)
+        cells = (y[:, None] * n_numeric + np.arange(n_numeric)) * self.n_bins + bins
+        self.hist += np.bincount(cells[present], minlength=self.hist.size).reshape(
+            self.hist.shape)
+        for c in range(n_classes):
+            rows = values[y == c]
+            if len(rows):
+                self.min[c] = np.fmin(self.min[c], np.fmin.reduce(rows, axis=0))
+                self.max[c] = np.fmax(self.max[c], np.fmax.reduce(rows, axis=0))
+                self.sketches[c].update(rows)
+
+        for col, levels in self.categorical.items():
+            codes = chunk[col]
+            codes = (codes.cat.codes if isinstance(codes.dtype, pd.CategoricalDtype)
+                     else codes.fillna(-1)).to_numpy(np.int64) + 1
+            self.counts[col] += np.bincount(y * (len(levels) + 1) + codes,
+                                            minlength=self.counts[col].size).reshape(
+                                                self.counts[col].shape)
+
+        positions = [self.numeric.index(col) for col in self.pairs]
+        grid = _bin_index(values[:, positions], self.low[positions], self.high[positions],
+                          self.grid_bins)
+        both = present[:, positions]
+        size = self.grid_bins * self.grid_bins
+        for p, (i, j) in enumerate(self.pair_index):
+            keep = both[:, i] & both[:, j]
+            cells = (y[keep] * len(self.pair_index) + p) * size + grid[keep, i] * self.grid_bins
+            self.grids += np.bincount(cells + grid[keep, j], minlength=self.grids.size).reshape(
+                self.grids.shape)
+
+        if self.segments is not None:
+            # The segment scatter is the first pair (transaction amount vs count).
+            i, j = self.pair_index[0]
+            keep = both[:, i] & both[:, j]
+            labels = self.segments.predict(chunk.loc[keep])
+            cells = (labels * self.grid_bins + grid[keep, i]) * self.grid_bins + grid[keep, j]
+            self.segment_grids += np.bincount(cells, minlength=self.segment_grids.size).reshape(
+                self.segment_grids.shape)
+        return self
+
+    def merge(self, other):
+        """Fold in the aggregates of another partition with the same bins."""
+        if (other.numeric != self.numeric or other.n_bins != self.n_bins
+                or other.grid_bins != self.grid_bins or other.pairs != self.pairs
+                or not np.array_equal(other.low, self.low)
+                or not np.array_equal(other.high, self.high)):
+            raise ValueError("Only aggregates with the same features and bins can be merged")
+        self.n += other.n
+        self.hist += other.hist
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        for sketch, other_sketch in zip(self.sketches, other.sketches):
+            sketch.merge(other_sketch)
+        for col in self.counts:
+            self.counts[col] += other.counts[col]
+        self.grids += other.grids
+        self.segment_grids += other.segment_grids
+        return self
+
+    def edges(self, col, n_bins=None):
+        """Bin edges of a numeric feature, ``n_bins`` (a divisor of ``self.n_bins``) wide."""
+        i = self.numeric.index(col)
+        n_bins = n_bins or self.n_bins
+        if self.n_bins % n_bins:
+            raise ValueError(f"n_bins must divide {self.n_bins}, got {n_bins}")
+        step = (self.high[i] - self.low[i]) / self.n_bins
+        return self.low[i] + np.arange(0, self.n_bins + 1, self.n_bins // n_bins) * step
+
+    def histogram(self, col, n_bins=HIST_BARS):
+        """Per-class counts of a numeric feature in ``n_bins`` bins, and the edges."""
+        counts = self.hist[:, self.numeric.index(col)]
+        merged = counts.reshape(len(CLASS_NAMES), n_bins, -1).sum(axis=2)
+        return merged, self.edges(col, n_bins)
+
+    def density(self, col, bandwidth_scale=1.0):
+        """Gaussian KDE of a feature (all classes), evaluated at the fine bin centres.
+
+        The fine histogram is smoothed with a Gaussian of Scott's bandwidth,
+        as seaborn's ``kdeplot``; returns centres and the density.
+        """
+        counts = self.hist[:, self.numeric.index(col)].sum(axis=0).astype(np.float64)
+        edges = self.edges(col)
+        centres = (edges[:-1] + edges[1:]) / 2
+        n = counts.sum()
+        if not n:
+            return centres, np.zeros_like(centres)
+        mean = (counts * centres).sum() / n
+        std = np.sqrt((counts * (centres - mean) ** 2).sum() / n)
+        width = edges[1] - edges[0]
+        sigma = max(bandwidth_scale * std * n ** -0.2 / width, 0.5)
+        # Truncated at 4 sigma, and at the histogram's width so "same" keeps its length.
+        half = min(int(4 * sigma) + 1, (len(counts) - 1) // 2)
+        offsets = np.arange(-half, half + 1)
+        kernel = np.exp(-0.5 * (offsets / sigma) ** 2)
+        smoothed = np.convolve(counts, kernel / kernel.sum(), mode="same")
+        return centres, smoothed / (n * width)
+
+    def box_stats(self, col):
+        """``Axes.bxp`` statistics of a feature for each class.
+
+        Quartiles and median come from the class's sketch; the whiskers end at
+        1.5 IQR beyond the quartiles or at the class's extreme, whichever is
+        nearer, and the extremes beyond the whiskers are drawn as fliers.
+        """
+        i = self.numeric.index(col)
+        stats = []
+        for c, name in enumerate(CLASS_NAMES):
+            if not self.sketches[c].n:
+                continue
+            q1, median, q3 = self.sketches[c].quantile([0.25, 0.5, 0.75])[:, i]
+            low, high = self.min[c, i], self.max[c, i]
+            iqr = q3 - q1
+            whislo, whishi = max(low, q1 - 1.5 * iqr), min(high, q3 + 1.5 * iqr)
+            fliers = [v for v in (low, high) if v < whislo or v > whishi]
+            stats.append({"label": name, "q1": q1, "med": median, "q3": q3,
+                          "whislo": whislo, "whishi": whishi, "fliers": fliers})
+        return stats
+
+
+def _chunk_aggregates(chunk, config):
+    return EDAAggregates(**config).update(chunk)
+
+
+def _chunk_source(data, columns, chunksize):
+    # A callable returning a fresh iterator of frames holding ``columns``.
+    if hasattr(data, "columns"):
+        frame = data[columns]
+        return lambda: (frame.iloc[start:start + chunksize]
+                        for start in range(0, len(frame), chunksize))
+    if isinstance(data, (str, os.PathLike)):
+        return lambda: iter_chunks(data, chunksize=chunksize, usecols=columns)
+    if callable(data):
+        return lambda: (chunk[columns] for chunk in data())
+    raise ValueError("data must be a DataFrame, a file path or a callable returning chunks")
+
+
+def aggregate_eda(data, stats=None, chunksize=DEFAULT_CHUNKSIZE, n_jobs=1, **kwargs):
+    """``EDAAggregates`` of a frame, a customer file or a stream of chunks.
+
+    ``data`` is a DataFrame, a path read with ``iter_chunks``, or a callable
+    returning a fresh iterator of frames. The bins span the bounds in
+    ``stats``, the ``SummaryStats`` of the numeric features; without it,
+    ``summarize`` runs over the data first. Either is kept in
+    ``attrs["stats"]`` for the summary table and correlation heatmap. Chunks
+    are aggregated on ``core_budget(n_jobs)`` processes, at most two per
+    process in flight, and merged. Other keyword arguments go to
+    ``EDAAggregates``.
+    """
+    from churn.stats import summarize
+    from churn.train import core_budget
+
+    start = time.perf_counter()
+    numeric = list(kwargs.get("numeric", NUMERIC_FEATURES))
+    if stats is None:
+        chunks = _chunk_source(data, numeric, chunksize)
+        stats = summarize(chunks(), columns=numeric, chunk_rows=chunksize, n_jobs=n_jobs)
+    aggregates = EDAAggregates(stats, **kwargs)
+    config = aggregates.config()
+    chunks = _chunk_source(data, aggregates.columns, chunksize)()
+
+    processes = core_budget(n_jobs)
+    if processes == 1:
+        for chunk in chunks:
+            aggregates.update(chunk)
+    else:
+        with ProcessPoolExecutor(processes) as pool:
+            pending = deque()
+            for i, chunk in enumerate(chunks):
+                seed = None if config["seed"] is None else config["seed"] + i
+                pending.append(pool.submit(_chunk_aggregates, chunk, {**config, "seed": seed}))
+                if len(pending) >= 2 * processes:
+                    aggregates.merge(pending.popleft().result())
+            while pending:
+                aggregates.merge(pending.popleft().result())
+    aggregates.attrs = {"stats": stats, "wall_seconds": time.perf_counter() - start}
+    return aggregates
+
+
+def _subplots(n_panels, n_cols, panel_size):
+    import matplotlib.pyplot as plt
+
+    n_rows = -(-n_panels // n_cols)
+    fig, axes = plt.subplots(n_rows, n_cols, figsize=(panel_size[0] * n_cols,
+                                                      panel_size[1] * n_rows), squeeze=False)
+    for ax in axes.flat[n_panels:]:
+        ax.set_visible(False)
+    return fig, axes.flat
+
+
+def _plot_histograms(agg, stats):
+    fig, axes = _subplots(len(agg.numeric), 4, (3.75, 3.75))
+    for ax, col in zip(axes, agg.numeric):
+        counts, edges = agg.histogram(col)
+        ax.bar(edges[:-1], counts.sum(axis=0), width=np.diff(edges), align="edge",
+               color="tab:blue", alpha=0.5, edgecolor="white")
+        centres, density = agg.density(col)
+        ax.plot(centres, density * counts.sum() * (edges[1] - edges[0]), color="tab:blue")
+        ax.set_title(f"Distribution of {col}")
+    return fig
+
+
+def _plot_categorical(agg, stats, by_class=False):
+    colors = ["tab:blue", "tab:red"]
+    fig, axes = _subplots(len(agg.categorical), 3, (5, 5))
+    for ax, (col, levels) in zip(axes, agg.categorical.items()):
+        counts = agg.counts[col]
+        if counts[:, 0].any():
+            levels = ["(missing)"] + levels
+        else:
+            counts = counts[:, 1:]
+        x = np.arange(len(levels))
+        if by_class:
+            for c, name in enumerate(CLASS_NAMES):
+                ax.bar(x + (c - 0.5) * 0.4, counts[c], width=0.4, color=colors[c], label=name)
+            ax.legend(title=TARGET, fontsize="small")
+            ax.set_title(f"{col} vs {TARGET}")
+        else:
+            ax.bar(x, counts.sum(axis=0), color="tab:blue")
+            ax.set_title(f"Count of {col}")
+        ax.set_xticks(x, levels, rotation=45, ha="right")
+    return fig
+
+
+def _plot_categorical_by_class(agg, stats):
+    return _plot_categorical(agg, stats, by_class=True)
+
+
+def _plot_boxplots(agg, stats):
+    fig, axes = _subplots(len(agg.numeric), 4, (3.75, 3.75))
+    for ax, col in zip(axes, agg.numeric):
+        box_stats = agg.box_stats(col)
+        if box_stats:
+            ax.bxp(box_stats, patch_artist=True)
+            ax.tick_params(axis="x", labelsize="small")
+        ax.set_title(f"{col} vs {TARGET}")
+    return fig
+
+
+def _grid_extent(agg, i, j):
+    return [*_bounds_of(agg, agg.pairs[i]), *_bounds_of(agg, agg.pairs[j])]
+
+
+def _coarsen(grid, block):
+    # Sum block x block cells (the grid size must be a multiple of block).
+    n = len(grid) // block
+    return grid.reshape(n, block, n, block).sum(axis=(1, 3))
+
+
+def _grid_centres(agg, col, block=1):
+    low, high = _bounds_of(agg, col)
+    n = agg.grid_bins // block
+    return low + (np.arange(n) + 0.5) * (high - low) / n
+
+
+def _bounds_of(agg, col):
+    i = agg.numeric.index(col)
+    return agg.low[i], agg.high[i]
+
+
+def _plot_density(ax, agg, grid, i, j, cmap):
+    # Log-scaled counts of one 2-D grid, empty cells left blank.
+    image = np.ma.masked_equal(grid.T.astype(np.float64), 0)
+    ax.imshow(np.ma.log10(image), origin="lower", aspect="auto", cmap=cmap,
+              extent=_grid_extent(agg, i, j), interpolation="nearest")
+
+
+def _plot_transactions(agg, stats):
+    fig, axes = _subplots(len(CLASS_NAMES), 2, (6, 5))
+    i, j = agg.pair_index[0]
+    for c, (ax, name) in enumerate(zip(axes, CLASS_NAMES)):
+        _plot_density(ax, agg, agg.grids[c, 0], i, j, "Blues" if c == 0 else "Reds")
+        ax.set_title(f"{name} (log10 customers per cell)")
+        ax.set_xlabel(agg.pairs[i])
+        ax.set_ylabel(agg.pairs[j])
+    fig.suptitle(f"{agg.pairs[i]} vs {agg.pairs[j]}")
+    return fig
+
+
+def _plot_pairs(agg, stats):
+    import matplotlib.pyplot as plt
+
+    n = len(agg.pairs)
+    colors = ["tab:blue", "tab:red"]
+    block = PAIR_BLOCK if agg.grid_bins % PAIR_BLOCK == 0 else 1
+    fig, axes = plt.subplots(n, n, figsize=(2.5 * n, 2.5 * n), squeeze=False)
+    for row in range(n):
+        for column in range(n):
+            ax = axes[row, column]
+            if row == column:
+                counts, edges = agg.histogram(agg.pairs[row])
+                for c, name in enumerate(CLASS_NAMES):
+                    ax.stairs(counts[c] / max(counts[c].sum(), 1), edges, color=colors[c],
+                              label=name)
+            else:
+                # Contours of each class's share of customers per cell; the
+                # grid of the pair (i, j) is indexed [bin of i, bin of j].
+                p = agg.pair_index.index(tuple(sorted((row, column))))
+                x = _grid_centres(agg, agg.pairs[column], block)
+                y = _grid_centres(agg, agg.pairs[row], block)
+                for c in range(len(CLASS_NAMES)):
+                    grid = _coarsen(agg.grids[c, p], block)
+                    grid = grid.T if column < row else grid
+                    if grid.any():
+                        ax.contour(x, y, grid / grid.sum(), levels=4, colors=colors[c],
+                                   linewidths=0.8)
+            if row == n - 1:
+                ax.set_xlabel(agg.pairs[column])
+            if column == 0:
+                ax.set_ylabel(agg.pairs[row])
+    axes[0, 0].legend(fontsize="x-small")
+    fig.suptitle("Pairplot of Key Usage Metrics vs Churn", y=1.02)
+    return fig
+
+
+def _plot_segments(agg, stats):
+    import matplotlib.pyplot as plt
+
+    fig, axes = _subplots(len(agg.segment_grids), 2, (6, 5))
+    i, j = agg.pair_index[0]
+    for k, (ax, grid) in enumerate(zip(axes, agg.segment_grids)):
+        _plot_density(ax, agg, grid, i, j, plt.get_cmap("viridis"))
+        ax.set_title(f"Customer_Cluster {k}: {grid.sum():,} customers")
+        ax.set_xlabel(agg.pairs[i])
+        ax.set_ylabel(agg.pairs[j])
+    return fig
+
+
+def _plot_correlation(agg, stats):
+    import matplotlib.pyplot as plt
+
+    corr = stats.corr().loc[agg.numeric, agg.numeric]
+    fig, ax = plt.subplots(figsize=(12, 8))
+    image = ax.imshow(corr.to_numpy(), cmap="coolwarm", vmin=-1, vmax=1)
+    for (r, c), value in np.ndenumerate(corr.to_numpy()):
+        ax.text(c, r, f"{value:.2f}", ha="center", va="center", fontsize=7)
+    ax.set_xticks(range(len(corr)), corr.columns, rotation=90)
+    ax.set_yticks(range(len(corr)), corr.index)
+    fig.colorbar(image)
+    ax.set_title("Correlation Matrix of Numerical Features")
+    return fig
+
+
+FIGURES = {
+    "numeric_distributions": _plot_histograms,
+    "categorical_counts": _plot_categorical,
+    "correlation_matrix": _plot_correlation,
+    "numeric_vs_attrition": _plot_boxplots,
+    "categorical_vs_attrition": _plot_categorical_by_class,
+    "transactions_by_class": _plot_transactions,
+    "usage_pairplot": _plot_pairs,
+    "transactions_by_segment": _plot_segments,
+}
+
+
+def _init_render_worker(state):
+    global _worker_state
+    import matplotlib
+
+    matplotlib.use("Agg")
+    _worker_state = state
+
+
+def _render_task(name, state=None):
+    import matplotlib.pyplot as plt
+
+    state = state or _worker_state
+    fig = FIGURES[name](state["aggregates"], state["stats"])
+    fig.tight_layout()
+    path = os.path.join(state["out_dir"], f"{name}.png")
+    fig.savefig(path, dpi=state["dpi"], bbox_inches="tight")
+    plt.close(fig)
+    return name, path
+
+
+def _write_index(out_dir, paths, agg, stats):
+    table = stats.summary().round(2).to_html() if stats is not None else ""
+    figures = "\n".join(f'<h2>{html.escape(name.replace("_", " ").capitalize())}</h2>\n'
+                        f'<img src="{os.path.basename(path)}">' for name, path in paths.items())
+    rows = ", ".join(f"{name}: {n:,}" for name, n in zip(CLASS_NAMES, agg.n))
+    path = os.path.join(out_dir, "index.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>EDA report</title>"
+                f"</head><body>\n<h1>EDA report</h1>\n<p>{html.escape(rows)}</p>\n"
+                f"{table}\n{figures}\n</body></html>\n")
+    return path
+
+
+def render_report(aggregates, out_dir, stats=None, workers=1, dpi=100):
+    """Draw every figure of ``FIGURES`` from ``aggregates`` into ``out_dir``.
+
+    ``stats`` (default: ``aggregates.attrs["stats"]``) adds the correlation
+    heatmap and the summary table. The figures are drawn on
+    ``core_budget(workers)`` processes with the Agg backend. Returns a dict
+    of figure name to PNG path, plus ``"index"`` for the HTML page.
+    """
+    from churn.train import core_budget
+
+    if stats is None:
+        stats = aggregates.attrs.get("stats")
+    os.makedirs(out_dir, exist_ok=True)
+    names = [name for name in FIGURES
+             if (name != "correlation_matrix" or stats is not None)
+             and (name != "transactions_by_segment" or len(aggregates.segment_grids))]
+    state = {"aggregates": aggregates, "stats": stats, "out_dir": out_dir, "dpi": dpi}
+    processes = min(core_budget(workers), len(names))
+    if processes == 1:
+        # Figures are closed once saved, so an interactive backend shows nothing.
+        results = [_render_task(name, state) for name in names]
+    else:
+        with ProcessPoolExecutor(processes, initializer=_init_render_worker,
+                                 initargs=(state,)) as pool:
+            results = list(pool.map(_render_task, names))
+    paths = dict(results)
+    paths["index"] = _write_index(out_dir, paths, aggregates, stats)
+    return paths
+
+
+def build_report(data, out_dir, stats=None, segments=None, chunksize=DEFAULT_CHUNKSIZE,
+                 workers=1, log=None, **kwargs):
+    """``aggregate_eda`` then ``render_report``: the EDA report of ``data``.
+
+    Returns the paths of ``render_report``; timings are printed to ``log``.
+    """
+    start = time.perf_counter()
+    aggregates = aggregate_eda(data, stats=stats, chunksize=chunksize, n_jobs=workers,
+                               segments=segments, **kwargs)
+    aggregated = time.perf_counter()
+    paths = render_report(aggregates, out_dir, stats=aggregates.attrs["stats"], workers=workers)
+    if log is not None:
+        print(f"Aggregated {aggregates.n.sum():,} rows in {aggregated - start:.1f}s, "
+              f"rendered {len(paths) - 1} figures in {time.perf_counter() - aggregated:.1f}s "
+              f"to {out_dir}", file=log)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write the EDA report of a customer file.")
+    parser.add_argument("input", help="customer file (.csv or .parquet)")
+    parser.add_argument("out_dir", help="directory for the PNG figures and index.html")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="aggregation and rendering processes (-1 for all cores)")
+    parser.add_argument("--segments", default=None,
+                        help="segmentation saved with Segments.save, for the segment scatter")
+    args = parser.parse_args(argv)
+    segments = None
+    if args.segments:
+        from churn.cluster import Segments
+
+        segments = Segments.load(args.segments)
+    build_report(args.input, args.out_dir, segments=segments, chunksize=args.chunksize,
+                 workers=args.workers, log=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""Resampling of the imbalanced training rows.
+
+Only oversampling has to create rows. Random undersampling is a choice of
+existing rows, so ``undersample_rows`` returns their positions and callers
+index ``X_train`` at fit time instead of keeping a copy per strategy; and
+``balanced_weights`` gets SMOTE's rebalancing effect without new rows by
+weighting each class to the same total. Several strategies can then share
+one copy of the training rows.
+
+``imblearn.over_sampling.SMOTE`` runs one exact k-NN query over the whole
+minority class and then stacks the original and synthetic rows into a new
+dense copy of the training set, on one core. ``BatchedSMOTE`` implements the
+same algorithm for large snapshots:
+
+- the neighbour search runs in batches of query rows on a process pool,
+  either exact (brute force) or through an approximate
+  inverted-file index (``index="ivf"``: the minority rows are clustered with
+  mini-batch k-means and each row only searches its own and the ``n_probe``
+  nearest clusters);
+- the output is one preallocated float32 buffer holding the original rows
+  followed by the synthetic ones, which are interpolated into it chunk by
+  chunk, so nothing larger than a chunk is allocated besides the result.
+"""
+
+import numpy as np
+import pandas as pd
+
+from churn.train import core_budget
+
+# Query rows per task of the exact neighbour search.
+DEFAULT_BATCH_ROWS = 16384
+DEFAULT_CHUNK_ROWS = 65536
+INDEX_TYPES = ("exact", "ivf")
+
+_worker_state = None
+
+
+def undersample_rows(y, ratio=1.0, random_state=42):
+    """Positions of the rows ``RandomUnderSampler`` keeps, in its order.
+
+    Every minority row is kept and ``n_minority / ratio`` majority rows are
+    drawn without replacement, with the same draws as
+    ``RandomUnderSampler(sampling_strategy=ratio, random_state=random_state)``.
+    """
+    y = np.asarray(y)
+    classes, counts = np.unique(y, return_counts=True)
+    if len(classes) != 2:
+        raise ValueError(f"Expected a binary target, got classes {classes}")
+    rng = np.random.RandomState(random_state)
+    n_majority = int(counts.min() / ratio)
+    rows = []
+    for target, count in zip(classes, counts):
+        members = np.flatnonzero(y == target)
+        if count == counts.max():
+            members = members[rng.choice(range(count), size=n_majority, replace=False)]
+        rows.append(members)
+    return np.concatenate(rows)
+
+
+def balanced_weights(y, ratio=1.0):
+    """Per-row sample weights that give the minority class ``ratio`` times the
+    majority's total weight, with a mean weight of 1 when ``ratio`` is 1.
+
+    Fitting with them rebalances the classes the way oversampling the
+    minority to ``ratio`` does, without adding rows.
+    """
+    y = np.asarray(y)
+    classes, counts = np.unique(y, return_counts=True)
+    if len(classes) != 2:
+        raise ValueError(f"Expected a binary target, got classes {classes}")
+    minority = classes[np.argmin(counts)]
+    weights = len(y) / (2 * counts.astype(np.float64))
+    weights[np.argmin(counts)] *= ratio
+    return np.where(y == minority, weights[np.argmin(counts)], weights[np.argmax(counts)])
+
+
+def _init_neighbor_worker(state):
+    global _worker_state
+    from threadpoolctl import threadpool_limits
+
+    threadpool_limits(1)
+    _worker_state = state
+
+
+def _nearest(queries, candidates, k):
+    """Positions of the k nearest candidates of every query, itself excluded.
+
+    As in imblearn, each query is one of the candidates and the first of its
+    ``k + 1`` nearest ones is dropped as itself.
+    """
+    from sklearn.neighbors import NearestNeighbors
+
+    index = NearestNeighbors(n_neighbors=k + 1, algorithm="brute").fit(candidates)
+    return index.kneighbors(queries, return_distance=False)[:, 1:]
+
+
+def _neighbor_task(task, state=None):
+    state = state or _worker_state
+    rows, k = state["rows"], state["k"]
+    if state["clusters"] is None:
+        start, stop = task
+        return np.arange(start, stop), _nearest(rows[start:stop], rows, k)
+    ids = state["clusters"][task]
+    candidate_ids = np.concatenate([state["clusters"][c] for c in state["probes"][task]])
+    return ids, candidate_ids[_nearest(rows[ids], rows[candidate_ids], k)]
+
+
+class BatchedSMOTE:
+    """SMOTE oversampling with a batched, parallel neighbour search.
+
+    Works like ``SMOTE(random_state=...).fit_resample`` for a binary target:
+    each synthetic minority row lies at a uniform random point between a
+    random minority row and one of its ``k_neighbors`` nearest minority
+    neighbours, until the minority class has ``ratio`` times as many rows as
+    the majority class. Synthetic values of integer columns are truncated
+    and those of boolean (one-hot) columns are 1 when nonzero, as imblearn's
+    cast back to the input dtypes does. The random draws differ from
+    imblearn's, so individual synthetic rows do too.
+
+    ``index="ivf"`` approximates the neighbour search: the minority rows are
+    split into ``n_clusters`` (default ``sqrt(n_minority)``) k-means clusters
+    and each cluster's rows search the ``n_probe`` clusters nearest to its
+    centroid (its own included). Batches of ``batch_rows`` query rows (or
+    clusters) are searched with scikit-learn's brute-force ``kneighbors``,
+    which computes distances in bounded blocks, on ``core_budget(n_jobs)``
+    processes.
+
+    ``fit_resample`` returns a DataFrame backed by one float32 buffer (the
+    original rows first, then ``n_synthetic_`` generated ones) and the
+    matching target Series. ``neighbors_`` holds the neighbour table, by
+    position among the minority rows.
+    """
+
+    def __init__(self, k_neighbors=5, ratio=1.0, index="exact", n_clusters=None, n_probe=3,
+                 n_jobs=None, batch_rows=DEFAULT_BATCH_ROWS, chunk_rows=DEFAULT_CHUNK_ROWS,
+                 random_state=42):
+        if index not in INDEX_TYPES:
+            raise ValueError(f"Unknown index {index!r}; expected one of {INDEX_TYPES}")
+        self.k_neighbors = k_neighbors
+        self.ratio = ratio
+        self.index = index
+        self.n_clusters = n_clusters
+        self.n_probe = n_probe
+        self.n_jobs = n_jobs
+        self.batch_rows = batch_rows
+        self.chunk_rows = chunk_rows
+        self.random_state = random_state
+
+    def _clusters(self, rows):
+        # Members of each k-means cluster and, per cluster, the clusters its
+        # rows search, widened until they hold more than k rows.
+        from sklearn.cluster import MiniBatchKMeans
+
+        n_clusters = self.n_clusters or max(1, int(np.sqrt(len(rows))))
+        kmeans = MiniBatchKMeans(n_clusters, random_state=self.random_state, n_init=3)
+        labels = kmeans.fit_predict(rows)
+        clusters = [np.flatnonzero(labels == c) for c in range(n_clusters)]
+        centers = kmeans.cluster_centers_
+        sizes = np.array([len(members) for members in clusters])
+        norms = np.einsum("ij,ij->i", centers, centers)
+        order = np.argsort(norms[None, :] - 2 * centers @ centers.T, axis=1)
+        probes = []
+        for c in range(n_clusters):
+            n_probe = self.n_probe
+            while n_probe < n_clusters and sizes[order[c, :n_probe]].sum() <= self.k_neighbors:
+                n_probe += 1
+            probe = order[c, :n_probe]
+            # A row is its own nearest neighbour only if its cluster is searched.
+            probes.append(probe if c in probe else np.r_[c, probe[:-1]])
+        tasks = [c for c in range(n_clusters) if sizes[c]]
+        return clusters, probes, tasks
+
+    def _neighbors(self, rows):
+        from concurrent.futures import ProcessPoolExecutor
+
+        k = self.k_neighbors
+        if len(rows) <= k:
+            raise ValueError(f"Expected more than k_neighbors={k} minority rows, got {len(rows)}")
+        clusters = probes = None
+        processes = core_budget(self.n_jobs)
+        if self.index == "ivf":
+            clusters, probes, tasks = self._clusters(rows)
+        else:
+            step = min(self.batch_rows, -(-len(rows) // processes))
+            tasks = [(start, min(start + step, len(rows))) for start in range(0, len(rows), step)]
+        state = {"rows": rows, "k": k, "clusters": clusters, "probes": probes}
+
+        neighbors = np.empty((len(rows), k), dtype=np.int64)
+        if processes > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(min(processes, len(tasks)),
+                                     initializer=_init_neighbor_worker,
+                                     initargs=(state,)) as pool:
+                results = pool.map(_neighbor_task, tasks)
+                for ids, found in results:
+                    neighbors[ids] = found
+        else:
+            for task in tasks:
+                ids, found = _neighbor_task(task, state)
+                neighbors[ids] = found
+        return neighbors
+
+    def fit_resample(self, X, y):
+        y_values = np.asarray(y)
+        classes, counts = np.unique(y_values, return_counts=True)
+        if len(classes) != 2:
+            raise ValueError(f"Expected a binary target, got classes {classes}")
+        minority = classes[np.argmin(counts)]
+        n_rows, n_minority = len(y_values), counts.min()
+        n_new = max(0, int(round(self.ratio * counts.max())) - n_minority)
+
+        columns = list(X.columns) if hasattr(X, "columns") else None
+        dtypes = list(X.dtypes) if columns is not None else [X.dtype] * X.shape[1]
+        integer = [j for j, dtype in enumerate(dtypes) if dtype.kind in "iu"]
+        boolean = [j for j, dtype in enumerate(dtypes) if dtype.kind == "b"]
+        buffer = np.empty((n_rows + n_new, X.shape[1]), dtype=np.float32)
+        if columns is None:
+            buffer[:n_rows] = X
+        else:
+            # Column by column, so a mixed-dtype frame is never copied whole.
+            for j, col in enumerate(columns):
+                buffer[:n_rows, j] = X[col].to_numpy()
+        minority_rows = buffer[:n_rows][y_values == minority]
+
+        self.neighbors_ = self._neighbors(minority_rows.astype(np.float64))
+        rng = np.random.RandomState(self.random_state)
+        samples = rng.randint(0, n_minority * self.k_neighbors, size=n_new)
+        gaps = rng.uniform(size=n_new).astype(np.float32)
+        for start in range(0, n_new, self.chunk_rows):
+            stop = min(start + self.chunk_rows, n_new)
+            base = samples[start:stop] // self.k_neighbors
+            neighbor = self.neighbors_[base, samples[start:stop] % self.k_neighbors]
+            out = buffer[n_rows + start:n_rows + stop]
+            np.subtract(minority_rows[neighbor], minority_rows[base], out=out)
+            out *= gaps[start:stop, None]
+            out += minority_rows[base]
+            # Same values imblearn gets by casting back to the input dtypes.
+            if integer:
+                out[:, integer] = np.trunc(out[:, integer])
+            if boolean:
+                out[:, boolean] = out[:, boolean] != 0
+        self.n_synthetic_ = n_new
+
+        y_res = np.concatenate([y_values, np.full(n_new, minority, dtype=y_values.dtype)])
+        if columns is None:
+            return buffer, y_res
+        return (pd.DataFrame(buffer, columns=columns, copy=False),
+                pd.Series(y_res, name=getattr(y, "name", None)))
@@ -0,0 +1,235 @@
+"""Batch scoring of customer files with a persisted churn model.
+
+The input is streamed in chunks, the chunks are scored on a process pool and
+the results are written in input order as they come back. At most
+``2 * workers`` chunks are in flight at any time, so peak memory depends on
+the chunk size and the number of workers, not on the size of the input.
+
+    python -m churn.score xgb_pipeline.joblib customers.csv scores.csv --workers 8
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import pandas as pd
+
+from churn.data import CATEGORIES, DEFAULT_CHUNKSIZE, ID_COLUMN, TARGET, compact_frame, iter_chunks
+from churn.features import DEFAULT_CONFIG, encode_features
+from churn.metrics import label_scores
+
+OUTPUT_COLUMNS = [ID_COLUMN, "churn_probability", "churn_prediction"]
+
+
+def save_model(path, model, columns, fill_values, threshold=0.5, config=None):
+    """Persist a fitted model together with what is needed to score raw files.
+
+    ``columns`` are the feature columns the model was fitted on and
+    ``fill_values`` the category modes used to impute the training data
+    (``df.attrs["fill_values"]`` of the loaded frame). The vocabulary of the
+    categorical columns (``CATEGORIES``) is saved with it, so scored batches
+    are encoded with the training levels.
+    """
+    bundle = {
+        "model": model,
+        "columns": list(columns),
+        "fill_values": dict(fill_values),
+        "threshold": threshold,
+        "config": {**DEFAULT_CONFIG, **(config or {})},
+        "categories": {col: list(levels) for col, levels in CATEGORIES.items()},
+    }
+    joblib.dump(bundle, path)
+
+
+def load_model(path):
+    """Load a bundle written by ``save_model``."""
+    return joblib.load(path)
+
+
+def prepare_batch(chunk, bundle):
+    """Turn a typed chunk from ``iter_chunks`` into the model's input frame.
+
+    ``ValueError`` is raised when a column the model was fitted on cannot be
+    built from the chunk (e.g. one the training frame gained after loading).
+    """
+    config = {**DEFAULT_CONFIG, **bundle["config"]}
+    X = encode_features(chunk, drop_first=config["drop_first"], encoding=config["encoding"],
+                        categories=bundle.get("categories"))
+    if config["compact"]:
+        X = compact_frame(X)
+    missing = [col for col in bundle["columns"] if col not in X]
+    if missing:
+        raise ValueError(f"The model needs columns the input does not have: {missing}")
+    return X[bundle["columns"]]
+
+
+def score_frame(chunk, bundle):
+    """Churn probability and label for every row of a typed chunk."""
+    proba = bundle["model"].predict_proba(prepare_batch(chunk, bundle))[:, 1]
+    return pd.DataFrame({
+        ID_COLUMN: chunk[ID_COLUMN].to_numpy(),
+        "churn_probability": proba,
+        "churn_prediction": label_scores(proba, bundle["threshold"]),
+    })
+
+
+def _single_threaded(model):
+    # Parallelism comes from the process pool; an estimator that also spreads
+    # each predict call over every core would oversubscribe the machine.
+    if hasattr(model, "get_params"):
+        params = {name: 1 for name in model.get_params() if name.split("__")[-1] == "n_jobs"}
+        model.set_params(**params)
+    return model
+
+
+_worker_bundle = None
+
+
+def _init_worker(model_path):
+    global _worker_bundle
+    _worker_bundle = load_model(model_path)
+    _single_threaded(_worker_bundle["model"])
+
+
+def _score_in_worker(chunk):
+    return score_frame(chunk, _worker_bundle)
+
+
+class _Writer:
+    """Writes the scores to a temporary file next to ``path``; ``close`` moves
+    it into place, ``abort`` deletes it, so a failed run leaves no output."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.parquet = self.path.endswith(".parquet")
+        fd, self.tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)),
+                                             prefix=".tmp-", suffix=os.path.splitext(self.path)[1])
+        os.close(fd)
+        self._parquet_writer = None
+        self._header = True
+
+    def write(self, scores):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(scores, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.tmp_path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            scores.to_csv(self.tmp_path, mode="w" if self._header else "a",
+                          header=self._header, index=False)
+            self._header = False
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        elif self._header:
+            pd.DataFrame(columns=OUTPUT_COLUMNS).to_csv(self.tmp_path, index=False)
+        # mkstemp creates the file readable by its owner only.
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(self.tmp_path, 0o666 & ~umask)
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        try:
+            if self._parquet_writer is not None:
+                self._parquet_writer.close()
+        finally:
+            if os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+
+
+def score_file(model_path, input_path, output_path, chunksize=DEFAULT_CHUNKSIZE,
+               workers=1, threshold=None, log=sys.stderr):
+    """Score ``input_path`` into ``output_path`` and return throughput stats.
+
+    ``workers=0`` scores in the calling process (handy for debugging). The
+    input must have the ``CLIENTNUM`` column; ``ValueError`` is raised before
+    anything is scored otherwise. The scores are written to a temporary file
+    that replaces ``output_path`` only once every chunk is scored; if a chunk
+    fails, ``output_path`` is left as it was.
+    """
+    bundle = load_model(model_path)
+    if threshold is not None:
+        bundle["threshold"] = threshold
+    chunks = iter_chunks(input_path, chunksize=chunksize,
+                         fill_values=bundle["fill_values"])
+    # Check the first chunk before any output is written or a worker started.
+    first = next(chunks, None)
+    if first is not None:
+        if ID_COLUMN not in first:
+            raise ValueError(f"{input_path} has no {ID_COLUMN} column to identify the scores")
+        chunks = itertools.chain([first], chunks)
+    writer = _Writer(output_path)
+    n_rows = 0
+    start = time.perf_counter()
+
+    def write(scores):
+        nonlocal n_rows
+        writer.write(scores)
+        n_rows += len(scores)
+        if log is not None:
+            elapsed = time.perf_counter() - start
+            print(f"{n_rows:,} rows, {n_rows / elapsed:,.0f} rows/s", file=log)
+
+    try:
+        if workers == 0:
+            _single_threaded(bundle["model"])
+            for chunk in chunks:
+                write(score_frame(chunk.drop(columns=[TARGET], errors="ignore"), bundle))
+        else:
+            with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                     initargs=(model_path,)) as pool:
+                pending = deque()
+                for chunk in chunks:
+                    chunk = chunk.drop(columns=[TARGET], errors="ignore")
+                    pending.append(pool.submit(_score_in_worker, chunk))
+                    if len(pending) >= 2 * workers:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+
+    elapsed = time.perf_counter() - start
+    stats = {"rows": n_rows, "seconds": elapsed,
+             "rows_per_second": n_rows / elapsed if elapsed else float("nan")}
+    if log is not None:
+        print(f"Scored {n_rows:,} rows in {elapsed:.1f}s "
+              f"({stats['rows_per_second']:,.0f} rows/s)", file=log)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a customer file with a saved churn model.")
+    parser.add_argument("model", help="bundle written by churn.score.save_model")
+    parser.add_argument("input", help="customer file (.csv or .parquet)")
+    parser.add_argument("output", help="where to write the scores (.csv or .parquet)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="scoring processes (0 scores in the main process)")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="probability cut-off for churn_prediction (default: the saved one)")
+    args = parser.parse_args(argv)
+    try:
+        score_file(args.model, args.input, args.output, chunksize=args.chunksize,
+                   workers=args.workers, threshold=args.threshold)
+    except ValueError as error:
+        # A data error, not a usage error: no usage text, exit status 1.
+        print(f"error: {error}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""Local HTTP service for scoring single customers with low latency.
+
+Scoring one customer at a time pays the full pandas and ColumnTransformer
+overhead on every request. The service instead queues incoming requests and
+a single scoring thread gathers them into micro-batches: a batch is scored as
+soon as it holds ``max_batch_size`` customers or the oldest request in it has
+waited ``max_delay_ms``, whichever comes first.
+
+    python -m churn.serve xgb_pipeline.joblib --port 8000 --max-delay-ms 2
+
+Endpoints:
+
+- ``POST /score`` with one customer record (a JSON object with the file's raw
+  columns) or a list of them; returns ``{"scores": [...]}``.
+- ``GET /metrics`` returns request/batch counters, throughput and the p50/p99
+  latency of recent requests.
+"""
+
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from churn.data import ID_COLUMN, convert_frame
+from churn.fastpath import RecordScorer
+from churn.metrics import label_scores
+from churn.score import load_model, score_frame
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_DELAY_MS = 2.0
+_LATENCY_WINDOW = 10_000
+
+
+class MicroBatcher:
+    """Group concurrent scoring calls into batches scored in one call.
+
+    ``score_batch`` receives a list of raw records and must return one result
+    per record, in order.
+    """
+
+    def __init__(self, score_batch, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 max_delay_ms=DEFAULT_MAX_DELAY_MS):
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay_ms / 1000
+        self.batches = 0
+        self.batched_records = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, records):
+        """Queue a list of records; the returned Future resolves to their results."""
+        future = Future()
+        self._queue.put((time.perf_counter(), records, future))
+        return future
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            size = len(item[1])
+            deadline = item[0] + self.max_delay
+            while size < self.max_batch_size:
+                # Requests that queued up while the previous batch was being
+                # scored are taken even when the budget is already used up.
+                timeout = deadline - time.perf_counter()
+                try:
+                    if timeout > 0:
+                        item = self._queue.get(timeout=timeout)
+                    else:
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+                size += len(item[1])
+            self._score(batch)
+
+    def _score(self, batch):
+        records = [record for _, item_records, _ in batch for record in item_records]
+        try:
+            results = self.score_batch(records)
+        except Exception:
+            # One invalid request must not fail the others it was batched
+            # with: score the requests one by one to find the culprit.
+            for _, item_records, future in batch:
+                try:
+                    future.set_result(self.score_batch(item_records))
+                except Exception as exc:
+                    future.set_exception(exc)
+            return
+        self.batches += 1
+        self.batched_records += len(records)
+        start = 0
+        for _, item_records, future in batch:
+            future.set_result(results[start:start + len(item_records)])
+            start += len(item_records)
+
+
+class ServiceStats:
+    """Thread-safe request counters and a window of recent latencies."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.errors = 0
+        self._latencies = deque(maxlen=_LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def record(self, seconds, ok=True):
+        with self._lock:
+            self.requests += 1
+            self.errors += not ok
+            self._latencies.append(seconds)
+
+    def snapshot(self, batcher=None):
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            requests, errors = self.requests, self.errors
+        uptime = time.perf_counter() - self.started
+        snapshot = {
+            "uptime_seconds": uptime,
+            "requests": requests,
+            "errors": errors,
+            "requests_per_second": requests / uptime if uptime else 0.0,
+        }
+        if len(latencies):
+            p50, p99 = np.percentile(latencies, [50, 99])
+            snapshot.update(latency_ms_p50=p50, latency_ms_p99=p99,
+                            latency_ms_max=latencies.max())
+        if batcher is not None and batcher.batches:
+            snapshot.update(batches=batcher.batches,
+                            mean_batch_size=batcher.batched_records / batcher.batches)
+        return snapshot
+
+
+def make_scorer(bundle, fast_path=True):
+    """Batch scoring function over raw JSON records for a saved model bundle.
+
+    Records are scored with ``churn.fastpath.RecordScorer`` when the bundle's
+    pipeline supports it, and through pandas and ``score_frame`` otherwise.
+    """
+    if fast_path:
+        try:
+            scorer = RecordScorer.from_bundle(bundle)
+        except NotImplementedError:
+            pass
+        else:
+            def score_records(records):
+                proba = scorer.predict_proba(records)
+                labels = label_scores(proba, scorer.threshold)
+                return [{ID_COLUMN: record.get(ID_COLUMN), "churn_probability": p,
+                         "churn_prediction": label}
+                        for record, p, label in zip(records, proba.tolist(), labels.tolist())]
+
+            return score_records
+
+    def score_batch(records):
+        frame = convert_frame(pd.DataFrame.from_records(records), bundle["fill_values"])
+        return score_frame(frame, bundle).to_dict("records")
+
+    return score_batch
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, default=float).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/metrics":
+            self._send(404, {"error": "not found"})
+            return
+        self._send(200, self.server.stats.snapshot(self.server.batcher))
+
+    def do_POST(self):
+        start = time.perf_counter()
+        if self.path != "/score":
+            self._send(404, {"error": "not found"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            records = payload if isinstance(payload, list) else [payload]
+            scores = self.server.batcher.submit(records).result()
+        except Exception as exc:
+            self.server.stats.record(time.perf_counter() - start, ok=False)
+            self._send(400, {"error": str(exc)})
+            return
+        self.server.stats.record(time.perf_counter() - start)
+        self._send(200, {"scores": scores})
+
+    def log_message(self, format, *args):
+        # Per-request access logs would dominate the latency being measured.
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Bursts of new keep-alive connections from many clients would otherwise
+    # overflow the default listen backlog of 5.
+    request_queue_size = 128
+
+
+def make_server(bundle, host="127.0.0.1", port=8000, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                max_delay_ms=DEFAULT_MAX_DELAY_MS, fast_path=True):
+    """HTTP server scoring with ``bundle`` (see ``churn.score.save_model``)."""
+    server = _Server((host, port), _Handler)
+    server.batcher = MicroBatcher(make_scorer(bundle, fast_path), max_batch_size, max_delay_ms)
+    server.stats = ServiceStats()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a saved churn model over HTTP.")
+    parser.add_argument("model", help="bundle written by churn.score.save_model")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument("--max-delay-ms", type=float, default=DEFAULT_MAX_DELAY_MS,
+                        help="latency budget for gathering a batch")
+    parser.add_argument("--no-fast-path", dest="fast_path", action="store_false",
+                        help="always score through pandas and the full pipeline")
+    args = parser.parse_args(argv)
+
+    server = make_server(load_model(args.model), args.host, args.port,
+                         args.max_batch_size, args.max_delay_ms, args.fast_path)
+    print(f"Serving on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.batcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Mergeable approximate quantiles for data that does not fit in memory.
+
+``QuantileSketch`` is a KLL sketch (Karnin, Lang & Liberty, 2016) kept for
+many columns at once. Every column receives the same number of values, so all
+columns share one compaction schedule and each level is stored as a single
+``(items, n_columns)`` array that is sorted and halved column-wise with NumPy.
+Sketches built on separate chunks or worker processes are combined with
+``merge`` and answer quantile queries for the union of their inputs.
+
+The rank error is about ``KLL_ERROR_CONSTANT / k`` of the number of values
+seen (with ~99% probability), independent of how many values were streamed;
+the sketch itself holds roughly ``3 * k`` rows per column.
+"""
+
+import math
+
+import numpy as np
+
+# Normalized rank error of a KLL sketch is ~ KLL_ERROR_CONSTANT / k at ~99%
+# confidence (empirical constant published with Apache DataSketches).
+KLL_ERROR_CONSTANT = 3.3
+DEFAULT_K = 200
+
+_CAPACITY_DECAY = 2 / 3
+_MIN_CAPACITY = 8
+
+
+def k_for_error(rank_error):
+    """Smallest ``k`` whose expected normalized rank error is ``rank_error``."""
+    if not 0 < rank_error < 1:
+        raise ValueError(f"rank_error must be in (0, 1), got {rank_error}")
+    return max(_MIN_CAPACITY, math.ceil(KLL_ERROR_CONSTANT / rank_error))
+
+
+class QuantileSketch:
+    """KLL quantile sketch over the columns of a 2-D array.
+
+    Parameters
+    ----------
+    n_columns : int
+        Number of columns every ``update`` batch must have.
+    k : int
+        Accuracy parameter; see ``k_for_error`` to derive it from a target
+        rank error.
+    seed : int, optional
+        Seed for the random choices made while compacting.
+    """
+
+    def __init__(self, n_columns, k=DEFAULT_K, seed=None):
+        if k < _MIN_CAPACITY:
+            raise ValueError(f"k must be at least {_MIN_CAPACITY}, got {k}")
+        self.n_columns = n_columns
+        self.k = k
+        self.n = 0
+        self.levels = []
+        self._rng = np.random.default_rng(seed)
+
+    @classmethod
+    def for_error(cls, n_columns, rank_error, seed=None):
+        return cls(n_columns, k=k_for_error(rank_error), seed=seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - 1 - level
+        return max(_MIN_CAPACITY, math.ceil(self.k * _CAPACITY_DECAY ** depth))
+
+    def _add(self, level, items):
+        while len(self.levels) <= level:
+            self.levels.append(np.empty((0, self.n_columns)))
+        if len(self.levels[level]):
+            items = np.concatenate([self.levels[level], items])
+        self.levels[level] = items
+
+    def _compact(self, level):
+        items = np.sort(self.levels[level], axis=0)
+        odd = len(items) % 2
+        offset = self._rng.integers(2)
+        self.levels[level] = items[len(items) - odd:]
+        self._add(level + 1, items[offset:len(items) - odd:2])
+
+    def _compress(self):
+        while True:
+            for level in range(len(self.levels)):
+                if len(self.levels[level]) > self._capacity(level):
+                    self._compact(level)
+                    break
+            else:
+                return
+
+    def update(self, values):
+        """Add a batch of rows (array-like of shape ``(rows, n_columns)``)."""
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim != 2 or values.shape[1] != self.n_columns:
+            raise ValueError(f"Expected shape (rows, {self.n_columns}), got {values.shape}")
+        if not len(values):
+            return self
+        self.n += len(values)
+
+        # A batch much larger than k would be sorted and halved several times
+        # in a row. Sorting once and keeping every 2**level-th row from a
+        # random offset gives the same result as those repeated compactions.
+        level = max(0, int(math.log2(len(values) / self.k)))
+        if level:
+            values = np.sort(values, axis=0)
+            stride = 2 ** level
+            usable = len(values) - len(values) % stride
+            offset = self._rng.integers(stride)
+            self._add(0, values[usable:])
+            self._add(level, values[offset:usable:stride])
+        else:
+            self._add(0, np.array(values))
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Fold another sketch of the same shape into this one."""
+        if other.n_columns != self.n_columns or other.k != self.k:
+            raise ValueError("Only sketches with the same n_columns and k can be merged")
+        for level, items in enumerate(other.levels):
+            if len(items):
+                self._add(level, items)
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        """Approximate quantiles of every column.
+
+        Returns an array of shape ``(len(q), n_columns)`` (or ``(n_columns,)``
+        for a scalar ``q``). NaNs are ignored, like ``np.nanquantile``.
+        """
+        if not self.n:
+            raise ValueError("Cannot query an empty sketch")
+        q = np.asarray(q, dtype=np.float64)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** i)
+                                  for i, level in enumerate(self.levels)])
+        order = np.argsort(items, axis=0)
+        items = np.take_along_axis(items, order, axis=0)
+        cum_weights = np.cumsum(np.where(np.isnan(items), 0.0, weights[order]), axis=0)
+        total = cum_weights[-1]
+
+        targets = np.atleast_1d(q)[:, None] * total
+        # First item whose cumulative weight exceeds the target rank.
+        idx = (cum_weights[None, :, :] <= targets[:, None, :]).sum(axis=1)
+        idx = np.minimum(idx, len(items) - 1)
+        result = np.take_along_axis(items, idx, axis=0)
+        result[:, total == 0] = np.nan
+        return result[0] if q.ndim == 0 else result
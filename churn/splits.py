@@ -0,0 +1,150 @@
+"""One train/test split, and its CV folds, shared by every section.
+
+The notebook used to drop the target and call ``train_test_split`` again in
+every modelling section. Each section drew its own rows, and the SMOTE
+section used a 30% test set where the others used 20%, so its scores could
+not be compared with the rest.
+
+``load_split`` draws the stratified split once from the target and stores
+the train and test row positions under ``<cache_dir>/splits/<key>/``. The
+key is a hash of the target and the split settings. ``Split.frames`` selects
+a frame's rows at those positions, so every section gets the same rows. It
+still builds the frames in memory on each call (one copy of the frame's
+rows, not the frame plus a dropped copy), but nothing is stored on disk;
+code that can index at fit time uses the positions themselves, as
+``churn.train.sampling_plan`` does. ``Split.folds`` stores the fold of each
+training row the same way and returns it as a scikit-learn splitter, so
+every search scores candidates on the same folds.
+
+A ``Split`` is pickled as its directory, so a worker process that receives
+one maps the same position files instead of receiving a copy of them.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from churn.cache import CACHE_VERSION, DEFAULT_CACHE_DIR
+from churn.data import TARGET
+
+DEFAULT_TEST_SIZE = 0.2
+
+
+def _save_atomic(path, array):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-", suffix=".npy")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class Split:
+    """Row positions of a stored train/test split (see ``load_split``).
+
+    ``train_rows`` and ``test_rows`` are memory-mapped positions into the
+    rows the split was drawn from, in ``train_test_split`` order.
+    """
+
+    def __init__(self, path, mmap_mode="r"):
+        self.path = str(path)
+        self.mmap_mode = mmap_mode
+        with open(os.path.join(self.path, "split.json")) as f:
+            spec = json.load(f)
+        self.test_size = spec["test_size"]
+        self.random_state = spec["random_state"]
+        self.n_rows = spec["n_rows"]
+        self.train_rows = self._load("train_rows.npy")
+        self.test_rows = self._load("test_rows.npy")
+
+    def __reduce__(self):
+        return Split, (self.path, self.mmap_mode)
+
+    def _load(self, name):
+        return np.load(os.path.join(self.path, name), mmap_mode=self.mmap_mode)
+
+    def frames(self, df, target=TARGET):
+        """``(X_train, X_test, y_train, y_test)`` of ``df`` on this split.
+
+        ``df`` holds the features and the ``target`` column, one row per row
+        the split was drawn from. The frames are taken from ``df`` at the
+        stored positions in one selection each, with ``df``'s index labels:
+        every call builds one in-memory copy of ``df``'s rows (nothing is
+        written to disk). Code that can index at fit time uses
+        ``train_rows`` and ``test_rows`` instead.
+        """
+        if len(df) != self.n_rows:
+            raise ValueError(f"The split covers {self.n_rows} rows, got a frame of {len(df)}")
+        features = np.flatnonzero(df.columns != target)
+        label = df.columns.get_loc(target)
+        train_rows, test_rows = np.asarray(self.train_rows), np.asarray(self.test_rows)
+        return (df.iloc[train_rows, features], df.iloc[test_rows, features],
+                df.iloc[train_rows, label], df.iloc[test_rows, label])
+
+    def folds(self, n_splits=3, shuffle=True, random_state=None):
+        """Stratified CV folds of the training rows, as a ``PredefinedSplit``.
+
+        The fold of every training row is computed on first use and stored
+        with the split, so every search (and every worker) passed the result
+        as ``cv`` validates on exactly the same rows. ``random_state``
+        defaults to the split's own when ``shuffle`` is set.
+        """
+        from sklearn.model_selection import PredefinedSplit, StratifiedKFold
+
+        if shuffle and random_state is None:
+            random_state = self.random_state
+        if not shuffle:
+            random_state = None
+        name = f"folds-{n_splits}-{int(shuffle)}-{random_state}.npy"
+        path = os.path.join(self.path, name)
+        if not os.path.exists(path):
+            y_train = self._load("y.npy")[np.asarray(self.train_rows)]
+            fold_ids = np.empty(len(y_train), dtype=np.int8)
+            splitter = StratifiedKFold(n_splits, shuffle=shuffle, random_state=random_state)
+            for k, (_, valid) in enumerate(splitter.split(np.zeros(len(y_train)), y_train)):
+                fold_ids[valid] = k
+            _save_atomic(path, fold_ids)
+        return PredefinedSplit(self._load(name))
+
+
+def split_key(y, test_size=DEFAULT_TEST_SIZE, random_state=42):
+    """Directory name of the split of target ``y`` with these settings."""
+    y = np.ascontiguousarray(y)
+    payload = json.dumps({"version": CACHE_VERSION, "dtype": str(y.dtype),
+                          "target": hashlib.sha256(y.tobytes()).hexdigest(),
+                          "test_size": test_size, "random_state": random_state}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def load_split(y, test_size=DEFAULT_TEST_SIZE, random_state=42, cache_dir=DEFAULT_CACHE_DIR,
+               mmap_mode="r"):
+    """The stratified train/test split of target ``y``, drawing it if needed.
+
+    The rows are those ``train_test_split(X, y, test_size=test_size,
+    random_state=random_state, stratify=y)`` returns, so results match the
+    sections that used to split on their own.
+    """
+    from sklearn.model_selection import train_test_split
+
+    path = os.path.join(cache_dir, "splits", split_key(y, test_size, random_state))
+    if not os.path.exists(os.path.join(path, "split.json")):
+        y = np.asarray(y)
+        train_rows, test_rows = train_test_split(np.arange(len(y)), test_size=test_size,
+                                                 random_state=random_state, stratify=y)
+        os.makedirs(path, exist_ok=True)
+        _save_atomic(os.path.join(path, "y.npy"), y)
+        _save_atomic(os.path.join(path, "train_rows.npy"), train_rows)
+        _save_atomic(os.path.join(path, "test_rows.npy"), test_rows)
+        fd, tmp_path = tempfile.mkstemp(dir=path, prefix=".tmp-")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"test_size": test_size, "random_state": random_state,
+                       "n_rows": len(y)}, f)
+        # split.json goes last: its presence marks a complete entry.
+        os.replace(tmp_path, os.path.join(path, "split.json"))
+    return Split(path, mmap_mode)
@@ -0,0 +1,205 @@
+"""Single-pass, mergeable summary statistics for the EDA tables.
+
+The notebook's summary table came from ``describe()``, ``median()`` and
+``skew()``, three full scans, and the correlation heatmap from a fourth
+(``corr()``). ``SummaryStats`` collects everything those tables show in one
+pass over row chunks:
+
+- per column: count, mean and the second and third central moments (for the
+  standard deviation and skew), min and max, with NaNs skipped;
+- quartiles and median from a ``QuantileSketch`` (``churn.sketch``) with a
+  normalized rank error of ``quantile_error``;
+- the matrix of pairwise co-moments, over the rows where every column is
+  present, for the correlation matrix.
+
+Each chunk's statistics are computed with vectorized NumPy reductions. Two
+sets of statistics combine with ``merge`` using the pairwise update formulas
+of Chan et al. and Pébay, which stay numerically stable, so chunks can be
+summarized on separate processes (``summarize(..., n_jobs=...)``) in any
+order. Memory is one chunk plus the sketch, and time grows linearly with
+the number of rows.
+"""
+
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from churn.sketch import QuantileSketch
+
+DEFAULT_QUANTILE_ERROR = 0.001
+DEFAULT_CHUNK_ROWS = 100_000
+SUMMARY_COLUMNS = ["count", "mean", "median", "std", "min", "25%", "50%", "75%", "max", "skew"]
+
+
+class SummaryStats:
+    """Mergeable moments, extremes, quantile sketch and co-moments of columns.
+
+    ``update`` adds a chunk (a frame holding ``columns``, or a 2-D array in
+    that order). ``summary`` returns one row per column with
+    ``SUMMARY_COLUMNS``; ``corr`` returns the Pearson correlation matrix.
+    """
+
+    def __init__(self, columns, quantile_error=DEFAULT_QUANTILE_ERROR, seed=None):
+        self.columns = list(columns)
+        n_columns = len(self.columns)
+        self.quantile_error = quantile_error
+        self.count = np.zeros(n_columns, dtype=np.int64)
+        # Empty columns keep a mean of 0 so the merge formulas need no special case.
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros(n_columns)
+        self.m3 = np.zeros(n_columns)
+        self.min = np.full(n_columns, np.nan)
+        self.max = np.full(n_columns, np.nan)
+        self.complete = 0
+        self.complete_mean = np.zeros(n_columns)
+        self.comoment = np.zeros((n_columns, n_columns))
+        self.sketch = QuantileSketch.for_error(n_columns, quantile_error, seed=seed)
+
+    def _values(self, chunk):
+        if hasattr(chunk, "columns"):
+            return chunk[self.columns].to_numpy(np.float64)
+        values = np.asarray(chunk, dtype=np.float64)
+        if values.ndim != 2 or values.shape[1] != len(self.columns):
+            raise ValueError(f"Expected shape (rows, {len(self.columns)}), got {values.shape}")
+        return values
+
+    def update(self, chunk):
+        """Add a chunk of rows."""
+        values = self._values(chunk)
+        if not len(values):
+            return self
+        present = ~np.isnan(values)
+        count = present.sum(axis=0)
+        filled = np.where(present, values, 0.0)
+        mean = filled.sum(axis=0) / np.maximum(count, 1)
+        deviation = np.where(present, values - mean, 0.0)
+        squared = deviation * deviation
+        part = {"count": count, "mean": mean, "m2": squared.sum(axis=0),
+                "m3": (squared * deviation).sum(axis=0),
+                "min": np.fmin.reduce(values, axis=0), "max": np.fmax.reduce(values, axis=0)}
+
+        complete = values[present.all(axis=1)]
+        part["complete"] = len(complete)
+        part["complete_mean"] = (complete.mean(axis=0) if len(complete)
+                                 else np.zeros(len(self.columns)))
+        centered = complete - part["complete_mean"]
+        part["comoment"] = centered.T @ centered
+        self._combine(part)
+        self.sketch.update(values)
+        return self
+
+    def _combine(self, other):
+        n_a, n_b = self.count, other["count"]
+        n = n_a + n_b
+        safe_n = np.maximum(n, 1)
+        delta = other["mean"] - self.mean
+        self.mean = self.mean + delta * n_b / safe_n
+        m2_a, m2_b = self.m2, other["m2"]
+        self.m2 = m2_a + m2_b + delta ** 2 * n_a * n_b / safe_n
+        self.m3 = (self.m3 + other["m3"] + delta ** 3 * n_a * n_b * (n_a - n_b) / safe_n ** 2
+                   + 3 * delta * (n_a * m2_b - n_b * m2_a) / safe_n)
+        self.count = n
+        self.min = np.fmin(self.min, other["min"])
+        self.max = np.fmax(self.max, other["max"])
+
+        c_a, c_b = self.complete, other["complete"]
+        c = c_a + c_b
+        if c:
+            delta = other["complete_mean"] - self.complete_mean
+            self.complete_mean = self.complete_mean + delta * c_b / c
+            self.comoment = (self.comoment + other["comoment"]
+                             + np.outer(delta, delta) * c_a * c_b / c)
+        self.complete = c
+
+    def merge(self, other):
+        """Fold in the statistics of another partition of the same columns."""
+        if other.columns != self.columns or other.quantile_error != self.quantile_error:
+            raise ValueError("Only statistics of the same columns and quantile_error can be "
+                             "merged")
+        self._combine({name: getattr(other, name) for name in (
+            "count", "mean", "m2", "m3", "min", "max", "complete", "complete_mean", "comoment")})
+        self.sketch.merge(other.sketch)
+        return self
+
+    def summary(self):
+        """``describe()``-style table with the median and skew, one row per column.
+
+        ``std`` and ``skew`` are the sample statistics pandas reports (skew
+        is 0 for a constant column).
+        """
+        n = self.count.astype(np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            std = np.where(n > 1, np.sqrt(self.m2 / (n - 1)), np.nan)
+            skew = np.where(self.m2 > 0,
+                            n * np.sqrt(n - 1) / (n - 2) * self.m3 / self.m2 ** 1.5, 0.0)
+        skew[n < 3] = np.nan
+        if self.sketch.n:
+            q1, median, q3 = self.sketch.quantile([0.25, 0.5, 0.75])
+        else:
+            q1 = median = q3 = np.full(len(self.columns), np.nan)
+        frame = pd.DataFrame({"count": n, "mean": np.where(n > 0, self.mean, np.nan),
+                              "median": median, "std": std, "min": self.min, "25%": q1,
+                              "50%": median, "75%": q3, "max": self.max, "skew": skew},
+                             index=pd.Index(self.columns))
+        return frame[SUMMARY_COLUMNS]
+
+    def corr(self):
+        """Pearson correlation matrix over the rows where every column is present."""
+        scale = np.sqrt(np.diag(self.comoment))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = self.comoment / np.outer(scale, scale)
+        np.fill_diagonal(corr, np.where(scale > 0, 1.0, np.nan))
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+def _chunk_stats(values, columns, quantile_error, seed):
+    return SummaryStats(columns, quantile_error, seed).update(values)
+
+
+def summarize(data, columns=None, chunk_rows=DEFAULT_CHUNK_ROWS, n_jobs=1,
+              quantile_error=DEFAULT_QUANTILE_ERROR, seed=0):
+    """``SummaryStats`` of a frame or of a stream of chunks, in one pass.
+
+    ``data`` is a DataFrame (read in blocks of ``chunk_rows``) or an iterable
+    of frames, e.g. ``iter_chunks(path)`` for a file larger than memory.
+    ``columns`` defaults to the numeric and boolean columns of the first
+    chunk. With ``n_jobs`` other than 1, the chunks are summarized on
+    ``core_budget(n_jobs)`` processes, at most two per process in flight,
+    and merged.
+    """
+    from churn.train import core_budget
+
+    if hasattr(data, "columns"):
+        chunks = (data.iloc[start:start + chunk_rows] for start in range(0, len(data), chunk_rows))
+    else:
+        chunks = iter(data)
+    first = next(chunks, None)
+    if first is None:
+        raise ValueError("Expected at least one chunk")
+    if columns is None:
+        columns = list(first.select_dtypes(include=["number", "bool"]).columns)
+    columns = list(columns)
+    stats = SummaryStats(columns, quantile_error, seed)
+
+    def values(chunk):
+        return chunk[columns].to_numpy(np.float64)
+
+    chunks = itertools.chain([first], chunks)
+    processes = core_budget(n_jobs)
+    if processes == 1:
+        for chunk in chunks:
+            stats.update(values(chunk))
+        return stats
+    with ProcessPoolExecutor(processes) as pool:
+        pending = deque()
+        for i, chunk in enumerate(chunks):
+            pending.append(pool.submit(_chunk_stats, values(chunk), columns, quantile_error,
+                                       seed + i))
+            if len(pending) >= 2 * processes:
+                stats.merge(pending.popleft().result())
+        while pending:
+            stats.merge(pending.popleft().result())
+    return stats
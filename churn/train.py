@@ -0,0 +1,276 @@
+"""Model training stage: the classifier zoo, resampling and hold-out metrics.
+
+The estimator classes (scikit-learn trees and ensembles, xgboost) and the
+samplers in ``churn.sampling`` are imported when a model or a sampling plan
+is built, so importing this module costs no more than pandas.
+
+``train_zoo`` fits the whole (model x sampling strategy) grid on a process
+pool. One core budget is shared between the pool (outer parallelism) and the
+estimators' own threads (inner parallelism): with ``B`` cores and ``T``
+tasks, ``min(T, B)`` processes each give their estimator ``B // min(T, B)``
+threads, so the machine is never oversubscribed.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from churn.binned import BinnedSplit, fit_binned
+from churn.metrics import METRIC_NAMES, score_metrics
+
+MODEL_NAMES = ("Decision Tree", "Random Forest", "XGBoost", "AdaBoost", "Gradient Boosting")
+SAMPLING_STRATEGIES = ("none", "smote", "under", "weight")
+
+# Models whose fit can use several threads (``n_jobs``).
+PARALLEL_MODELS = ("Random Forest", "XGBoost")
+
+# Rough fit cost per training row with default parameters, used to start the
+# slowest tasks first so the pool does not wait on a straggler at the end.
+_RELATIVE_COST = {"Gradient Boosting": 6, "Random Forest": 4, "AdaBoost": 3, "XGBoost": 2,
+                  "Decision Tree": 1}
+
+
+def core_budget(n_jobs=None):
+    """Cores to use: all available for None, ``available + 1 + n_jobs`` when negative."""
+    if hasattr(os, "sched_getaffinity"):
+        available = len(os.sched_getaffinity(0))
+    else:
+        available = os.cpu_count() or 1
+    if n_jobs is None:
+        return available
+    if n_jobs < 0:
+        return max(1, available + 1 + n_jobs)
+    return max(1, n_jobs)
+
+
+def split_budget(n_tasks, n_jobs=None):
+    """(outer processes, inner threads per task) sharing ``n_jobs`` cores."""
+    budget = core_budget(n_jobs)
+    outer = max(1, min(n_tasks, budget))
+    return outer, max(1, budget // outer)
+
+
+def make_model(name, random_state=42, n_jobs=None, encoding="onehot", **params):
+    """Unfitted classifier for one of ``MODEL_NAMES``.
+
+    ``n_jobs`` is passed to the models in ``PARALLEL_MODELS`` and ignored by
+    the single-threaded ones. With ``encoding="codes"`` the model takes
+    features with categorical columns (``churn.features``): XGBoost splits on
+    them natively, the other models are preceded by ``OneHotCodes``. Their
+    trees split on float32 values, so they get a dense float32 one-hot array,
+    which fits faster than a CSR matrix and gives the same trees.
+    """
+    if encoding == "codes":
+        if name == "XGBoost":
+            return make_model(name, random_state, n_jobs, enable_categorical=True, **params)
+        from sklearn.pipeline import Pipeline
+
+        from churn.features import OneHotCodes
+
+        return Pipeline([("onehot", OneHotCodes(sparse_output=False, dtype=np.float32)),
+                         ("model", make_model(name, random_state, n_jobs, **params))])
+    if n_jobs is not None and name in PARALLEL_MODELS:
+        params["n_jobs"] = n_jobs
+    if name == "Decision Tree":
+        from sklearn.tree import DecisionTreeClassifier
+        return DecisionTreeClassifier(random_state=random_state, **params)
+    if name == "Random Forest":
+        from sklearn.ensemble import RandomForestClassifier
+        return RandomForestClassifier(random_state=random_state, **params)
+    if name == "XGBoost":
+        from xgboost import XGBClassifier
+        return XGBClassifier(eval_metric="logloss", random_state=random_state, **params)
+    if name == "AdaBoost":
+        from sklearn.ensemble import AdaBoostClassifier
+        return AdaBoostClassifier(random_state=random_state, **params)
+    if name == "Gradient Boosting":
+        from sklearn.ensemble import GradientBoostingClassifier
+        return GradientBoostingClassifier(random_state=random_state, **params)
+    raise ValueError(f"Unknown model {name!r}; expected one of {MODEL_NAMES}")
+
+
+def make_models(names=MODEL_NAMES, random_state=42, encoding="onehot"):
+    return {name: make_model(name, random_state, encoding=encoding) for name in names}
+
+
+def sampling_plan(X, y, strategy="none", random_state=42):
+    """``(X, y, rows, sample_weight)`` to fit one sampling strategy on.
+
+    Only ``"smote"`` creates rows (``churn.sampling.BatchedSMOTE``). The other
+    strategies return the training rows themselves, with ``rows`` holding the
+    positions ``"under"`` keeps (``undersample_rows``) and ``sample_weight``
+    the class weights ``"weight"`` fits with (``balanced_weights``); both are
+    None when unused. Indexing ``X`` by ``rows`` is left to fit time, so no
+    strategy but SMOTE holds a copy of the training set.
+    """
+    from churn.features import encoding_of
+    from churn.sampling import BatchedSMOTE, balanced_weights, undersample_rows
+
+    if strategy == "smote" and encoding_of(X) == "codes":
+        raise ValueError("SMOTE interpolates numeric features; prepare them with "
+                         "encoding='onehot'")
+    if strategy == "none":
+        return X, y, None, None
+    if strategy == "smote":
+        X_res, y_res = BatchedSMOTE(random_state=random_state).fit_resample(X, y)
+        return X_res, y_res, None, None
+    if strategy == "under":
+        return X, y, undersample_rows(y, random_state=random_state), None
+    if strategy == "weight":
+        return X, y, None, balanced_weights(y)
+    raise ValueError(f"Unknown sampling strategy {strategy!r}; "
+                     f"expected one of {SAMPLING_STRATEGIES}")
+
+
+def resample(X, y, strategy="none", random_state=42):
+    """Training rows after SMOTE oversampling or random undersampling, as new
+    frames (see ``sampling_plan`` to avoid the undersampled copy)."""
+    if strategy == "weight":
+        raise ValueError("'weight' reweights the training rows instead of resampling them; "
+                         "use sampling_plan")
+    X, y, rows, _ = sampling_plan(X, y, strategy, random_state)
+    if rows is None:
+        return X, y
+    return X.iloc[rows], y.iloc[rows]
+
+
+def _fit(model, X, y, rows, sample_weight):
+    if rows is not None:
+        X, y = X.iloc[rows], y.iloc[rows]
+    if sample_weight is None:
+        return model.fit(X, y)
+    if hasattr(model, "steps"):
+        # A pipeline routes the weights to its final step.
+        return model.fit(X, y, **{f"{model.steps[-1][0]}__sample_weight": sample_weight})
+    return model.fit(X, y, sample_weight=sample_weight)
+
+
+def evaluate(model, X_test, y_test):
+    """Hold-out metrics of a fitted classifier from one ``predict_proba`` call
+    (``churn.metrics.score_metrics``)."""
+    return score_metrics(y_test, model.predict_proba(X_test)[:, 1])
+
+
+def train_models(models, X_train, y_train, X_test, y_test, sampling="none", random_state=42):
+    """Fit every model on the (resampled) training rows; one metrics row per model."""
+    plan = sampling_plan(X_train, y_train, sampling, random_state)
+    results = {}
+    for name, model in models.items():
+        _fit(model, *plan)
+        results[name] = evaluate(model, X_test, y_test)
+    return pd.DataFrame(results).T
+
+
+def dtype_parity(X_train, y_train, X_test, y_test, names=MODEL_NAMES, random_state=42):
+    """Hold-out metrics of each model fitted on the frames as given and on
+    their ``compact_frame`` copies.
+
+    Returns one row per (dtype, model) with the metrics; ``attrs`` holds the
+    largest absolute metric difference between the two and the bytes of
+    both training frames.
+    """
+    from churn.data import compact_frame, nbytes
+
+    compact_train, compact_test = compact_frame(X_train), compact_frame(X_test)
+    results = {
+        "as given": train_models(make_models(names, random_state), X_train, y_train,
+                                 X_test, y_test),
+        "compact": train_models(make_models(names, random_state), compact_train, y_train,
+                                compact_test, y_test),
+    }
+    frame = pd.concat(results, names=["Dtype", "Model"])
+    difference = (results["as given"] - results["compact"]).abs().to_numpy().max()
+    frame.attrs.update(max_difference=float(difference), bytes=nbytes(X_train),
+                       compact_bytes=nbytes(compact_train))
+    return frame
+
+
+_worker_state = None
+
+
+def _init_zoo_worker(datasets, X_test, y_test, inner, random_state, binned):
+    # The training sets are shipped once per worker rather than once per task.
+    global _worker_state
+    from threadpoolctl import threadpool_limits
+
+    threadpool_limits(inner)
+    _worker_state = (datasets, X_test, y_test, inner, random_state, binned)
+
+
+def _fit_task(task, datasets, X_test, y_test, inner, random_state, binned=None):
+    from churn.features import encoding_of
+
+    strategy, name = task
+    X_fit, y_fit, rows, weight = datasets[strategy]
+    model = make_model(name, random_state, n_jobs=inner, encoding=encoding_of(X_fit))
+    start = time.perf_counter()
+    if name == "XGBoost" and binned is not None:
+        # Every strategy's rows are binned with the cut points of the
+        # original training rows, sketched once per process.
+        if strategy == "smote":
+            matrix = binned.quantize(X_fit, y_fit)
+        elif rows is None and weight is None:
+            matrix = binned.matrix
+        else:
+            matrix = binned.subset(rows, weight=weight)
+        fit_binned(model, matrix)
+    else:
+        _fit(model, X_fit, y_fit, rows, weight)
+    fit_seconds = time.perf_counter() - start
+    return {"Sampling": strategy, "Model": name, **evaluate(model, X_test, y_test),
+            "Fit seconds": fit_seconds}
+
+
+def _fit_in_worker(task):
+    return _fit_task(task, *_worker_state)
+
+
+def train_zoo(X_train, y_train, X_test, y_test, models=MODEL_NAMES,
+              strategies=SAMPLING_STRATEGIES, n_jobs=None, random_state=42):
+    """Fit every (sampling strategy, model) pair in parallel and evaluate it.
+
+    Each strategy's ``sampling_plan`` is computed once. All strategies but
+    SMOTE share the one copy of the training rows (it is pickled once per
+    worker), so adding strategies does not add copies. The fits then run on
+    ``split_budget(n_tasks, n_jobs)`` processes. XGBoost trains on matrices
+    binned with the original training rows' cut points (``churn.binned``),
+    so its fits share one quantile sketch; on features with categorical
+    codes it fits them natively instead. Returns one row per pair, in
+    grid order, with the hold-out metrics and the fit time; ``attrs`` holds
+    the wall time and the outer/inner split.
+    """
+    from churn.features import encoding_of
+
+    start = time.perf_counter()
+    datasets = {strategy: sampling_plan(X_train, y_train, strategy, random_state)
+                for strategy in strategies}
+    tasks = [(strategy, name) for strategy in strategies for name in models]
+    outer, inner = split_budget(len(tasks), n_jobs)
+    binned = None
+    if "XGBoost" in models and encoding_of(X_train) == "onehot":
+        binned = BinnedSplit(X_train, y_train, n_jobs=inner)
+
+    def n_rows(strategy):
+        _, y_fit, rows, _ = datasets[strategy]
+        return len(y_fit if rows is None else rows)
+
+    by_cost = sorted(tasks, key=lambda task: -_RELATIVE_COST.get(task[1], 1) * n_rows(task[0]))
+
+    if outer == 1:
+        results = [_fit_task(task, datasets, X_test, y_test, inner, random_state, binned)
+                   for task in by_cost]
+    else:
+        with ProcessPoolExecutor(outer, initializer=_init_zoo_worker,
+                                 initargs=(datasets, X_test, y_test, inner,
+                                           random_state, binned)) as pool:
+            results = list(pool.map(_fit_in_worker, by_cost))
+
+    order = {task: i for i, task in enumerate(tasks)}
+    results.sort(key=lambda row: order[row["Sampling"], row["Model"]])
+    frame = pd.DataFrame(results)
+    frame.attrs.update(wall_seconds=time.perf_counter() - start, processes=outer,
+                       threads_per_task=inner)
+    return frame
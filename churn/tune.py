@@ -0,0 +1,613 @@
+"""Hyperparameter tuning stage.
+
+``tune_model`` runs a ``RandomizedSearchCV`` over the reduced grids and
+budgets the notebook originally settled on to keep tuning affordable, scored
+on F1. The core budget is split between the search's fits and the
+estimator's own threads (see ``churn.train.split_budget``) instead of nesting
+``n_jobs=-1`` inside ``n_jobs=-1``.
+
+``HalvingSearch`` replaces those compromises with a multi-fidelity search
+over much wider spaces: many candidates are cross-validated with a few
+trees, and only the best are promoted to more trees, for one Hyperband pass
+or until a wall-clock or CPU budget is spent.
+
+Boosted models need not search ``n_estimators`` at all: ``EarlyStoppingSearch``
+(and ``HalvingSearch`` with ``early_stopping_rounds``) fit each candidate
+once per fold with a large tree cap, stop when the held-out log-loss
+plateaus and report the best iteration as ``n_estimators``. XGBoost fits in
+these searches train on fold matrices binned once per process
+(``churn.binned``) rather than re-binning the frames for every candidate.
+
+``PipelineSearch`` tunes a whole preprocessing + classifier ``Pipeline``
+(``rf_pipeline``, ``xgb_pipeline``): the preprocessing is fitted once per
+fold through a ``churn.cache.FoldCache`` and every candidate trains its
+classifier on the memory-mapped transformed folds.
+"""
+
+import math
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from churn.binned import BinnedSplit, fit_binned
+from churn.train import core_budget, make_model, split_budget
+
+PARAM_GRIDS = {
+    "Random Forest": {
+        "n_estimators": [100, 200],
+        "max_depth": [None, 10, 20],
+        "min_samples_split": [2, 5],
+        "min_samples_leaf": [1, 2],
+        "bootstrap": [True],
+    },
+    "Gradient Boosting": {
+        "n_estimators": [100, 150],
+        "learning_rate": [0.05, 0.1],
+        "max_depth": [3, 4],
+        "subsample": [0.8],
+        "min_samples_split": [2, 5],
+    },
+    "XGBoost": {
+        "n_estimators": [100, 150],
+        "learning_rate": [0.05, 0.1],
+        "max_depth": [3, 5],
+        "subsample": [0.8],
+        "colsample_bytree": [0.8],
+    },
+}
+
+# Spaces sampled by HalvingSearch: a list is a set of choices, ("int", lo, hi)
+# an inclusive integer range, ("float", lo, hi) a uniform and ("log", lo, hi)
+# a log-uniform range. The number of trees is the search's fidelity, so it is
+# not part of the spaces.
+SEARCH_SPACES = {
+    "Random Forest": {
+        "max_depth": [None, 5, 10, 15, 20, 30],
+        "min_samples_split": ("int", 2, 20),
+        "min_samples_leaf": ("int", 1, 10),
+        "max_features": ["sqrt", "log2", 0.3, 0.5, None],
+        "bootstrap": [True, False],
+    },
+    "Gradient Boosting": {
+        "learning_rate": ("log", 0.01, 0.3),
+        "max_depth": ("int", 2, 6),
+        "subsample": ("float", 0.5, 1.0),
+        "min_samples_split": ("int", 2, 20),
+        "min_samples_leaf": ("int", 1, 10),
+        "max_features": ["sqrt", 0.5, None],
+    },
+    "XGBoost": {
+        "learning_rate": ("log", 0.01, 0.3),
+        "max_depth": ("int", 2, 10),
+        "subsample": ("float", 0.5, 1.0),
+        "colsample_bytree": ("float", 0.5, 1.0),
+        "min_child_weight": ("log", 0.5, 10.0),
+        "reg_lambda": ("log", 0.1, 10.0),
+        "gamma": ("float", 0.0, 2.0),
+    },
+}
+
+# (min_trees, max_trees) of HalvingSearch per model. Boosted models with few
+# trees barely move away from the prior and rank candidates poorly, so they
+# start higher than the forest.
+TREE_RANGES = {
+    "Random Forest": (10, 270),
+    "Gradient Boosting": (30, 270),
+    "XGBoost": (30, 810),
+}
+
+# Models fitted with early stopping on the held-out fold, and the number of
+# trees without improvement of the held-out log-loss after which they stop.
+EARLY_STOPPING_MODELS = ("Gradient Boosting", "XGBoost")
+DEFAULT_PATIENCE = 20
+DEFAULT_MAX_TREES = 1000
+
+# Folds (shuffled or not) and sampled candidates per search.
+SEARCH_SETTINGS = {
+    "Random Forest": {"cv": 3, "shuffle": True, "n_iter": 10},
+    "Gradient Boosting": {"cv": 2, "shuffle": False, "n_iter": 5},
+    "XGBoost": {"cv": 2, "shuffle": False, "n_iter": 5},
+}
+
+
+def _splitter(name, cv, random_state):
+    # The folds SEARCH_SETTINGS gives a model when cv is None, or cv folds.
+    from sklearn.model_selection import StratifiedKFold
+
+    if cv is None:
+        shuffle = SEARCH_SETTINGS[name]["shuffle"]
+        return StratifiedKFold(n_splits=SEARCH_SETTINGS[name]["cv"], shuffle=shuffle,
+                               random_state=random_state if shuffle else None)
+    if isinstance(cv, int):
+        return StratifiedKFold(n_splits=cv)
+    return cv
+
+
+def tune_model(name, X_train, y_train, n_iter=None, cv=None, scoring="f1", n_jobs=-1,
+               random_state=42, verbose=0):
+    """Fitted ``RandomizedSearchCV`` for one of the ``PARAM_GRIDS`` models."""
+    from sklearn.model_selection import RandomizedSearchCV
+
+    if name not in PARAM_GRIDS:
+        raise ValueError(f"No tuning grid for {name!r}; expected one of {list(PARAM_GRIDS)}")
+    _check_onehot(X_train)
+    cv = _splitter(name, cv, random_state)
+    n_iter = n_iter or SEARCH_SETTINGS[name]["n_iter"]
+    outer, inner = split_budget(n_iter * cv.get_n_splits(), n_jobs)
+    search = RandomizedSearchCV(make_model(name, random_state, n_jobs=inner), PARAM_GRIDS[name],
+                                cv=cv, n_iter=n_iter, scoring=scoring,
+                                random_state=random_state, n_jobs=outer, verbose=verbose)
+    return search.fit(X_train, y_train)
+
+
+def sample_params(space, rng):
+    """One candidate drawn from a ``SEARCH_SPACES`` entry."""
+    params = {}
+    for name, spec in space.items():
+        if isinstance(spec, list):
+            params[name] = spec[rng.randint(len(spec))]
+        elif spec[0] == "int":
+            params[name] = int(rng.randint(spec[1], spec[2] + 1))
+        elif spec[0] == "float":
+            params[name] = float(rng.uniform(spec[1], spec[2]))
+        elif spec[0] == "log":
+            params[name] = float(np.exp(rng.uniform(np.log(spec[1]), np.log(spec[2]))))
+        else:
+            raise ValueError(f"Unknown distribution {spec[0]!r} for {name}")
+    return params
+
+
+class _HeldOutMonitor:
+    """GradientBoosting ``monitor`` stopping once the held-out log-loss stalls.
+
+    The held-out margin is updated with the newest tree only, so monitoring
+    costs one tree prediction per stage.
+    """
+
+    def __init__(self, X_valid, y_valid, patience):
+        self.X_valid = np.asarray(X_valid, dtype=np.float32)
+        self.y_valid = np.asarray(y_valid)
+        self.patience = patience
+        self.margin = None
+        self.best_loss = np.inf
+        self.best_iteration = 0
+        self.best_margin = None
+
+    def __call__(self, i, model, locals_):
+        if self.margin is None:
+            prior = model.init_.predict_proba(self.X_valid)[:, 1]
+            self.margin = np.log(prior / (1 - prior))
+        self.margin = self.margin + model.learning_rate * model.estimators_[i, 0].predict(
+            self.X_valid)
+        loss = np.mean(np.logaddexp(0, self.margin) - self.y_valid * self.margin)
+        if loss < self.best_loss:
+            self.best_loss, self.best_iteration = loss, i
+            self.best_margin = self.margin
+        return i - self.best_iteration >= self.patience
+
+
+def fit_early_stopping(name, params, X_train, y_train, X_valid, y_valid, max_trees,
+                       patience=DEFAULT_PATIENCE, random_state=42, n_jobs=None, matrices=None):
+    """Fit a boosted model, stopping when the held-out log-loss stops improving.
+
+    Trees are added up to ``max_trees`` until ``patience`` consecutive trees
+    fail to improve the log-loss on ``(X_valid, y_valid)``. For XGBoost,
+    ``matrices`` can hold the training and validation rows already binned
+    (see ``churn.binned``), which are then used instead of the frames for
+    fitting. Returns the fitted model, its held-out predictions at the best
+    iteration, the best number of trees and the number of trees built.
+    """
+    if name not in EARLY_STOPPING_MODELS:
+        raise ValueError(f"Early stopping needs one of {EARLY_STOPPING_MODELS}, got {name!r}")
+    if name == "XGBoost":
+        model = make_model(name, random_state, n_jobs=n_jobs, n_estimators=max_trees,
+                           early_stopping_rounds=patience, **params)
+        if matrices is None:
+            model.fit(X_train, y_train, eval_set=[(X_valid, y_valid)], verbose=False)
+        else:
+            fit_binned(model, *matrices)
+        # predict uses the trees up to best_iteration.
+        best_trees = model.best_iteration + 1
+        return model, model.predict(X_valid), best_trees, model.get_booster().num_boosted_rounds()
+    monitor = _HeldOutMonitor(X_valid, y_valid, patience)
+    model = make_model(name, random_state, n_estimators=max_trees, **params)
+    model.fit(X_train, y_train, monitor=monitor)
+    predictions = (monitor.best_margin > 0).astype(np.int64)
+    return model, predictions, monitor.best_iteration + 1, model.n_estimators_
+
+
+_worker_state = None
+
+
+def _init_search_worker(state):
+    global _worker_state
+    from threadpoolctl import threadpool_limits
+
+    threadpool_limits(1)
+    _worker_state = {**state, "n_jobs": 1}
+
+
+def _evaluate_task(task, state=None):
+    """F1 of one candidate on one fold, its best and built tree counts, CPU seconds."""
+    from sklearn.metrics import f1_score
+
+    state = state or _worker_state
+    name, X, y = state["name"], state["X"], state["y"]
+    params, fold, n_trees = task
+    train, valid = state["folds"][fold]
+    cpu_start = time.process_time()
+    binned = None
+    if name == "XGBoost":
+        # Each process bins the training rows once and keeps every fold's
+        # matrices for the candidates that follow.
+        if state.get("binned") is None:
+            state["binned"] = BinnedSplit(X, y, n_jobs=state["n_jobs"])
+        binned = state["binned"]
+    if state["early_stopping_rounds"]:
+        matrices = None
+        if binned is not None:
+            dtrain = binned.subset(train, key=("train", fold))
+            matrices = (dtrain, binned.subset(valid, key=("valid", fold), ref=dtrain))
+        _, predictions, best_trees, built = fit_early_stopping(
+            name, params, X.iloc[train], y.iloc[train], X.iloc[valid], y.iloc[valid], n_trees,
+            state["early_stopping_rounds"], state["random_state"], state["n_jobs"], matrices)
+    else:
+        model = make_model(name, state["random_state"], n_jobs=state["n_jobs"],
+                           n_estimators=n_trees, **params)
+        if binned is not None:
+            fit_binned(model, binned.subset(train, key=("train", fold)))
+        else:
+            model.fit(X.iloc[train], y.iloc[train])
+        predictions, best_trees, built = model.predict(X.iloc[valid]), n_trees, n_trees
+    score = f1_score(y.iloc[valid], predictions)
+    return score, best_trees, built, time.process_time() - cpu_start
+
+
+def _check_onehot(X):
+    # The grids and the binned XGBoost fits are defined on one-hot columns.
+    from churn.features import encoding_of
+
+    if encoding_of(X) != "onehot":
+        raise ValueError("Tuning needs one-hot features; prepare them with encoding='onehot'")
+
+
+def _search_state(name, X, y, folds, random_state, n_jobs, early_stopping_rounds):
+    _check_onehot(X)
+    if early_stopping_rounds and name not in EARLY_STOPPING_MODELS:
+        raise ValueError(f"Early stopping needs one of {EARLY_STOPPING_MODELS}, got {name!r}")
+    return {"name": name, "X": X, "y": y, "folds": folds, "random_state": random_state,
+            "n_jobs": n_jobs, "early_stopping_rounds": early_stopping_rounds}
+
+
+class _FoldSearch:
+    """(candidate, fold) fits on a process pool sized to the core budget."""
+
+    def _exhausted(self):
+        return False
+
+    def _open(self, X, y, splitter, early_stopping_rounds):
+        self._start = time.perf_counter()
+        self._cpu_used = 0.0
+        self.trees_built_ = 0
+        self._folds = list(splitter.split(X, y))
+        self._processes = core_budget(self.n_jobs)
+        self._state = _search_state(self.name, X, y, self._folds, self.random_state,
+                                    self._processes, early_stopping_rounds)
+        self._pool = None
+        if self._processes > 1:
+            self._pool = ProcessPoolExecutor(self._processes, initializer=_init_search_worker,
+                                             initargs=(self._state,))
+
+    def _close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+        self._pool = self._state = None
+
+    def _run_candidates(self, candidates, n_trees):
+        """Mean CV F1 and best number of trees of the candidates whose folds all
+        ran within the budget."""
+        n_folds = len(self._folds)
+        tasks = deque((params, fold, n_trees) for _, params in candidates
+                      for fold in range(n_folds))
+        results = []
+        pending = deque()
+        while tasks or pending:
+            while tasks and len(pending) < self._processes and not self._exhausted():
+                task = tasks.popleft()
+                if self._pool is None:
+                    pending.append(_evaluate_task(task, self._state))
+                else:
+                    pending.append(self._pool.submit(_evaluate_task, task))
+            if not pending:
+                break
+            result = pending.popleft()
+            score, best_trees, built, cpu_seconds = (result if self._pool is None
+                                                     else result.result())
+            self._cpu_used += cpu_seconds
+            self.trees_built_ += built
+            results.append((score, best_trees))
+        n_complete = len(results) // n_folds
+        results = np.asarray(results[:n_complete * n_folds]).reshape(n_complete, n_folds, 2)
+        return results[:, :, 0].mean(axis=1), results[:, :, 1].mean(axis=1)
+
+    def _refit(self, X, y):
+        return make_model(self.name, self.random_state, n_jobs=core_budget(self.n_jobs),
+                          **self.best_params_).fit(X, y)
+
+
+class HalvingSearch(_FoldSearch):
+    """Successive-halving (Hyperband) search within a time budget.
+
+    Candidates are sampled from ``SEARCH_SPACES[name]`` and cross-validated on
+    F1 with ``min_trees`` trees; the best ``1 / eta`` of every rung are
+    promoted to ``eta`` times more trees, up to ``max_trees`` (both default
+    to ``TREE_RANGES[name]``). Hyperband brackets, which trade the number of
+    candidates against their starting number of trees, run in turn: one full
+    Hyperband pass (every bracket once) by default, or ``max_brackets``
+    brackets cycling through them. The search stops earlier once
+    ``time_budget`` wall-clock seconds have passed or the fits have used
+    ``cpu_budget`` CPU seconds. Fits already running then finish, no new ones
+    start, and only the candidates of the interrupted rung whose folds all
+    completed are kept. An integer ``cv`` means shuffled
+    stratified folds; a splitter (e.g. ``Split.folds``) is used as is.
+
+    With ``early_stopping_rounds`` (boosted models only) the rung's number
+    of trees is a cap: each fit stops once its held-out log-loss has not
+    improved for that many trees (see ``fit_early_stopping``).
+
+    After ``fit``: ``best_params_`` (including ``n_estimators``, the mean
+    best number of trees across folds), ``best_score_`` (mean CV F1 at the
+    largest number of trees reached), ``best_estimator_`` (refit on all rows
+    with ``refit=True``), ``history_`` (one row per completed candidate and
+    rung, with its elapsed time), ``n_candidates_`` and ``trees_built_``.
+    """
+
+    def __init__(self, name, time_budget=60.0, cpu_budget=None, eta=3, min_trees=None,
+                 max_trees=None, max_brackets=None, cv=3, early_stopping_rounds=None, n_jobs=-1,
+                 random_state=42, refit=True):
+        if name not in SEARCH_SPACES:
+            raise ValueError(f"No search space for {name!r}; "
+                             f"expected one of {list(SEARCH_SPACES)}")
+        min_trees = min_trees or TREE_RANGES[name][0]
+        max_trees = max_trees or TREE_RANGES[name][1]
+        if eta < 2 or min_trees < 1 or max_trees < min_trees:
+            raise ValueError("Expected eta >= 2 and 1 <= min_trees <= max_trees")
+        if max_brackets is not None and max_brackets < 1:
+            raise ValueError(f"Expected max_brackets >= 1, got {max_brackets}")
+        self.name = name
+        self.time_budget = time_budget
+        self.cpu_budget = cpu_budget
+        self.eta = eta
+        self.min_trees = min_trees
+        self.max_trees = max_trees
+        self.max_brackets = max_brackets
+        self.cv = cv
+        self.early_stopping_rounds = early_stopping_rounds
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.refit = refit
+
+    def _exhausted(self):
+        if time.perf_counter() - self._start >= self.time_budget:
+            return True
+        return self.cpu_budget is not None and self._cpu_used >= self.cpu_budget
+
+    def fit(self, X, y):
+        from sklearn.model_selection import StratifiedKFold
+
+        rng = np.random.RandomState(self.random_state)
+        splitter = self.cv
+        if isinstance(splitter, int):
+            splitter = StratifiedKFold(splitter, shuffle=True, random_state=self.random_state)
+        self._open(X, y, splitter, self.early_stopping_rounds)
+        s_max = int(math.floor(math.log(self.max_trees / self.min_trees, self.eta) + 1e-9))
+        space = SEARCH_SPACES[self.name]
+        history = []
+        n_candidates = 0
+        try:
+            for bracket in range(self.max_brackets or s_max + 1):
+                if self._exhausted():
+                    break
+                s = s_max - bracket % (s_max + 1)
+                n = int(math.ceil((s_max + 1) / (s + 1) * self.eta ** s))
+                candidates = [(n_candidates + i, sample_params(space, rng)) for i in range(n)]
+                for rung in range(s + 1):
+                    n_trees = min(self.max_trees,
+                                  self.min_trees * self.eta ** (s_max - s + rung))
+                    scores, best_trees = self._run_candidates(candidates, n_trees)
+                    candidates = candidates[:len(scores)]
+                    if rung == 0:
+                        n_candidates += len(scores)
+                    elapsed = time.perf_counter() - self._start
+                    history.extend({"candidate": i, "n_estimators": n_trees, "score": score,
+                                    "best_trees": trees, "elapsed": elapsed,
+                                    "params": params}
+                                   for (i, params), score, trees
+                                   in zip(candidates, scores, best_trees))
+                    keep = np.argsort(-scores, kind="stable")[:max(1, len(scores) // self.eta)]
+                    candidates = [candidates[j] for j in keep]
+                    if self._exhausted():
+                        break
+        finally:
+            self._close()
+
+        if not history:
+            raise ValueError("The budget ran out before any candidate was evaluated")
+        self.history_ = pd.DataFrame(history)
+        self.n_candidates_ = n_candidates
+        self.cpu_seconds_ = self._cpu_used
+        best = self.history_.sort_values(["n_estimators", "score"], kind="stable").iloc[-1]
+        self.best_params_ = {**best["params"], "n_estimators": int(round(best["best_trees"]))}
+        self.best_score_ = float(best["score"])
+        if self.refit:
+            self.best_estimator_ = self._refit(X, y)
+        return self
+
+
+class EarlyStoppingSearch(_FoldSearch):
+    """Randomized search for boosted models with early stopping on every fold.
+
+    ``n_estimators`` is not searched: each candidate drawn from
+    ``PARAM_GRIDS[name]`` without it is fitted once per fold with up to
+    ``max_trees`` trees and stops once the log-loss on the held-out fold has
+    not improved for ``patience`` trees. The mean best number of trees across
+    folds is reported as the candidate's ``n_estimators``. Folds and the
+    number of candidates default to ``SEARCH_SETTINGS[name]``.
+
+    After ``fit``: ``best_params_``, ``best_score_`` (mean CV F1),
+    ``best_estimator_``, ``cv_results_`` (one row per candidate) and
+    ``trees_built_`` (trees fitted across all folds).
+    """
+
+    def __init__(self, name, n_iter=None, cv=None, max_trees=DEFAULT_MAX_TREES,
+                 patience=DEFAULT_PATIENCE, n_jobs=-1, random_state=42, refit=True):
+        if name not in EARLY_STOPPING_MODELS:
+            raise ValueError(f"Early stopping needs one of {EARLY_STOPPING_MODELS}, got {name!r}")
+        self.name = name
+        self.n_iter = n_iter
+        self.cv = cv
+        self.max_trees = max_trees
+        self.patience = patience
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.refit = refit
+
+    def fit(self, X, y):
+        from sklearn.model_selection import ParameterGrid, ParameterSampler
+
+        grid = {key: values for key, values in PARAM_GRIDS[self.name].items()
+                if key != "n_estimators"}
+        n_iter = min(self.n_iter or SEARCH_SETTINGS[self.name]["n_iter"], len(ParameterGrid(grid)))
+        candidates = list(enumerate(ParameterSampler(grid, n_iter,
+                                                     random_state=self.random_state)))
+        self._open(X, y, _splitter(self.name, self.cv, self.random_state), self.patience)
+        try:
+            scores, best_trees = self._run_candidates(candidates, self.max_trees)
+        finally:
+            self._close()
+
+        self.cv_results_ = pd.DataFrame({"params": [params for _, params in candidates],
+                                         "mean_test_score": scores, "best_trees": best_trees})
+        best = int(np.argmax(scores))
+        self.best_params_ = {**candidates[best][1], "n_estimators": int(round(best_trees[best]))}
+        self.best_score_ = float(scores[best])
+        if self.refit:
+            self.best_estimator_ = self._refit(X, y)
+        return self
+
+
+def _evaluate_pipeline_task(task, state=None):
+    """Score of one classifier candidate on one cached fold, and its fit seconds."""
+    from sklearn.base import clone
+    from sklearn.metrics import get_scorer
+
+    from churn.cache import FoldCache
+
+    state = state or _worker_state
+    params, key = task
+    X_train, y_train, X_valid, y_valid = FoldCache(state["cache_dir"]).load(key)
+    model = clone(state["estimator"]).set_params(**params)
+    if "n_jobs" in model.get_params():
+        model.set_params(n_jobs=state["n_jobs"])
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    return get_scorer(state["scoring"])(model, X_valid, y_valid), fit_seconds
+
+
+class PipelineSearch:
+    """Randomized search over a ``Pipeline`` that preprocesses each fold once.
+
+    ``param_distributions`` uses the pipeline's parameter names, as in
+    ``RandomizedSearchCV`` (``"classifier__max_depth"``). Parameters of the
+    final step only change the classifier, so all candidates sharing the
+    other parameters reuse one ``FoldCache`` entry per fold: the
+    preprocessing is fitted and applied once per fold and distinct
+    preprocessing setting instead of once per candidate and fold. Entries
+    persist in ``cache_dir`` and are shared with later searches over the same
+    data, folds and preprocessing.
+
+    Fits run on a process pool sized to the core budget, one thread each. An
+    integer ``cv`` means shuffled stratified folds. After ``fit``:
+    ``cv_results_`` (one row per candidate, with per-fold scores and mean
+    fit seconds), ``best_params_``, ``best_score_``, ``best_estimator_``
+    (the pipeline refit on all rows with ``refit=True``) and
+    ``cache_stats_`` (``FoldCache.stats()`` of this fit).
+    """
+
+    def __init__(self, pipeline, param_distributions, n_iter=10, cv=3, scoring="f1",
+                 cache_dir=None, n_jobs=-1, random_state=42, refit=True):
+        self.pipeline = pipeline
+        self.param_distributions = param_distributions
+        self.n_iter = n_iter
+        self.cv = cv
+        self.scoring = scoring
+        self.cache_dir = cache_dir
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.refit = refit
+
+    def _candidates(self):
+        from sklearn.model_selection import ParameterGrid, ParameterSampler
+
+        n_iter = self.n_iter
+        if all(isinstance(values, list) for values in self.param_distributions.values()):
+            n_iter = min(n_iter, len(ParameterGrid(self.param_distributions)))
+        return list(ParameterSampler(self.param_distributions, n_iter,
+                                     random_state=self.random_state))
+
+    def fit(self, X, y):
+        from sklearn.base import clone
+        from sklearn.model_selection import StratifiedKFold
+
+        from churn.cache import DEFAULT_FOLD_CACHE_DIR, FoldCache, frame_digest
+
+        cache = FoldCache(self.cache_dir or DEFAULT_FOLD_CACHE_DIR)
+        splitter = self.cv
+        if isinstance(splitter, int):
+            splitter = StratifiedKFold(splitter, shuffle=True, random_state=self.random_state)
+        folds = list(splitter.split(X, y))
+        final = self.pipeline.steps[-1][0]
+        prefix = final + "__"
+        digest = frame_digest(X, y)
+        candidates = self._candidates()
+
+        tasks = []
+        for params in candidates:
+            model_params = {key[len(prefix):]: value for key, value in params.items()
+                            if key.startswith(prefix)}
+            other = {key: value for key, value in params.items() if not key.startswith(prefix)}
+            preprocessing = clone(self.pipeline).set_params(**other)[:-1]
+            tasks.extend((model_params, cache.prepare(preprocessing, X, y, train, valid, digest))
+                         for train, valid in folds)
+
+        processes = core_budget(self.n_jobs)
+        state = {"estimator": self.pipeline.steps[-1][1], "cache_dir": cache.cache_dir,
+                 "scoring": self.scoring, "n_jobs": processes}
+        if processes > 1:
+            with ProcessPoolExecutor(processes, initializer=_init_search_worker,
+                                     initargs=(state,)) as pool:
+                results = list(pool.map(_evaluate_pipeline_task, tasks))
+        else:
+            results = [_evaluate_pipeline_task(task, state) for task in tasks]
+
+        results = np.asarray(results).reshape(len(candidates), len(folds), 2)
+        scores = results[:, :, 0]
+        self.cv_results_ = pd.DataFrame({"params": candidates,
+                                         "mean_test_score": scores.mean(axis=1),
+                                         "mean_fit_time": results[:, :, 1].mean(axis=1)})
+        for fold in range(len(folds)):
+            self.cv_results_[f"split{fold}_test_score"] = scores[:, fold]
+        best = int(np.argmax(self.cv_results_["mean_test_score"]))
+        self.best_params_ = candidates[best]
+        self.best_score_ = float(self.cv_results_["mean_test_score"].iloc[best])
+        self.cache_stats_ = cache.stats()
+        if self.refit:
+            estimator = clone(self.pipeline).set_params(**self.best_params_)
+            if "n_jobs" in estimator.steps[-1][1].get_params():
+                estimator.set_params(**{prefix + "n_jobs": processes})
+            self.best_estimator_ = estimator.fit(X, y)
+        return self